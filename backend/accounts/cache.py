@@ -0,0 +1,161 @@
+"""
+accounts/cache.py
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = (
+    'id', 'email', 'first_name', 'last_name', 'role', 'phone_number',
+    'is_active', 'date_joined', 'updated_at',
+)
+
+
+class UserSnapshot(namedtuple('UserSnapshot', SNAPSHOT_FIELDS)):
+    """
+    Immutable copy of the user fields needed by permissions and serializers
+    """
+    __slots__ = ()
+
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def get_role_display(self):
+        from .models import User
+        return dict(User.ROLE_CHOICES).get(self.role, self.role)
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def is_team_member(self):
+        return self.role == 'team_member'
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU with a per-entry TTL
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Other processes only drop their local copy when its TTL runs out, so keep it short
+_local = LRUCache(
+    max_entries=getattr(settings, 'USER_CACHE_MAX_ENTRIES', 10000),
+    ttl=getattr(settings, 'USER_CACHE_LOCAL_TTL', 30),
+)
+
+
+def _cache_key(user_id):
+    return f'user-snapshot:{user_id}'
+
+
+def snapshot_from_user(user):
+    return UserSnapshot(*(getattr(user, field) for field in SNAPSHOT_FIELDS))
+
+
+def get_user_snapshots(user_ids):
+    """
+    Return {user_id: UserSnapshot} for the given ids, checking the local LRU,
+    then the shared cache, then loading the rest in one query. While the shared
+    cache is down lookups go straight to the database.
+    """
+    from .models import User
+
+    found = {}
+    missing = set()
+    for user_id in set(user_ids):
+        if not user_id:
+            continue
+        snapshot = _local.get(user_id)
+        if snapshot is None:
+            missing.add(user_id)
+        else:
+            found[user_id] = snapshot
+
+    if missing:
+        try:
+            shared = cache.get_many([_cache_key(user_id) for user_id in missing])
+        except Exception as exc:
+            logger.warning('User cache unavailable, loading users from the database: %s', exc)
+            shared = {}
+        for user_id in list(missing):
+            snapshot = shared.get(_cache_key(user_id))
+            if snapshot is not None:
+                found[user_id] = snapshot
+                _local.set(user_id, snapshot)
+                missing.discard(user_id)
+
+    if missing:
+        loaded = {}
+        for values in User.objects.filter(id__in=missing).values_list(*SNAPSHOT_FIELDS):
+            snapshot = UserSnapshot(*values)
+            loaded[_cache_key(snapshot.id)] = snapshot
+            found[snapshot.id] = snapshot
+            _local.set(snapshot.id, snapshot)
+        try:
+            cache.set_many(loaded, timeout=getattr(settings, 'USER_CACHE_TTL', 300))
+        except Exception as exc:
+            logger.warning('User cache unavailable, not caching loaded users: %s', exc)
+
+    return found
+
+
+def get_user_snapshot(user_id):
+    if not user_id:
+        return None
+    return get_user_snapshots([user_id]).get(user_id)
+
+
+def user_display_name(user_id):
+    """Full name for update notes, falling back to email"""
+    snapshot = get_user_snapshot(user_id)
+    if snapshot is None:
+        return ''
+    return snapshot.get_full_name() or snapshot.email
+
+
+def invalidate_user(user_id):
+    _local.delete(user_id)
+    try:
+        cache.delete(_cache_key(user_id))
+    except Exception as exc:
+        # The shared entry expires after USER_CACHE_TTL
+        logger.warning('User cache unavailable, could not invalidate %s: %s', user_id, exc)
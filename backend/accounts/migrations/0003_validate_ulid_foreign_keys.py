@@ -0,0 +1,18 @@
+# Validates the foreign keys 0002_ulid_primary_keys re-added NOT VALID. Not
+# atomic, so each VALIDATE CONSTRAINT commits on its own and holds only a
+# lock that lets reads and writes continue.
+
+from accounts.online_schema import validate_foreign_keys
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0002_ulid_primary_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(validate_foreign_keys('accounts_user'), migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 """
 accounts/models.py
 """
+import os
+import threading
+import time
 import uuid
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
@@ -12,6 +15,34 @@ def generate_uuid():
     return str(uuid.uuid4().hex[:10])
 
 
+CROCKFORD_BASE32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_ulid_lock = threading.Lock()
+_ulid_last = [0, 0]
+
+
+def generate_ulid():
+    """
+    Generate a 26-character ULID: 48-bit millisecond timestamp followed by 80
+    random bits, Crockford base32 encoded. New IDs sort by creation time, so
+    inserts land together rather than on random index pages. Rows created
+    before ULIDs keep their lowercase hex IDs, which interleave with the ULIDs
+    in index order, so inserts only reach the right edge of the index once
+    those rows have aged out. Within one millisecond the random part is
+    incremented so IDs from this process stay ordered.
+    """
+    with _ulid_lock:
+        timestamp = time.time_ns() // 1_000_000
+        if timestamp <= _ulid_last[0]:
+            timestamp = _ulid_last[0]
+            randomness = _ulid_last[1] + 1
+        else:
+            randomness = int.from_bytes(os.urandom(10), 'big')
+        _ulid_last[0], _ulid_last[1] = timestamp, randomness
+
+    value = (timestamp << 80) | (randomness & ((1 << 80) - 1))
+    return ''.join(CROCKFORD_BASE32[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -42,9 +73,12 @@ class User(AbstractBaseUser, PermissionsMixin):
         ('reporter', 'Reporter'),
     ]
     
+    # Roles that locations can be assigned to
+    ASSIGNABLE_ROLES = ['admin', 'team_lead', 'team_member']
+    
     id = models.CharField(
-        max_length=10,
-        default=generate_uuid,
+        max_length=26,
+        default=generate_ulid,
         unique=True,
         editable=False,
         primary_key=True,
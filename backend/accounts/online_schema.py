@@ -0,0 +1,62 @@
+"""
+accounts/online_schema.py
+
+Migration helpers for changing primary keys on PostgreSQL without holding
+long locks. Other databases are left alone: SQLite does not enforce varchar
+lengths, so widening a column there needs no schema change.
+"""
+
+FOREIGN_KEYS_SQL = """
+    SELECT c.conrelid::regclass::text, c.conname, a.attname, pg_get_constraintdef(c.oid)
+    FROM pg_constraint c
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+    WHERE c.contype = 'f' AND c.confrelid = %s::regclass AND c.convalidated = %s
+"""
+
+
+def _foreign_keys(schema_editor, table, validated):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(FOREIGN_KEYS_SQL, [table, validated])
+        return cursor.fetchall()
+
+
+def widen_primary_key(*tables, length):
+    """
+    RunPython forward function widening the varchar primary keys of tables and
+    every foreign key column pointing at them.
+
+    Django's AlterField drops the referencing foreign keys and adds them back
+    validated, which scans every referencing table under lock. Here they are
+    added back NOT VALID instead. The varchar widening is binary compatible, so
+    neither the columns nor their indexes are rewritten. Run
+    validate_foreign_keys in a later non-atomic migration to check the
+    constraints without blocking writes.
+    """
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        quote = schema_editor.quote_name
+        for table in tables:
+            foreign_keys = _foreign_keys(schema_editor, table, True)
+            for child, name, _column, _definition in foreign_keys:
+                schema_editor.execute(f'ALTER TABLE {child} DROP CONSTRAINT {quote(name)}')
+            schema_editor.execute(f'ALTER TABLE {quote(table)} ALTER COLUMN "id" TYPE varchar({length})')
+            for child, name, column, definition in foreign_keys:
+                schema_editor.execute(f'ALTER TABLE {child} ALTER COLUMN {quote(column)} TYPE varchar({length})')
+                schema_editor.execute(f'ALTER TABLE {child} ADD CONSTRAINT {quote(name)} {definition} NOT VALID')
+    return forwards
+
+
+def validate_foreign_keys(*tables):
+    """
+    RunPython forward function validating the NOT VALID foreign keys pointing at
+    tables. VALIDATE CONSTRAINT only takes a SHARE UPDATE EXCLUSIVE lock, so
+    reads and writes continue while the referencing rows are checked.
+    """
+    def forwards(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for table in tables:
+            for child, name, _column, _definition in _foreign_keys(schema_editor, table, False):
+                schema_editor.execute(f'ALTER TABLE {child} VALIDATE CONSTRAINT {schema_editor.quote_name(name)}')
+    return forwards
@@ -4,6 +4,7 @@ accounts/serializers.py
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from .cache import get_user_snapshot, get_user_snapshots
 
 User = get_user_model()
 
@@ -28,6 +29,66 @@ class UserSerializer(serializers.ModelSerializer):
         return obj.get_full_name()
 
 
+class CachedUserField(serializers.Field):
+    """
+    Read-only nested user rendered from the user cache. Point source at the
+    foreign key column (e.g. 'assigned_to_id') so no user row is loaded.
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.datetime_field = serializers.DateTimeField()
+
+    def to_representation(self, user_id):
+        snapshot = get_user_snapshot(user_id)
+        if snapshot is None:
+            return None
+        return {
+            'id': snapshot.id,
+            'email': snapshot.email,
+            'first_name': snapshot.first_name,
+            'last_name': snapshot.last_name,
+            'full_name': snapshot.get_full_name(),
+            'role': snapshot.role,
+            'role_display': snapshot.get_role_display(),
+            'phone_number': snapshot.phone_number,
+            'is_active': snapshot.is_active,
+            'date_joined': self.datetime_field.to_representation(snapshot.date_joined),
+            'updated_at': self.datetime_field.to_representation(snapshot.updated_at),
+        }
+
+
+class CachedUserListSerializer(serializers.ListSerializer):
+    """
+    List serializer that warms the user cache for a whole page in one lookup
+    before the child serializer renders its CachedUserFields
+    """
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        sources = [
+            field.source for field in self.child.fields.values()
+            if isinstance(field, CachedUserField)
+        ]
+        get_user_snapshots(
+            getattr(item, source) for item in items for source in sources
+        )
+        return super().to_representation(items)
+
+
+class UserWorkloadSerializer(UserSerializer):
+    """
+    User serializer with open assignment counts by status and priority
+    """
+    workload = serializers.SerializerMethodField()
+    
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['workload']
+    
+    def get_workload(self, obj):
+        from locations.workload import summarize_counters
+        return summarize_counters(obj.assignment_counters.all())
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """
     Serializer for user profile updates
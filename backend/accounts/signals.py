@@ -0,0 +1,20 @@
+"""
+accounts/signals.py
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import invalidate_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, using, **kwargs):
+    """
+    Drop cached snapshots of a user whenever the row changes (including role changes).
+    Invalidate now for this process and again after commit so a concurrent reader
+    cannot re-cache the pre-commit row.
+    """
+    invalidate_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk), using=using)
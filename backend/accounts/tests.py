@@ -1,3 +1,69 @@
-from django.test import TestCase
+from django.core.cache.backends.base import BaseCache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from .cache import _local, get_user_snapshots, invalidate_user
+from .models import CROCKFORD_BASE32, User
 
-# Create your tests here.
+
+class UnavailableCache(BaseCache):
+    """Cache backend that fails like an unreachable Redis"""
+    def __init__(self, location, params):
+        super().__init__(params)
+
+    def get_many(self, keys, version=None):
+        raise ConnectionError('Connection refused')
+
+    def set_many(self, data, timeout=None, version=None):
+        raise ConnectionError('Connection refused')
+
+    def delete(self, key, version=None):
+        raise ConnectionError('Connection refused')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'accounts.tests.UnavailableCache'}})
+class UserSnapshotCacheTests(TestCase):
+    def setUp(self):
+        _local.clear()
+        self.user = User.objects.create_user(email='crew@example.com', password='pass', role='team_member')
+
+    def test_snapshots_load_from_the_database_while_the_cache_is_down(self):
+        with self.assertLogs('accounts.cache', 'WARNING'):
+            snapshots = get_user_snapshots([self.user.id])
+        self.assertEqual(snapshots[self.user.id].email, 'crew@example.com')
+
+    def test_invalidation_survives_the_cache_being_down(self):
+        get_user_snapshots([self.user.id])
+        with self.assertLogs('accounts.cache', 'WARNING'):
+            invalidate_user(self.user.id)
+        self.assertIsNone(_local.get(self.user.id))
+
+
+class UlidPrimaryKeyMigrationTests(TransactionTestCase):
+    migrate_from = [('accounts', '0001_initial')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_ids_are_kept_and_new_rows_get_sortable_ulids(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        OldUser = executor.loader.project_state(self.migrate_from).apps.get_model('accounts', 'User')
+        OldUser.objects.create(id='f3a9c01b2e', email='old@example.com', password='!')
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+        self.assertEqual(User.objects.get(id='f3a9c01b2e').email, 'old@example.com')
+        created = [
+            User.objects.create_user(email=f'new{n}@example.com', password='pass').id
+            for n in range(5)
+        ]
+        for user_id in created:
+            self.assertEqual(len(user_id), 26)
+            self.assertTrue(set(user_id) <= set(CROCKFORD_BASE32), user_id)
+        self.assertEqual(created, sorted(created))
+        self.assertEqual(
+            list(User.objects.filter(id__in=created).order_by('id').values_list('id', flat=True)), created
+        )
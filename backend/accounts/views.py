@@ -6,16 +6,18 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth import get_user_model
-from .serializers import UserSerializer, UserProfileSerializer
+from scout.db_routers import ReplicaReadMixin
+from .serializers import UserSerializer, UserProfileSerializer, UserWorkloadSerializer
 
 User = get_user_model()
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing users
     """
     queryset = User.objects.all()
+    replica_actions = {'list', 'retrieve', 'me'}
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     
@@ -32,26 +34,41 @@ class UserViewSet(viewsets.ModelViewSet):
         
         return [permission() for permission in permission_classes]
     
+    def include_workload(self):
+        """
+        Workload counters are opt-in via ?include=workload
+        """
+        return 'workload' in self.request.query_params.get('include', '').split(',')
+    
+    def get_serializer_class(self):
+        if self.action in ['list', 'retrieve', 'me'] and self.include_workload():
+            return UserWorkloadSerializer
+        return UserSerializer
+    
     def get_queryset(self):
         """
         Filter queryset based on user role
         """
         user = self.request.user
         if user.is_admin:
-            return User.objects.all()
+            queryset = User.objects.all()
         elif user.is_team_lead:
             # Team leads can see team members and reporters
-            return User.objects.filter(role__in=['team_member', 'reporter'])
+            queryset = User.objects.filter(role__in=['team_member', 'reporter'])
         else:
             # Team members and reporters can only see themselves
-            return User.objects.filter(id=user.id)
+            queryset = User.objects.filter(id=user.id)
+        
+        if self.include_workload():
+            queryset = queryset.prefetch_related('assignment_counters')
+        return queryset
     
     @action(detail=False, methods=['get'])
     def me(self, request):
         """
         Get current user profile
         """
-        serializer = UserSerializer(request.user)
+        serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
 
@@ -10,19 +10,19 @@ from .models import ValidationToken
 class ValidationTokenAdmin(admin.ModelAdmin):
     list_display = ('user', 'token_type', 'generated_date', 'expires_at', 'is_valid_display', 'used')
     list_filter = ('token_type', 'valid', 'used', 'generated_date')
-    search_fields = ('user__email', 'token')
+    search_fields = ('user__email', '=token_digest')
     ordering = ('-generated_date',)
     
     fieldsets = (
         ('Token Information', {
-            'fields': ('user', 'token_type', 'token')
+            'fields': ('user', 'token_type', 'token_digest')
         }),
         ('Status', {
             'fields': ('valid', 'used', 'generated_date', 'expires_at')
         }),
     )
     
-    readonly_fields = ('generated_date', 'expires_at')
+    readonly_fields = ('token_digest', 'generated_date', 'expires_at')
     
     def is_valid_display(self, obj):
         if obj.is_valid():
@@ -0,0 +1,16 @@
+"""
+authentication/management/commands/purge_validation_tokens.py
+"""
+from django.core.management.base import BaseCommand
+from authentication.models import ValidationToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and used validation tokens in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = ValidationToken.objects.purge(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} validation tokens'))
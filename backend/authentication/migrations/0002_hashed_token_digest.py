@@ -0,0 +1,44 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_tokens(apps, schema_editor):
+    ValidationToken = apps.get_model('authentication', 'ValidationToken')
+    batch = []
+    for token in ValidationToken.objects.only('id', 'token').iterator(chunk_size=1000):
+        token.token_digest = hashlib.sha256(token.token.encode()).hexdigest()
+        batch.append(token)
+        if len(batch) >= 1000:
+            ValidationToken.objects.bulk_update(batch, ['token_digest'])
+            batch = []
+    ValidationToken.objects.bulk_update(batch, ['token_digest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='validationtoken',
+            name='token_digest',
+            field=models.CharField(help_text='SHA-256 hex digest of the token', max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='validationtoken',
+            name='token_digest',
+            field=models.CharField(help_text='SHA-256 hex digest of the token', max_length=64, unique=True),
+        ),
+        migrations.RemoveField(
+            model_name='validationtoken',
+            name='token',
+        ),
+        migrations.AddIndex(
+            model_name='validationtoken',
+            index=models.Index(fields=['expires_at'], name='validationtoken_expiry_idx'),
+        ),
+    ]
@@ -1,18 +1,62 @@
 """
 authentication/models.py
 """
+import hashlib
+import secrets
 from django.db import models
 from django.utils import timezone
 from datetime import timedelta
 from accounts.models import User
 
 
+def hash_token(token):
+    """Return the fixed-length SHA-256 hex digest stored for a raw token"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class ValidationTokenManager(models.Manager):
+    def issue(self, user, token_type='password_reset'):
+        """
+        Create a token and return (instance, raw_token). Only the digest is stored,
+        so the raw token must be delivered to the user now.
+        """
+        raw_token = secrets.token_urlsafe(32)
+        instance = self.create(user=user, token_digest=hash_token(raw_token), token_type=token_type)
+        return instance, raw_token
+    
+    def get_valid(self, raw_token, token_types):
+        """
+        Look up an unused, unexpired token of one of the given types by digest
+        """
+        return self.select_related('user').filter(
+            token_digest=hash_token(raw_token),
+            token_type__in=token_types,
+            valid=True,
+            used=False,
+            expires_at__gt=timezone.now(),
+        ).first()
+    
+    def purge(self, batch_size=1000):
+        """
+        Delete expired, used and invalidated tokens in bounded batches
+        """
+        stale = self.filter(
+            models.Q(expires_at__lte=timezone.now()) | models.Q(used=True) | models.Q(valid=False)
+        )
+        deleted = 0
+        while True:
+            ids = list(stale.order_by().values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += self.filter(id__in=ids).delete()[0]
+
+
 class ValidationToken(models.Model):
     """
     Model for storing validation tokens (password reset, email verification, etc.)
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    token = models.CharField(max_length=512, unique=True, db_index=True)
+    token_digest = models.CharField(max_length=64, unique=True, help_text="SHA-256 hex digest of the token")
     token_type = models.CharField(
         max_length=20,
         choices=[
@@ -27,9 +71,14 @@ class ValidationToken(models.Model):
     valid = models.BooleanField(default=True)
     used = models.BooleanField(default=False)
     
+    objects = ValidationTokenManager()
+    
     class Meta:
         db_table = 'authentication_validationtoken'
         ordering = ['-generated_date']
+        indexes = [
+            models.Index(fields=['expires_at'], name='validationtoken_expiry_idx'),
+        ]
         verbose_name = 'Validation Token'
         verbose_name_plural = 'Validation Tokens'
     
@@ -45,10 +94,13 @@ class ValidationToken(models.Model):
         return self.valid and not self.used and not self.is_expired()
     
     def mark_as_used(self):
-        """Mark the token as used"""
+        """
+        Mark the token as used. Returns False if it was already consumed elsewhere.
+        """
+        consumed = ValidationToken.objects.filter(pk=self.pk, used=False, valid=True).update(used=True, valid=False)
         self.used = True
         self.valid = False
-        self.save()
+        return bool(consumed)
     
     def save(self, *args, **kwargs):
         if not self.expires_at:
@@ -0,0 +1,57 @@
+"""
+authentication/tasks.py
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from jobs.registry import enqueue, job
+from .models import ValidationToken
+
+User = get_user_model()
+
+
+@job(name='authentication.send_password_reset_email', max_attempts=5, timeout=60)
+def send_password_reset_email(email):
+    """
+    Issue a password reset token and queue the email carrying it. Delivery is a
+    separate job so a failed send retries with the same token rather than
+    issuing a new one per attempt.
+    """
+    user = User.objects.filter(email__iexact=email, is_active=True).first()
+    if user is None:
+        return
+
+    with transaction.atomic():
+        _token, raw_token = ValidationToken.objects.issue(user, 'password_reset')
+        enqueue(deliver_password_reset_email, user_id=user.id, raw_token=raw_token)
+
+
+@job(name='authentication.deliver_password_reset_email', max_attempts=5, timeout=60)
+def deliver_password_reset_email(user_id, raw_token):
+    """
+    Email the reset link for an already issued token
+    """
+    user = User.objects.filter(id=user_id, is_active=True).first()
+    if user is None:
+        return
+
+    reset_url = f"{settings.FRONTEND_URL}/reset-password?token={raw_token}"
+    send_mail(
+        subject='Reset your Scout password',
+        message=(
+            f"Hi {user.get_short_name() or user.email},\n\n"
+            f"Use the link below to reset your password. It expires in 24 hours.\n\n{reset_url}\n"
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[user.email],
+    )
+
+
+@job(name='authentication.purge_validation_tokens', every=timedelta(hours=1))
+def purge_validation_tokens(batch_size=1000):
+    """
+    Delete expired and used validation tokens
+    """
+    return ValidationToken.objects.purge(batch_size=batch_size)
@@ -1,3 +1,100 @@
-from django.test import TestCase
+import hashlib
+from datetime import timedelta
+from django.core import mail
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from jobs.models import Job
+from .models import ValidationToken
+from .tasks import deliver_password_reset_email, send_password_reset_email
 
-# Create your tests here.
+
+class PasswordResetTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='crew@example.com', password='old-pass-1234', role='team_member')
+        self.client = APIClient()
+
+    def confirm(self, raw_token, password='n3w-Passw0rd!'):
+        return self.client.post('/api/auth/password-reset-confirm/', {
+            'token': raw_token, 'new_password': password, 'confirm_password': password,
+        }, format='json')
+
+    def test_only_the_digest_is_stored(self):
+        token, raw_token = ValidationToken.objects.issue(self.user)
+        token.refresh_from_db()
+        self.assertEqual(token.token_digest, hashlib.sha256(raw_token.encode()).hexdigest())
+        stored = ValidationToken.objects.filter(pk=token.pk).values().get()
+        self.assertNotIn(raw_token, [str(value) for value in stored.values()])
+
+    def test_raw_token_resets_the_password(self):
+        token, raw_token = ValidationToken.objects.issue(self.user)
+        response = self.confirm(raw_token)
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('n3w-Passw0rd!'))
+        token.refresh_from_db()
+        self.assertTrue(token.used)
+
+    def test_digest_is_not_accepted_as_a_token(self):
+        token, _raw_token = ValidationToken.objects.issue(self.user)
+        self.assertEqual(self.confirm(token.token_digest).status_code, 400)
+
+    def test_used_token_is_rejected(self):
+        _token, raw_token = ValidationToken.objects.issue(self.user)
+        self.assertEqual(self.confirm(raw_token).status_code, 200)
+        self.assertEqual(self.confirm(raw_token, 'an0ther-Passw0rd!').status_code, 400)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('n3w-Passw0rd!'))
+
+    def test_expired_token_is_rejected(self):
+        token, raw_token = ValidationToken.objects.issue(self.user)
+        ValidationToken.objects.filter(pk=token.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.confirm(raw_token).status_code, 400)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('old-pass-1234'))
+
+
+class PasswordResetEmailTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='crew@example.com', password='pass', role='team_member')
+
+    def test_retried_delivery_sends_the_same_token(self):
+        send_password_reset_email('Crew@example.com')
+        self.assertEqual(ValidationToken.objects.filter(user=self.user).count(), 1)
+
+        delivery = Job.objects.get(name='authentication.deliver_password_reset_email')
+        deliver_password_reset_email(**delivery.kwargs)
+        deliver_password_reset_email(**delivery.kwargs)
+
+        self.assertEqual(ValidationToken.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].body, mail.outbox[1].body)
+        self.assertIsNotNone(ValidationToken.objects.get_valid(delivery.kwargs['raw_token'], ['password_reset']))
+
+
+class HashTokensMigrationTests(TransactionTestCase):
+    migrate_from = [('authentication', '0001_initial')]
+    migrate_to = [('authentication', '0002_hashed_token_digest')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_tokens_are_replaced_by_their_digest(self):
+        user = User.objects.create_user(email='crew@example.com', password='pass', role='team_member')
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        apps.get_model('authentication', 'ValidationToken').objects.create(
+            user_id=user.id, token='plaintext-token', expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+
+        token = ValidationToken.objects.get(user=user)
+        self.assertEqual(token.token_digest, hashlib.sha256(b'plaintext-token').hexdigest())
+        self.assertEqual(ValidationToken.objects.get_valid('plaintext-token', ['password_reset']), token)
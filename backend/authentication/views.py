@@ -8,7 +8,13 @@ from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth import get_user_model
-from .serializers import LoginSerializer, RegisterSerializer, PasswordResetSerializer
+from jobs.registry import enqueue
+from django.db import transaction
+from .models import ValidationToken
+from .serializers import (
+    LoginSerializer, RegisterSerializer, PasswordResetSerializer,
+    PasswordResetConfirmSerializer, EmailVerificationSerializer
+)
 
 User = get_user_model()
 
@@ -102,7 +108,8 @@ def password_reset_view(request):
     """
     serializer = PasswordResetSerializer(data=request.data)
     if serializer.is_valid():
-        # TODO: Implement password reset logic
+        # Token creation and email delivery run on a background worker
+        enqueue('authentication.send_password_reset_email', email=serializer.validated_data['email'])
         return Response({'message': 'Password reset email sent'})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -113,7 +120,31 @@ def password_reset_confirm_view(request):
     """
     Password reset confirmation view
     """
-    # TODO: Implement password reset confirmation logic
+    serializer = PasswordResetConfirmSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    token = ValidationToken.objects.get_valid(serializer.validated_data['token'], ['password_reset'])
+    if token is None:
+        return Response(
+            {'error': 'Invalid or expired token'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    with transaction.atomic():
+        if not token.mark_as_used():
+            return Response(
+                {'error': 'Invalid or expired token'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        user = token.user
+        user.set_password(serializer.validated_data['new_password'])
+        user.save(update_fields=['password', 'updated_at'])
+        
+        # Invalidate other outstanding reset tokens and sign out existing sessions
+        ValidationToken.objects.filter(user=user, token_type='password_reset', valid=True).update(valid=False)
+        Token.objects.filter(user=user).delete()
+    
     return Response({'message': 'Password reset confirmed'})
 
 
@@ -123,5 +154,21 @@ def email_verification_view(request):
     """
     Email verification view
     """
-    # TODO: Implement email verification logic
+    serializer = EmailVerificationSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    token = ValidationToken.objects.get_valid(
+        serializer.validated_data['token'], ['email_verification', 'account_activation']
+    )
+    if token is None or not token.mark_as_used():
+        return Response(
+            {'error': 'Invalid or expired token'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if token.token_type == 'account_activation' and not token.user.is_active:
+        token.user.is_active = True
+        token.user.save(update_fields=['is_active', 'updated_at'])
+    
     return Response({'message': 'Email verified'})
\ No newline at end of file
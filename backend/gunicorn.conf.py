@@ -0,0 +1,47 @@
+"""
+gunicorn.conf.py
+
+Production serving config. The app is imported once in the master and workers
+are forked from it, so a new worker (or a new container that scaled out) only
+pays for the fork instead of the full Django setup.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'scout.wsgi:application'
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+preload_app = True
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 20
+keepalive = 5
+
+# Recycle workers now and then; the jitter keeps them from restarting together
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """
+    Import the URLconf and every view in the master so forked workers serve
+    their first request without importing anything
+    """
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    server.log.info('URLconf preloaded')
+
+
+def post_fork(server, worker):
+    """
+    Connections opened in the master must not be shared between workers
+    """
+    from django.core.cache import caches
+    from django.db import connections
+    connections.close_all()
+    caches.close_all()
@@ -0,0 +1,14 @@
+"""
+jobs/admin.py
+"""
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'unique_key')
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_until', 'last_error')
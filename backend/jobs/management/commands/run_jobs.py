@@ -0,0 +1,31 @@
+"""
+jobs/management/commands/run_jobs.py
+"""
+import signal
+from django.core.management.base import BaseCommand
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run a background job worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run in parallel by this worker')
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                            help='Run jobs on a thread pool or a process pool')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when no job is due')
+        parser.add_argument('--once', action='store_true', help='Claim one round of jobs, wait for them and exit')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            mode=options['mode'],
+            poll_interval=options['poll_interval'],
+        )
+        # Finish running jobs on SIGTERM/SIGINT instead of abandoning them
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        signal.signal(signal.SIGINT, lambda *_: worker.stop())
+
+        self.stdout.write(f'Worker {worker.worker_id} started ({options["mode"]} x {options["concurrency"]})')
+        worker.run(once=options['once'])
+        self.stdout.write('Worker stopped')
@@ -0,0 +1,78 @@
+"""
+jobs/registry.py
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+_jobs = {}
+_schedules = {}
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    name: str
+    func: object
+    max_attempts: int
+    timeout: int
+
+
+@dataclass(frozen=True)
+class Schedule:
+    name: str
+    every: timedelta
+    kwargs: dict
+
+
+def job(name=None, max_attempts=3, timeout=300, every=None):
+    """
+    Register a function as a background job.
+
+    timeout is the visibility timeout in seconds: an attempt still running after
+    it is assumed dead and the job becomes claimable again. Pass every=timedelta
+    to also run the job periodically.
+    """
+    def decorator(func):
+        job_name = name or f'{func.__module__}.{func.__name__}'
+        _jobs[job_name] = JobSpec(job_name, func, max_attempts, timeout)
+        if every is not None:
+            _schedules[job_name] = Schedule(job_name, every, {})
+        func.job_name = job_name
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Import every installed app's tasks module so its jobs register"""
+    autodiscover_modules('tasks')
+
+
+def get_job(name):
+    if name not in _jobs:
+        autodiscover()
+    return _jobs[name]
+
+
+def schedules():
+    return list(_schedules.values())
+
+
+def enqueue(name, run_at=None, priority=0, unique_key=None, **kwargs):
+    """
+    Queue a job by name. The row is written in the caller's transaction, so the
+    job only becomes visible to workers if that transaction commits.
+    """
+    from .models import Job
+
+    if callable(name):
+        name = name.job_name
+    max_attempts = _jobs[name].max_attempts if name in _jobs else 3
+    return Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        run_at=run_at or timezone.now(),
+        priority=priority,
+        max_attempts=max_attempts,
+        unique_key=unique_key,
+    )
@@ -0,0 +1,23 @@
+"""
+jobs/tasks.py
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import Job
+from .registry import job
+
+
+@job(name='jobs.purge_finished', every=timedelta(hours=1))
+def purge_finished(batch_size=1000):
+    """
+    Delete finished jobs past the retention window in bounded batches
+    """
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'JOBS_RETENTION_DAYS', 7))
+    finished = Job.objects.filter(status__in=['succeeded', 'failed'], finished_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(finished.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Job.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,90 @@
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
+from django.test import TransactionTestCase
+from django.utils import timezone
+from .models import Job
+from .registry import autodiscover, enqueue, job, schedules
+from .worker import Worker
+
+
+@job(name='jobs.tests.always_fails', max_attempts=2)
+def always_fails():
+    raise RuntimeError('boom')
+
+
+def failed_future():
+    future = Future()
+    future.set_exception(RuntimeError('boom'))
+    return future
+
+
+class WorkerTests(TransactionTestCase):
+    def worker(self, worker_id):
+        worker = Worker(retry_backoff=0)
+        worker.worker_id = worker_id
+        return worker
+
+    def test_two_workers_never_claim_the_same_job(self):
+        for _ in range(10):
+            enqueue('jobs.tests.always_fails')
+        first, second = self.worker('a'), self.worker('b')
+
+        claimed = []
+        for _ in range(6):
+            claimed += [job.id for job in first.claim(1)]
+            claimed += [job.id for job in second.claim(1)]
+
+        self.assertEqual(len(claimed), 10)
+        self.assertEqual(len(set(claimed)), 10)
+        self.assertEqual(first.claim(10) + second.claim(10), [])
+
+    def test_job_fails_after_its_last_attempt(self):
+        queued = enqueue(always_fails)
+        worker = self.worker('a')
+
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            [claimed] = worker.claim(1)
+            worker._finish(claimed, failed_future())
+        self.assertEqual(Job.objects.get(id=queued.id).status, 'queued')
+
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            [claimed] = worker.claim(1)
+            worker._finish(claimed, failed_future())
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+        self.assertEqual(queued.attempts, 2)
+        self.assertIn('boom', queued.last_error)
+        self.assertEqual(worker.claim(1), [])
+
+    def test_timed_out_job_fails_after_its_last_attempt(self):
+        Job.objects.create(
+            name='jobs.tests.always_fails', status='running', attempts=3, max_attempts=3,
+            locked_by='gone:1', locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertEqual(self.worker('a').claim(1), [])
+        self.assertEqual(Job.objects.get().status, 'failed')
+
+    def test_periodic_slot_is_enqueued_once_across_workers(self):
+        autodiscover()
+        now = timezone.now()
+        with mock.patch('jobs.worker.timezone.now', return_value=now):
+            self.worker('a').schedule_periodic()
+            self.worker('b').schedule_periodic()
+
+        self.assertGreater(len(schedules()), 0)
+        self.assertEqual(Job.objects.count(), len(schedules()))
+
+    def test_periodic_slot_race_on_insert_keeps_one_job(self):
+        autodiscover()
+        now = timezone.now()
+        first = self.worker('a')
+        with mock.patch('jobs.worker.timezone.now', return_value=now):
+            first.schedule_periodic()
+            # The second worker's existence check misses the rows the first just wrote
+            with mock.patch.object(Job.objects, 'filter', return_value=Job.objects.none()):
+                self.worker('b').schedule_periodic()
+
+        self.assertEqual(Job.objects.count(), len(schedules()))
@@ -0,0 +1,176 @@
+"""
+jobs/worker.py
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from . import registry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def execute_job(name, kwargs):
+    """
+    Run a registered job function. Module level so process pools can pickle it.
+    """
+    try:
+        return registry.get_job(name).func(**kwargs)
+    finally:
+        connections.close_all()
+
+
+def _init_process():
+    import django
+    django.setup()
+
+
+class Worker:
+    """
+    Polls the jobs table, claims due jobs with SKIP LOCKED and runs them on a
+    thread or process pool. Scaling out is a matter of starting more workers.
+    """
+    def __init__(self, concurrency=4, mode='thread', poll_interval=1.0, retry_backoff=30):
+        self.concurrency = concurrency
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self._running = set()
+        self._scheduled_slots = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self, once=False):
+        registry.autodiscover()
+        # Forked pool processes must not share the parent's database connections
+        connections.close_all()
+        if self.mode == 'process':
+            pool = ProcessPoolExecutor(max_workers=self.concurrency, initializer=_init_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=self.concurrency)
+
+        try:
+            while not self._stopping.is_set():
+                self.schedule_periodic()
+                claimed = self.claim(self.concurrency - len(self._running))
+                for job in claimed:
+                    self._start(pool, job)
+                if once:
+                    break
+                if not claimed:
+                    self._stopping.wait(self.poll_interval)
+        finally:
+            pool.shutdown(wait=True)
+
+    def schedule_periodic(self):
+        """
+        Enqueue one run per periodic job per interval. The unique key makes
+        concurrent workers agree on a single row per slot. Slots this worker
+        already saw enqueued are skipped without a query, and the rest are
+        checked in one query before inserting.
+        """
+        now = timezone.now()
+        due = {}
+        for schedule in registry.schedules():
+            slot = int(now.timestamp() // schedule.every.total_seconds())
+            if self._scheduled_slots.get(schedule.name) != slot:
+                due[f'{schedule.name}:{slot}'] = (schedule, slot)
+        if not due:
+            return
+
+        existing = set(Job.objects.filter(unique_key__in=due).values_list('unique_key', flat=True))
+        for unique_key, (schedule, slot) in due.items():
+            if unique_key not in existing:
+                try:
+                    with transaction.atomic():
+                        registry.enqueue(schedule.name, unique_key=unique_key, **schedule.kwargs)
+                except IntegrityError:
+                    # Another worker enqueued the same slot first
+                    pass
+            self._scheduled_slots[schedule.name] = slot
+
+    def claim(self, limit):
+        """
+        Claim up to limit due jobs, including running jobs whose visibility timeout
+        expired. Expired jobs that already used all their attempts, because they
+        crashed the worker or kept timing out, are marked failed instead.
+        """
+        if limit <= 0:
+            return []
+        now = timezone.now()
+        with transaction.atomic():
+            due = Job.objects.filter(
+                Q(status='queued', run_at__lte=now) |
+                Q(status='running', locked_until__lt=now)
+            ).order_by('-priority', 'run_at', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            jobs = list(due[:limit])
+
+            exhausted = [job for job in jobs if job.status == 'running' and job.attempts >= job.max_attempts]
+            jobs = [job for job in jobs if job not in exhausted]
+            for job in exhausted:
+                logger.error('Job %s (%s) timed out on its last attempt, giving up', job.id, job.name)
+                job.status = 'failed'
+                job.finished_at = now
+                job.locked_until = None
+                job.last_error = f'Timed out or lost its worker ({job.locked_by}) after {job.attempts} attempts'
+            Job.objects.bulk_update(exhausted, ['status', 'finished_at', 'locked_until', 'last_error'])
+
+            for job in jobs:
+                timeout = self._timeout(job.name)
+                job.status = 'running'
+                job.attempts += 1
+                job.locked_by = self.worker_id
+                job.locked_until = now + timedelta(seconds=timeout)
+            Job.objects.bulk_update(jobs, ['status', 'attempts', 'locked_by', 'locked_until'])
+        return jobs
+
+    def _timeout(self, name):
+        try:
+            return registry.get_job(name).timeout
+        except KeyError:
+            return 300
+
+    def _start(self, pool, job):
+        with self._lock:
+            self._running.add(job.id)
+        future = pool.submit(execute_job, job.name, job.kwargs)
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+
+    def _finish(self, job, future):
+        try:
+            error = future.exception()
+            mine = Job.objects.filter(id=job.id, locked_by=self.worker_id, attempts=job.attempts)
+            if error is None:
+                mine.update(status='succeeded', finished_at=timezone.now(), locked_until=None, last_error='')
+            elif job.attempts < job.max_attempts:
+                logger.warning('Job %s (%s) failed, retrying: %s', job.id, job.name, error)
+                delay = self.retry_backoff * 2 ** (job.attempts - 1)
+                mine.update(
+                    status='queued', run_at=timezone.now() + timedelta(seconds=delay),
+                    locked_until=None, last_error=self._format(error)
+                )
+            else:
+                logger.error('Job %s (%s) failed permanently: %s', job.id, job.name, error)
+                mine.update(status='failed', finished_at=timezone.now(), locked_until=None,
+                            last_error=self._format(error))
+        finally:
+            connections.close_all()
+            with self._lock:
+                self._running.discard(job.id)
+
+    @staticmethod
+    def _format(error):
+        return ''.join(traceback.format_exception(type(error), error, error.__traceback__))[-5000:]
@@ -1,54 +1,242 @@
 """
 locations/admin.py
 """
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import SEARCH_VAR
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import Location, LocationUpdate
+from accounts.models import User
+from scout.db_routers import ReplicaChangelistMixin
+from .bulk import bulk_create_location_updates, bulk_update_locations
+from .models import Location, LocationUpdate, LocationReport
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reads the planner's row estimate for unfiltered PostgreSQL
+    changelists instead of running COUNT(*) over the whole table
+    """
+    exact_count_below = 100000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[self.object_list.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                        [self.object_list.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] >= self.exact_count_below:
+                    return row[0]
+        return super().count
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter rendered as a text box instead of one link per distinct value
+    """
+    template = 'admin/input_filter.html'
+    placeholder = ''
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        others = {
+            name: values for name, values in changelist.filter_params.items()
+            if name != self.parameter_name
+        }
+        if changelist.query:
+            others[SEARCH_VAR] = [changelist.query]
+        yield {
+            'parameter_name': self.parameter_name,
+            'value': self.value(),
+            'placeholder': self.placeholder,
+            'query_parts': [(name, value) for name, values in others.items() for value in values],
+            'clear_query_string': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+
+def user_input_filter(field_name, title):
+    """
+    Build an InputFilter matching a user foreign key by email or user ID
+    """
+    class UserInputFilter(InputFilter):
+        parameter_name = f'{field_name}_user'
+        placeholder = 'Email or user ID'
+
+        def queryset(self, request, queryset):
+            value = (self.value() or '').strip()
+            if not value:
+                return queryset
+            users = User.objects.filter(Q(email__iexact=value) | Q(id=value)).values('id')
+            return queryset.filter(**{f'{field_name}__in': users})
+
+    UserInputFilter.title = title
+    return UserInputFilter
+
+
+class CityInputFilter(InputFilter):
+    title = 'city'
+    parameter_name = 'city'
+    placeholder = 'City'
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if value:
+            return queryset.filter(city__iexact=value)
+        return queryset
+
+
+class LimitedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset that only loads the newest max_rows related objects
+    """
+    max_rows = 20
+
+    def get_queryset(self):
+        if not hasattr(self, '_limited_queryset'):
+            self._limited_queryset = super().get_queryset()[:self.max_rows]
+        return self._limited_queryset
 
 
 class LocationUpdateInline(admin.TabularInline):
     model = LocationUpdate
+    formset = LimitedInlineFormSet
     extra = 0
+    ordering = ('-created_at',)
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('updated_by',)
     fields = ('update_type', 'notes', 'updated_by', 'created_at')
+    verbose_name_plural = f'Location updates (latest {LimitedInlineFormSet.max_rows})'
+
+
+class LocationReportInline(admin.TabularInline):
+    model = LocationReport
+    formset = LimitedInlineFormSet
+    extra = 0
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at',)
+    autocomplete_fields = ('reported_by',)
+    fields = ('reported_by', 'reporter_email', 'reporter_phone', 'description', 'estimated_customers_affected', 'created_at')
+    verbose_name_plural = f'Location reports (latest {LimitedInlineFormSet.max_rows})'
 
 
 @admin.register(Location)
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('name', 'city', 'state', 'status', 'priority', 'assigned_to', 'reported_at', 'created_at')
-    list_filter = ('status', 'priority', 'state', 'city', 'assigned_to', 'reported_by', 'created_at')
-    search_fields = ('name', 'address', 'city', 'state', 'zip_code')
+    list_filter = (
+        'status', 'priority', 'state', CityInputFilter,
+        user_input_filter('assigned_to', 'assigned to'),
+        user_input_filter('reported_by', 'reported by'),
+        'created_at',
+    )
+    # Prefix and exact matches only, served by the UPPER(...) indexes from migration 0008
+    search_fields = ('^name', '^address', '^city', '=state', '=zip_code')
     ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = ('assigned_to', 'reported_by')
+    actions = ['mark_investigating', 'mark_in_progress', 'mark_resolved', 'mark_critical']
     
     fieldsets = (
         ('Location Information', {
-            'fields': ('name', 'address', 'city', 'state', 'zip_code', 'latitude', 'longitude')
+            'fields': ('name', 'address', 'city', 'state', 'zip_code', 'latitude', 'longitude', 'geocoded')
         }),
         ('Outage Details', {
             'fields': ('status', 'priority', 'description', 'estimated_customers_affected')
         }),
         ('Assignment', {
-            'fields': ('assigned_to', 'reported_by', 'reporter_contact')
+            'fields': ('assigned_to', 'reported_by', 'reporter_email', 'reporter_phone')
         }),
         ('Timestamps', {
-            'fields': ('reported_at', 'estimated_restoration', 'actual_restoration'),
+            'fields': ('reported_at', 'estimated_restoration', 'restoration_predicted', 'actual_restoration'),
             'classes': ('collapse',)
         }),
     )
     
-    readonly_fields = ('created_at', 'updated_at')
-    inlines = [LocationUpdateInline]
+    readonly_fields = ('created_at', 'updated_at', 'geocoded', 'restoration_predicted')
+    inlines = [LocationReportInline, LocationUpdateInline]
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('assigned_to', 'reported_by')
+    
+    def save_model(self, request, obj, form, change):
+        # Hand-entered coordinates replace the zip centroid
+        if 'latitude' in form.changed_data or 'longitude' in form.changed_data:
+            obj.geocoded = False
+        # A hand-entered estimate is kept instead of being rescored by the ETA model
+        if 'estimated_restoration' in form.changed_data:
+            obj.restoration_predicted = False
+        super().save_model(request, obj, form, change)
+    
+    def _bulk_set(self, request, queryset, field, value, update_type):
+        """
+        Change one field on the selected locations with a single bulk_update
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            # The changelist joins the nullable assigned_to, which PostgreSQL refuses to lock
+            locations = list(queryset.select_for_update(of=('self',)).exclude(**{field: value}))
+            updates = []
+            fields = [field]
+            for location in locations:
+                previous = getattr(location, field)
+                setattr(location, field, value)
+                if field == 'status' and value == 'resolved' and not location.actual_restoration:
+                    location.actual_restoration = now
+                updates.append(LocationUpdate(
+                    location=location,
+                    updated_by=request.user,
+                    update_type=update_type,
+                    previous_status=previous if field == 'status' else '',
+                    new_status=value if field == 'status' else '',
+                    notes=f'{field.capitalize()} changed from {previous} to {value} in admin',
+                ))
+            if field == 'status' and value == 'resolved':
+                fields.append('actual_restoration')
+            bulk_update_locations(locations, fields)
+            bulk_create_location_updates(updates)
+        self.message_user(request, f'Updated {len(locations)} location(s).', messages.SUCCESS)
+    
+    @admin.action(description='Mark selected locations as investigating')
+    def mark_investigating(self, request, queryset):
+        self._bulk_set(request, queryset, 'status', 'investigating', 'status_change')
+    
+    @admin.action(description='Mark selected locations as in progress')
+    def mark_in_progress(self, request, queryset):
+        self._bulk_set(request, queryset, 'status', 'in_progress', 'status_change')
+    
+    @admin.action(description='Mark selected locations as resolved')
+    def mark_resolved(self, request, queryset):
+        self._bulk_set(request, queryset, 'status', 'resolved', 'status_change')
+    
+    @admin.action(description='Set priority of selected locations to critical')
+    def mark_critical(self, request, queryset):
+        self._bulk_set(request, queryset, 'priority', 'critical', 'priority_change')
 
 
 @admin.register(LocationUpdate)
-class LocationUpdateAdmin(admin.ModelAdmin):
+class LocationUpdateAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('location', 'update_type', 'updated_by', 'created_at')
-    list_filter = ('update_type', 'created_at', 'updated_by')
-    search_fields = ('location__name', 'notes')
+    list_filter = ('update_type', 'created_at', user_input_filter('updated_by', 'updated by'))
+    search_fields = ('^location__name',)
     ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    autocomplete_fields = ('location', 'updated_by')
     
     fieldsets = (
         ('Update Information', {
@@ -0,0 +1,140 @@
+"""
+locations/batching.py
+"""
+import logging
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, router, transaction
+from .bulk import bulk_create_location_updates, send_post_save
+from .models import Location
+
+logger = logging.getLogger(__name__)
+
+
+class PendingCreate:
+    """A location waiting to be written by the coalescer, and its outcome"""
+    __slots__ = ('location', 'update', 'done', 'error', 'state')
+
+    def __init__(self, location, update):
+        self.location = location
+        self.update = update
+        self.done = threading.Event()
+        self.error = None
+        # queued -> writing once a flush takes it, or queued -> cancelled on timeout
+        self.state = 'queued'
+
+
+class CreateCoalescer:
+    """
+    Collects location creates that arrive within window_ms of each other in this
+    process and writes them in one transaction: one bulk_create for the
+    locations and one for their initial updates. bulk_create does not send
+    post_save, so the signals are sent by hand for the workload counters, the
+    in-memory indexes and the outbox.
+
+    If the batch fails, each create is retried on its own so a bad row only
+    fails its own request.
+    """
+    def __init__(self, window_ms=5, max_batch=100, timeout=30):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, location, update):
+        """
+        Queue an unsaved location and its initial update, wait for the flush
+        and return the saved location. Raises the error the write hit, if any.
+
+        If no flush has taken the create within the timeout it is withdrawn and
+        TimeoutError is raised, so a create reported as failed is never written
+        later. Once a flush has it, the outcome of that flush is returned.
+        """
+        self._ensure_started()
+        pending = PendingCreate(location, update)
+        self._queue.put(pending)
+        if not pending.done.wait(self.timeout):
+            with self._state_lock:
+                if pending.state == 'queued':
+                    pending.state = 'cancelled'
+            if pending.state == 'cancelled':
+                raise TimeoutError('Timed out waiting for batched location create')
+            pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.location
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='location-create-coalescer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            with self._state_lock:
+                batch = [pending for pending in batch if pending.state == 'queued']
+                for pending in batch:
+                    pending.state = 'writing'
+            if not batch:
+                continue
+
+            close_old_connections()
+            try:
+                self.flush(batch)
+            except Exception:
+                logger.exception('Batched location create failed, retrying individually')
+                for pending in batch:
+                    try:
+                        self.flush([pending])
+                    except Exception as exc:
+                        pending.error = exc
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+    def flush(self, batch):
+        using = router.db_for_write(Location) or DEFAULT_DB_ALIAS
+        with transaction.atomic(using=using):
+            locations = Location.objects.using(using).bulk_create([pending.location for pending in batch])
+            send_post_save(Location, locations, created=True, using=using)
+            for pending in batch:
+                pending.update.location = pending.location
+            bulk_create_location_updates([pending.update for pending in batch])
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def create_coalescer():
+    """
+    The process-wide coalescer, or None when LOCATION_CREATE_BATCH_WINDOW_MS is 0
+    """
+    global _coalescer
+    window_ms = getattr(settings, 'LOCATION_CREATE_BATCH_WINDOW_MS', 0)
+    if not window_ms:
+        return None
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = CreateCoalescer(
+                window_ms=window_ms,
+                max_batch=getattr(settings, 'LOCATION_CREATE_BATCH_MAX', 100),
+            )
+        return _coalescer
@@ -0,0 +1,41 @@
+"""
+locations/bulk.py
+"""
+from django.db import DEFAULT_DB_ALIAS, router
+from django.db.models.signals import post_save
+from django.utils import timezone
+from .models import Location, LocationUpdate
+
+
+def send_post_save(model, instances, created, using, update_fields=None):
+    """
+    bulk_create and bulk_update skip post_save. Send it for each instance so the
+    workload counters, in-memory indexes and outbox see bulk writes too.
+    """
+    for instance in instances:
+        post_save.send(
+            model, instance=instance, created=created, update_fields=update_fields, raw=False, using=using
+        )
+
+
+def bulk_update_locations(locations, fields, batch_size=500):
+    """
+    Write fields of already modified locations with bulk_update, bumping each
+    version like Location.save() does. Load the locations with
+    select_for_update() in the same transaction so no version is skipped.
+    """
+    using = router.db_for_write(Location) or DEFAULT_DB_ALIAS
+    now = timezone.now()
+    for location in locations:
+        location.version += 1
+        location.updated_at = now
+    update_fields = [*fields, 'version', 'updated_at']
+    Location.objects.using(using).bulk_update(locations, update_fields, batch_size=batch_size)
+    send_post_save(Location, locations, created=False, using=using, update_fields=frozenset(update_fields))
+
+
+def bulk_create_location_updates(updates, batch_size=500):
+    using = router.db_for_write(LocationUpdate) or DEFAULT_DB_ALIAS
+    updates = LocationUpdate.objects.using(using).bulk_create(updates, batch_size=batch_size)
+    send_post_save(LocationUpdate, updates, created=True, using=using)
+    return updates
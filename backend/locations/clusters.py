@@ -0,0 +1,192 @@
+"""
+locations/clusters.py
+"""
+import math
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+# Cell slots: count, customers, latitude sum, longitude sum, then one count per priority rank
+COUNT, CUSTOMERS, LAT_SUM, LON_SUM = range(4)
+PRIORITY_OFFSET = 4
+
+
+class ClusterPyramid:
+    """
+    Per-process multi-resolution grid of open outages for map clustering.
+
+    Each zoom level splits the Web Mercator world into 2**(zoom + subdivision)
+    square cells per side, i.e. 2**subdivision cells per map tile. Every open
+    located outage is counted in one cell per level, so a viewport query only
+    touches the cells it covers. Like the impact rollup, the pyramid is kept
+    current from location signals and rebuilt in the background periodically.
+    """
+    def __init__(self, max_zoom=None, subdivision=None):
+        self._lock = threading.RLock()
+        self._max_zoom = max_zoom
+        self._subdivision = subdivision
+        self._levels = None
+        self._built_at = 0.0
+        self._reconciling = False
+
+    @property
+    def max_zoom(self):
+        if self._max_zoom is not None:
+            return self._max_zoom
+        return getattr(settings, 'CLUSTER_MAX_ZOOM', 16)
+
+    @property
+    def subdivision(self):
+        if self._subdivision is not None:
+            return self._subdivision
+        return getattr(settings, 'CLUSTER_TILE_SUBDIVISION', 2)
+
+    def build(self):
+        """
+        Rebuild every level from the database
+        """
+        from .models import Location
+
+        rows = (
+            Location.objects.filter(
+                status__in=Location.OPEN_STATUSES, latitude__isnull=False, longitude__isnull=False
+            )
+            .order_by()
+            .values_list('latitude', 'longitude', 'priority', 'estimated_customers_affected')
+        )
+        levels = [{} for _ in range(self.max_zoom + 1)]
+        for latitude, longitude, priority, customers in rows.iterator(chunk_size=5000):
+            self._add(levels, float(latitude), float(longitude), priority, customers or 0, 1)
+
+        with self._lock:
+            self._levels = levels
+            self._built_at = time.monotonic()
+
+    def apply(self, old, new):
+        """
+        Apply the change between two location snapshots (either may be None)
+        """
+        with self._lock:
+            if self._levels is None:
+                return
+            if self._counted(old):
+                self._add(self._levels, float(old['latitude']), float(old['longitude']),
+                          old['priority'], old['estimated_customers_affected'] or 0, -1)
+            if self._counted(new):
+                self._add(self._levels, float(new['latitude']), float(new['longitude']),
+                          new['priority'], new['estimated_customers_affected'] or 0, 1)
+
+    def clusters(self, west, south, east, north, zoom):
+        """
+        Return the clusters inside a bounding box at a zoom level. A box with
+        west > east crosses the antimeridian.
+        """
+        self._ensure_fresh()
+        from .models import Location
+
+        zoom = max(0, min(int(zoom), self.max_zoom))
+        size = 2 ** (zoom + self.subdivision)
+        x_min, y_max = self._cell(south, west, size)
+        x_max, y_min = self._cell(north, east, size)
+        x_ranges = [(x_min, x_max)] if x_min <= x_max else [(x_min, size - 1), (0, x_max)]
+        ranks = sorted(Location.PRIORITY_RANKS.items(), key=lambda item: item[1])
+
+        results = []
+        with self._lock:
+            level = self._levels[zoom]
+            covered = sum(x_hi - x_lo + 1 for x_lo, x_hi in x_ranges) * (y_max - y_min + 1)
+            # Walk whichever is smaller: the cells in the box or the occupied cells
+            if covered <= len(level):
+                cells = (
+                    ((x, y), level.get((x, y)))
+                    for x_lo, x_hi in x_ranges for x in range(x_lo, x_hi + 1)
+                    for y in range(y_min, y_max + 1)
+                )
+            else:
+                cells = (
+                    (cell, values) for cell, values in level.items()
+                    if y_min <= cell[1] <= y_max and any(x_lo <= cell[0] <= x_hi for x_lo, x_hi in x_ranges)
+                )
+            for (x, y), values in cells:
+                if not values:
+                    continue
+                count = values[COUNT]
+                max_priority = next(
+                    (name for name, rank in reversed(ranks) if values[PRIORITY_OFFSET + rank - 1] > 0), None
+                )
+                results.append({
+                    'cell': f'{zoom}/{x}/{y}',
+                    'latitude': round(values[LAT_SUM] / count, 6),
+                    'longitude': round(values[LON_SUM] / count, 6),
+                    'count': count,
+                    'max_priority': max_priority,
+                    'customers_affected': values[CUSTOMERS],
+                })
+        return results
+
+    def _ensure_fresh(self):
+        if self._levels is None:
+            self.build()
+            return
+
+        interval = getattr(settings, 'CLUSTER_PYRAMID_RECONCILE_SECONDS', 300)
+        with self._lock:
+            if self._reconciling or time.monotonic() - self._built_at < interval:
+                return
+            self._reconciling = True
+        threading.Thread(target=self._reconcile, daemon=True).start()
+
+    def _reconcile(self):
+        try:
+            self.build()
+        finally:
+            self._reconciling = False
+            connections.close_all()
+
+    @staticmethod
+    def _counted(snapshot):
+        from .models import Location
+        return (
+            snapshot is not None
+            and snapshot['status'] in Location.OPEN_STATUSES
+            and snapshot['latitude'] is not None
+            and snapshot['longitude'] is not None
+        )
+
+    @staticmethod
+    def _cell(latitude, longitude, size):
+        """Web Mercator cell (x, y) containing a point on a size x size grid"""
+        latitude = max(-MAX_MERCATOR_LATITUDE, min(MAX_MERCATOR_LATITUDE, latitude))
+        x = (longitude + 180.0) / 360.0 * size
+        sin_lat = math.sin(math.radians(latitude))
+        y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * size
+        return min(size - 1, max(0, int(x))), min(size - 1, max(0, int(y)))
+
+    def _add(self, levels, latitude, longitude, priority, customers, sign):
+        from .models import Location
+
+        rank = Location.PRIORITY_RANKS.get(priority, 2)
+        # Cells nest, so coarser levels are the deepest cell shifted right
+        deepest = len(levels) - 1
+        x, y = self._cell(latitude, longitude, 2 ** (deepest + self.subdivision))
+        for zoom, level in enumerate(levels):
+            shift = deepest - zoom
+            cell = (x >> shift, y >> shift)
+            values = level.get(cell)
+            if values is None:
+                if sign < 0:
+                    continue
+                values = level[cell] = [0] * (PRIORITY_OFFSET + len(Location.PRIORITY_RANKS))
+            values[COUNT] += sign
+            values[CUSTOMERS] += sign * customers
+            values[LAT_SUM] += sign * latitude
+            values[LON_SUM] += sign * longitude
+            values[PRIORITY_OFFSET + rank - 1] += sign
+            if values[COUNT] <= 0:
+                del level[cell]
+
+
+cluster_pyramid = ClusterPyramid()
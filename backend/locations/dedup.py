@@ -0,0 +1,239 @@
+"""
+locations/dedup.py
+"""
+import math
+import re
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+
+METERS_PER_DEGREE = 111320.0
+
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'drive': 'dr',
+    'boulevard': 'blvd', 'lane': 'ln', 'court': 'ct', 'place': 'pl',
+    'highway': 'hwy', 'parkway': 'pkwy', 'circle': 'cir', 'terrace': 'ter',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+    'apartment': 'apt', 'suite': 'ste',
+}
+
+
+def normalize_address(address):
+    """Lowercase, strip punctuation and abbreviate common street words"""
+    words = re.sub(r'[^a-z0-9 ]+', ' ', (address or '').lower()).split()
+    return ' '.join(ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def normalize_zip(zip_code):
+    return re.sub(r'\D', '', zip_code or '')[:5]
+
+
+def haversine_meters(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * 6371000.0 * math.asin(math.sqrt(a))
+
+
+class DuplicateIndex:
+    """
+    Per-process blocking index of active outages used to spot duplicate reports.
+
+    Outages are blocked two ways: by normalized address plus 5-digit zip, and by
+    a lat/lon grid whose cells are as wide as the match radius, so a lookup only
+    inspects one dict entry or a handful of neighbouring cells.
+    """
+    def __init__(self, radius_meters=None):
+        self._lock = threading.RLock()
+        self._radius_meters = radius_meters
+        self._built = False
+        self._built_at = 0.0
+        self._rebuilding = False
+        self._by_address = {}
+        self._by_cell = {}
+        self._entries = {}
+
+    @property
+    def radius_meters(self):
+        if self._radius_meters is not None:
+            return self._radius_meters
+        return getattr(settings, 'DUPLICATE_REPORT_RADIUS_METERS', 75)
+
+    @property
+    def cell_degrees(self):
+        return self.radius_meters / METERS_PER_DEGREE
+
+    def build(self):
+        """
+        Load every active outage from the database and swap it in
+        """
+        from .models import Location
+
+        rows = (
+            Location.objects.filter(status__in=Location.OPEN_STATUSES)
+            .order_by()
+            .values_list('id', 'address', 'zip_code', 'latitude', 'longitude', 'geocoded')
+        )
+        fresh = DuplicateIndex(radius_meters=self.radius_meters)
+        for location_id, address, zip_code, latitude, longitude, geocoded in rows.iterator(chunk_size=5000):
+            fresh.add(location_id, address, zip_code, latitude, longitude, geocoded)
+
+        with self._lock:
+            self._by_address = fresh._by_address
+            self._by_cell = fresh._by_cell
+            self._entries = fresh._entries
+            self._built_at = time.monotonic()
+            self._built = True
+
+    def clear(self):
+        with self._lock:
+            self._by_address.clear()
+            self._by_cell.clear()
+            self._entries.clear()
+
+    def ensure_built(self):
+        """
+        Build on first use and rebuild in the background once the index is stale
+        """
+        if not self._built:
+            self.build()
+            return
+
+        interval = getattr(settings, 'DUPLICATE_INDEX_RECONCILE_SECONDS', 60)
+        with self._lock:
+            if self._rebuilding or time.monotonic() - self._built_at < interval:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self.build()
+        finally:
+            self._rebuilding = False
+            connections.close_all()
+
+    def add(self, location_id, address, zip_code, latitude, longitude, geocoded=False):
+        with self._lock:
+            self.remove(location_id)
+
+            address_key = (normalize_address(address), normalize_zip(zip_code))
+            point = None
+            cell = None
+            # Geocoded coordinates are a zip centroid shared by unrelated addresses
+            if latitude is not None and longitude is not None and not geocoded:
+                point = (float(latitude), float(longitude))
+                cell = self._cell(*point)
+                self._by_cell.setdefault(cell, set()).add(location_id)
+
+            self._by_address.setdefault(address_key, set()).add(location_id)
+            self._entries[location_id] = (address_key, cell, point)
+
+    def remove(self, location_id):
+        with self._lock:
+            entry = self._entries.pop(location_id, None)
+            if entry is None:
+                return
+            address_key, cell, _point = entry
+            self._discard(self._by_address, address_key, location_id)
+            if cell is not None:
+                self._discard(self._by_cell, cell, location_id)
+
+    def apply(self, old, new):
+        """
+        Apply the change between two location snapshots (either may be None)
+        """
+        if not self._built:
+            return
+        from .models import Location
+
+        if new and new['status'] in Location.OPEN_STATUSES:
+            self.add(new['id'], new['address'], new['zip_code'], new['latitude'], new['longitude'], new['geocoded'])
+        elif old:
+            self.remove(old['id'])
+
+    def find(self, address, zip_code, latitude=None, longitude=None):
+        """
+        Return the id of an active outage that looks like the same report, or None
+        """
+        with self._lock:
+            matches = self._by_address.get((normalize_address(address), normalize_zip(zip_code)))
+            if matches:
+                return min(matches)
+
+            if latitude is None or longitude is None:
+                return None
+
+            lat, lon = float(latitude), float(longitude)
+            best_id, best_distance = None, self.radius_meters
+            for cell in self._neighbour_cells(lat, lon):
+                for location_id in self._by_cell.get(cell, ()):
+                    other_lat, other_lon = self._entries[location_id][2]
+                    distance = haversine_meters(lat, lon, other_lat, other_lon)
+                    if distance <= best_distance:
+                        best_id, best_distance = location_id, distance
+            return best_id
+
+    def _cell(self, lat, lon):
+        size = self.cell_degrees
+        return (math.floor(lat / size), math.floor(lon / size))
+
+    def _neighbour_cells(self, lat, lon):
+        row, col = self._cell(lat, lon)
+        # Longitude degrees shrink towards the poles, so widen the column span
+        span = math.ceil(1 / max(math.cos(math.radians(lat)), 0.01))
+        for d_row in (-1, 0, 1):
+            for d_col in range(-span, span + 1):
+                yield (row + d_row, col + d_col)
+
+    @staticmethod
+    def _discard(buckets, key, location_id):
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket.discard(location_id)
+            if not bucket:
+                del buckets[key]
+
+
+duplicate_index = DuplicateIndex()
+
+
+def find_duplicate(data):
+    """
+    Look up an active outage matching validated location data
+    """
+    from .models import Location
+
+    duplicate_index.ensure_built()
+    location_id = duplicate_index.find(
+        data.get('address'), data.get('zip_code'), data.get('latitude'), data.get('longitude')
+    )
+    if location_id is None:
+        return None
+    return Location.objects.filter(id=location_id, status__in=Location.OPEN_STATUSES).first()
+
+
+def attach_duplicate_report(location, data, user):
+    """
+    Record a duplicate submission as an additional report on an existing location
+    """
+    from .models import LocationReport, LocationUpdate
+
+    report = LocationReport.objects.create(
+        location=location,
+        reported_by=user,
+        reporter_email=data.get('reporter_email') or user.email,
+        reporter_phone=''.join(filter(str.isdigit, data.get('reporter_phone') or '')),
+        description=data.get('description', ''),
+        estimated_customers_affected=data.get('estimated_customers_affected'),
+    )
+    LocationUpdate.objects.create(
+        location=location,
+        updated_by=user,
+        update_type='general_update',
+        notes=f'Duplicate report merged from {user.get_full_name() or user.email}'
+    )
+    return report
+
@@ -0,0 +1,256 @@
+"""
+locations/eta.py
+"""
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .history import record_location_events
+from .models import Location, RestorationModel
+
+logger = logging.getLogger(__name__)
+
+# Medium priority is the baseline the other priorities are measured against
+PRIORITY_FEATURES = ['low', 'high', 'critical']
+FEATURES = [
+    'intercept', *(f'priority_{priority}' for priority in PRIORITY_FEATURES),
+    'log_customers', 'customers_missing', 'log_backlog', 'log_state_backlog',
+]
+MIN_DURATION_HOURS = 5 / 60
+MAX_DURATION_HOURS = 14 * 24
+# Pseudo-count that pulls the offsets of states with few resolutions towards zero
+STATE_SHRINKAGE = 20
+RIDGE = 1e-3
+
+
+def _epoch(values):
+    return np.array([value.timestamp() for value in values], dtype=float)
+
+
+def backlog_at(times, states):
+    """
+    Number of open outages overall and in each row's state at each time
+    (epoch seconds). Only outages still open after the earliest time are loaded.
+    """
+    if len(times) == 0:
+        return np.zeros(0), np.zeros(0)
+    earliest = datetime.fromtimestamp(times.min(), tz=dt_timezone.utc)
+    rows = list(
+        Location.objects.filter(
+            Q(status__in=Location.OPEN_STATUSES) | Q(actual_restoration__gt=earliest) |
+            Q(actual_restoration__isnull=True, updated_at__gt=earliest)
+        )
+        .order_by()
+        .values_list('state', 'status', 'reported_at', 'actual_restoration', 'updated_at')
+    )
+    interval_states = np.array([row[0] for row in rows], dtype=object)
+    starts = _epoch(row[2] for row in rows)
+    # Closed outages without a restoration time ended at their last update
+    ends = np.array([
+        np.inf if row[1] in Location.OPEN_STATUSES else (row[3] or row[4]).timestamp() for row in rows
+    ], dtype=float)
+
+    def open_count(interval_mask, at):
+        started = np.sort(starts[interval_mask])
+        ended = np.sort(ends[interval_mask])
+        return np.searchsorted(started, at, side='right') - np.searchsorted(ended, at, side='right')
+
+    overall = open_count(np.ones(len(rows), dtype=bool), times)
+    by_state = np.zeros(len(times))
+    for state in np.unique(states):
+        mask = states == state
+        by_state[mask] = open_count(interval_states == state, times[mask])
+    return overall.astype(float), by_state
+
+
+def design_matrix(priorities, customers, backlog, state_backlog):
+    matrix = np.empty((len(priorities), len(FEATURES)))
+    matrix[:, 0] = 1.0
+    for column, priority in enumerate(PRIORITY_FEATURES, start=1):
+        matrix[:, column] = priorities == priority
+    missing = np.isnan(customers)
+    matrix[:, 4] = np.log1p(np.where(missing, 0.0, customers))
+    matrix[:, 5] = missing
+    matrix[:, 6] = np.log1p(np.maximum(backlog, 0))
+    matrix[:, 7] = np.log1p(np.maximum(state_backlog, 0))
+    return matrix
+
+
+def _features(rows):
+    """Columns shared by training and scoring: priority, customers, state, reported_at"""
+    priorities = np.array([row[0] for row in rows], dtype=object)
+    customers = np.array([np.nan if row[1] is None else row[1] for row in rows], dtype=float)
+    states = np.array([row[2] for row in rows], dtype=object)
+    reported = _epoch(row[3] for row in rows)
+    backlog, state_backlog = backlog_at(reported, states)
+    return design_matrix(priorities, customers, backlog, state_backlog), states, reported
+
+
+def _fit(matrix, target, states):
+    """Ridge least squares on log hours, then shrunken per-state offsets on the residuals"""
+    penalty = np.sqrt(RIDGE) * np.eye(matrix.shape[1])
+    penalty[0, 0] = 0.0  # leave the intercept unpenalized
+    coefficients = np.linalg.lstsq(
+        np.vstack([matrix, penalty]), np.concatenate([target, np.zeros(matrix.shape[1])]), rcond=None
+    )[0]
+    residuals = target - matrix @ coefficients
+    offsets = {}
+    for state in np.unique(states):
+        mask = states == state
+        offsets[state] = float(residuals[mask].sum() / (mask.sum() + STATE_SHRINKAGE))
+    return coefficients, offsets
+
+
+def _predict_log_hours(matrix, states, coefficients, offsets):
+    return matrix @ coefficients + np.array([offsets.get(state, 0.0) for state in states])
+
+
+def train_restoration_model(days=None, holdout=0.2, seed=0):
+    """
+    Fit the ETA model on resolved outages with a known restoration time and
+    store it. Returns the RestorationModel, or None with too little history.
+    """
+    days = days or getattr(settings, 'ETA_TRAINING_DAYS', 365)
+    rows = list(
+        Location.objects.filter(
+            status='resolved', actual_restoration__isnull=False,
+            reported_at__gte=timezone.now() - timedelta(days=days),
+        )
+        .order_by()
+        .values_list('priority', 'estimated_customers_affected', 'state', 'reported_at', 'actual_restoration')
+    )
+    rows = [row for row in rows if row[4] > row[3]]
+    if len(rows) < getattr(settings, 'ETA_MIN_TRAINING_SAMPLES', 50):
+        logger.info('Not training the ETA model: %s usable resolutions', len(rows))
+        return None
+
+    matrix, states, reported = _features(rows)
+    hours = np.clip((_epoch(row[4] for row in rows) - reported) / 3600, MIN_DURATION_HOURS, MAX_DURATION_HOURS)
+    target = np.log(hours)
+
+    # Score on held-out resolutions, then refit on everything for the stored model
+    order = np.random.default_rng(seed).permutation(len(rows))
+    test = order[:int(len(rows) * holdout)]
+    train = order[int(len(rows) * holdout):]
+    coefficients, offsets = _fit(matrix[train], target[train], states[train])
+    predicted = np.exp(_predict_log_hours(matrix[test], states[test], coefficients, offsets))
+    mae_hours = float(np.abs(predicted - hours[test]).mean()) if len(test) else 0.0
+
+    coefficients, offsets = _fit(matrix, target, states)
+    residual_std = float(np.std(target - _predict_log_hours(matrix, states, coefficients, offsets)))
+    return RestorationModel.objects.create(
+        samples=len(rows),
+        mae_hours=round(mae_hours, 3),
+        parameters={
+            'features': FEATURES,
+            'coefficients': [round(float(value), 6) for value in coefficients],
+            'state_offsets': {state: round(value, 6) for state, value in offsets.items()},
+            'residual_std': round(residual_std, 6),
+        },
+    )
+
+
+def _write_estimates(using, estimates, now):
+    """
+    Set each location's predicted estimate, flag and timestamp. Where the
+    database supports UPDATE ... FROM, one statement joins the ids to a VALUES
+    list; bulk_update builds a CASE branch per row and costs far more to compile.
+    """
+    connection = connections[using]
+    if connection.vendor not in ('postgresql', 'sqlite') or (
+        connection.vendor == 'sqlite' and connection.Database.sqlite_version_info < (3, 33)
+    ):
+        Location.objects.using(using).bulk_update(
+            [Location(id=location_id, estimated_restoration=eta) for location_id, eta in estimates.items()],
+            ['estimated_restoration'], batch_size=len(estimates),
+        )
+        Location.objects.using(using).filter(id__in=list(estimates)).update(restoration_predicted=True, updated_at=now)
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(Location._meta.db_table)
+    values = ', '.join(['(%s, %s)'] * len(estimates))
+    # Adapted like the ORM would, so SQLite stores the same text format
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [True, adapt(now)]
+    for location_id, eta in estimates.items():
+        params += [location_id, adapt(eta)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET {quote("estimated_restoration")} = v.column2, '
+            f'{quote("restoration_predicted")} = %s, {quote("updated_at")} = %s '
+            f'FROM (VALUES {values}) AS v WHERE {table}.{quote("id")} = v.column1',
+            params,
+        )
+
+
+def score_open_locations(model=None, batch_size=1000):
+    """
+    Predict restoration times for every open outage without a hand-entered
+    estimate and write the ones that moved in batches, appending their
+    events to the log in bulk. post_save is not sent: the workload counters and
+    in-memory indexes do not depend on the estimate, and per-row receivers cost
+    seconds per few thousand rows. version is not bumped, so a client's pending
+    edit is not rejected by a prediction. Returns the number of locations updated.
+    """
+    model = model or RestorationModel.objects.first()
+    if model is None:
+        return 0
+    parameters = model.parameters
+    if parameters.get('features') != FEATURES:
+        logger.warning('ETA model %s was trained on other features, retrain it', model.pk)
+        return 0
+
+    scorable = Q(estimated_restoration__isnull=True) | Q(restoration_predicted=True)
+    rows = list(
+        Location.objects.filter(scorable, status__in=Location.OPEN_STATUSES)
+        .order_by()
+        .values_list('priority', 'estimated_customers_affected', 'state', 'reported_at', 'id', 'estimated_restoration')
+    )
+    if not rows:
+        return 0
+
+    matrix, states, reported = _features(rows)
+    hours = np.exp(_predict_log_hours(
+        matrix, states, np.array(parameters['coefficients']), parameters['state_offsets']
+    ))
+    now = timezone.now().timestamp()
+    # Outages already past their predicted time are due shortly rather than overdue
+    minimum_remaining = getattr(settings, 'ETA_MIN_REMAINING_MINUTES', 30) * 60
+    predicted = np.maximum(reported + hours * 3600, now + minimum_remaining)
+
+    current = np.array([np.nan if row[5] is None else row[5].timestamp() for row in rows])
+    threshold = getattr(settings, 'ETA_UPDATE_THRESHOLD_MINUTES', 5) * 60
+    moved = np.isnan(current) | (np.abs(predicted - current) > threshold)
+    etas = {
+        rows[index][4]: datetime.fromtimestamp(predicted[index], tz=dt_timezone.utc)
+        for index in np.flatnonzero(moved)
+    }
+
+    updated = 0
+    ids = list(etas)
+    using = router.db_for_write(Location) or DEFAULT_DB_ALIAS
+    fields = ('id', 'status', 'estimated_restoration', 'restoration_predicted', 'updated_at')
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic(using=using):
+            # Re-check under the row lock so an estimate entered or an outage
+            # resolved meanwhile is kept
+            rows = list(
+                Location.objects.using(using).select_for_update()
+                .filter(scorable, status__in=Location.OPEN_STATUSES, id__in=ids[start:start + batch_size])
+                .values(*fields)
+            )
+            if not rows:
+                continue
+            now = timezone.now()
+            changes = [
+                (old, {**old, 'estimated_restoration': etas[old['id']], 'restoration_predicted': True, 'updated_at': now})
+                for old in rows
+            ]
+            _write_estimates(using, {new['id']: new['estimated_restoration'] for _old, new in changes}, now)
+            record_location_events(changes, batch_size=batch_size)
+            updated += len(rows)
+    return updated
@@ -0,0 +1,11 @@
+"""
+locations/exceptions.py
+"""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The location was modified by someone else. Reload it and try again.'
+    default_code = 'precondition_failed'
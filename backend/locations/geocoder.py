@@ -0,0 +1,130 @@
+"""
+locations/geocoder.py
+"""
+import mmap
+import os
+import struct
+import threading
+from decimal import Decimal
+from django.conf import settings
+from .dedup import normalize_zip
+
+INDEX_MAGIC = b'SCOUTZIP'
+HEADER = struct.Struct('<8sII')  # magic, format version, record count
+RECORD = struct.Struct('<Iff')   # zip code, latitude, longitude
+INDEX_VERSION = 1
+
+
+def write_zip_index(path, centroids):
+    """
+    Write (zip_code, latitude, longitude) rows as a sorted fixed-width index.
+    The file is replaced atomically so running processes pick it up on their
+    next lookup. Returns the number of zip codes written.
+    """
+    records = {}
+    for zip_code, latitude, longitude in centroids:
+        zip_code = normalize_zip(str(zip_code))
+        if len(zip_code) == 5:
+            records.setdefault(int(zip_code), (float(latitude), float(longitude)))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as handle:
+        handle.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(records)))
+        for zip_code in sorted(records):
+            handle.write(RECORD.pack(zip_code, *records[zip_code]))
+    os.replace(temp_path, path)
+    return len(records)
+
+
+class ZipCentroidIndex:
+    """
+    Offline zip code geocoder over a memory-mapped index of zip centroids
+    sorted by zip, so a lookup is a binary search over the mapped pages and
+    the file is shared by every worker process through the page cache.
+
+    The index is built from a reference CSV with `manage.py build_geocoder_index`.
+    Without it every lookup misses.
+    """
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._path = path
+        self._mapped = None
+        self._count = 0
+        self._file_id = None
+
+    @property
+    def path(self):
+        if self._path is not None:
+            return self._path
+        return getattr(settings, 'GEOCODER_INDEX_PATH', settings.BASE_DIR / 'data' / 'zip_centroids.idx')
+
+    def available(self):
+        return self._current()[0] is not None
+
+    def lookup(self, zip_code):
+        """
+        Return the (latitude, longitude) centroid of a zip code, or None
+        """
+        zip_code = normalize_zip(zip_code)
+        if len(zip_code) != 5:
+            return None
+        mapped, count = self._current()
+        if mapped is None:
+            return None
+
+        target = int(zip_code)
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if struct.unpack_from('<I', mapped, HEADER.size + middle * RECORD.size)[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low == count:
+            return None
+        found, latitude, longitude = RECORD.unpack_from(mapped, HEADER.size + low * RECORD.size)
+        return (latitude, longitude) if found == target else None
+
+    def _current(self):
+        """Map the index file, remapping when it was replaced since the last lookup"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None, 0
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if file_id != self._file_id:
+                self._mapped, self._count = self._open(stat.st_size)
+                self._file_id = file_id
+            return self._mapped, self._count
+
+    def _open(self, size):
+        if size < HEADER.size:
+            return None, 0
+        with open(self.path, 'rb') as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(mapped, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or size < HEADER.size + count * RECORD.size:
+            mapped.close()
+            return None, 0
+        return mapped, count
+
+
+zip_index = ZipCentroidIndex()
+
+
+def fill_coordinates(location):
+    """
+    Set a location's missing coordinates to its zip code centroid. Returns True
+    when coordinates were filled.
+    """
+    if location.latitude is not None and location.longitude is not None:
+        return False
+    centroid = zip_index.lookup(location.zip_code)
+    if centroid is None:
+        return False
+    location.latitude, location.longitude = (Decimal(f'{value:.6f}') for value in centroid)
+    location.geocoded = True
+    return True
@@ -0,0 +1,134 @@
+"""
+locations/history.py
+"""
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .models import Location, LocationEvent, LocationSnapshot
+
+
+def _jsonable(values):
+    return json.loads(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def _is_open(values):
+    return values is not None and values.get('status') in Location.OPEN_STATUSES
+
+
+def _location_event(old, new):
+    """Return the unsaved event for the change between two snapshots, or None"""
+    if old is None and new is None:
+        return None
+    if new is None:
+        return LocationEvent(location_id=old['id'], kind='deleted')
+    if old is None:
+        return LocationEvent(location_id=new['id'], kind='created', changes=_jsonable(new))
+
+    # Snapshots only hold open locations, so a reopened one needs all its fields
+    if _is_open(new) and not _is_open(old):
+        changes = new
+    else:
+        changes = {field: value for field, value in new.items() if old.get(field) != value}
+    if not changes:
+        return None
+    return LocationEvent(location_id=new['id'], kind='changed', changes=_jsonable(changes))
+
+
+def record_location_event(old, new):
+    """
+    Append the change between two location snapshots (either may be None) to
+    the event log. Runs inside the caller's transaction so the event commits
+    with the change.
+    """
+    event = _location_event(old, new)
+    if event is not None:
+        event.save()
+
+
+def record_location_events(changes, batch_size=1000):
+    """
+    Append the changes for many (old, new) snapshot pairs with bulk_create.
+    Snapshots may hold only the fields that changed plus id and status.
+    """
+    events = [event for event in (_location_event(old, new) for old, new in changes) if event is not None]
+    LocationEvent.objects.bulk_create(events, batch_size=batch_size)
+    return len(events)
+
+
+def take_snapshot():
+    """
+    Store the current open locations. Events are replayed from a little before
+    the snapshot so changes that committed while it was read are not lost;
+    replaying them again is harmless because later events follow in order.
+    """
+    taken_at = timezone.now()
+    overlap = timedelta(seconds=getattr(settings, 'LOCATION_SNAPSHOT_OVERLAP_SECONDS', 60))
+    replay_from_id = (
+        LocationEvent.objects.filter(created_at__lt=taken_at - overlap)
+        .order_by('-created_at').values_list('id', flat=True).first()
+    ) or 0
+
+    fields = [field.attname for field in Location._meta.concrete_fields]
+    rows = _jsonable(list(
+        Location.objects.filter(status__in=Location.OPEN_STATUSES).order_by().values_list(*fields)
+    ))
+    return LocationSnapshot.objects.create(
+        taken_at=taken_at, replay_from_id=replay_from_id, location_count=len(rows), fields=fields, rows=rows,
+    )
+
+
+def snapshots_to_thin(now=None):
+    """
+    Ids of snapshots that only add detail older history does not need. Past
+    LOCATION_SNAPSHOT_HOURLY_AFTER_HOURS the first snapshot of each hour is
+    kept, past LOCATION_SNAPSHOT_DAILY_AFTER_DAYS the first of each day. as_of
+    queries that far back replay up to an hour or a day of events instead.
+    """
+    now = now or timezone.now()
+    hourly_before = now - timedelta(hours=getattr(settings, 'LOCATION_SNAPSHOT_HOURLY_AFTER_HOURS', 24))
+    daily_before = now - timedelta(days=getattr(settings, 'LOCATION_SNAPSHOT_DAILY_AFTER_DAYS', 7))
+
+    thinned = []
+    kept_buckets = set()
+    snapshots = LocationSnapshot.objects.filter(taken_at__lt=hourly_before).order_by('taken_at')
+    for snapshot_id, taken_at in snapshots.values_list('id', 'taken_at'):
+        bucket = taken_at.date() if taken_at < daily_before else taken_at.replace(minute=0, second=0, microsecond=0)
+        if bucket in kept_buckets:
+            thinned.append(snapshot_id)
+        else:
+            kept_buckets.add(bucket)
+    return thinned
+
+
+def locations_as_of(as_of):
+    """
+    Rebuild the open locations as they were at `as_of` from the nearest earlier
+    snapshot plus the events after it. Returns unsaved Location instances,
+    newest first. The work is bounded by the snapshot interval, not by how far
+    back `as_of` is.
+    """
+    snapshot = LocationSnapshot.objects.filter(taken_at__lte=as_of).order_by('-taken_at').first()
+    state = {}
+    replay_from_id = 0
+    if snapshot is not None:
+        replay_from_id = snapshot.replay_from_id
+        state = {row[0]: dict(zip(snapshot.fields, row)) for row in snapshot.rows}
+
+    events = LocationEvent.objects.filter(id__gt=replay_from_id, created_at__lte=as_of).order_by('id')
+    for location_id, kind, changes in events.values_list('location_id', 'kind', 'changes').iterator(chunk_size=2000):
+        if kind == 'deleted':
+            state.pop(location_id, None)
+        else:
+            state.setdefault(location_id, {}).update(changes)
+
+    fields = {field.attname: field for field in Location._meta.concrete_fields}
+    locations = [
+        # Rows without an id were only seen partially, i.e. never open since the snapshot
+        Location(**{name: fields[name].to_python(value) for name, value in values.items() if name in fields})
+        for values in state.values()
+        if _is_open(values) and 'id' in values
+    ]
+    locations.sort(key=lambda location: location.created_at, reverse=True)
+    return locations
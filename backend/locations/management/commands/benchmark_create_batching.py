@@ -0,0 +1,83 @@
+"""
+locations/management/commands/benchmark_create_batching.py
+"""
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from locations.batching import CreateCoalescer
+from locations.models import Location, LocationUpdate
+
+BENCHMARK_NAME = 'Create batching benchmark'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * pct / 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and latency of one-transaction-per-create against the '
+        'create coalescer at several batch windows. The creates commit from many '
+        'connections at once, so they cannot share a rolled-back transaction: the '
+        'benchmark runs against a throwaway test database (test_<NAME>, created and '
+        'dropped like the test runner does, so the database user needs CREATEDB). '
+        'Never point it at a settings module whose test database name is in use.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--windows', default='0,1,2,5,10', help='Comma-separated batch windows in ms, 0 = unbatched')
+        parser.add_argument('--requests', type=int, default=2000, help='Creates per window')
+        parser.add_argument('--concurrency', type=int, default=32, help='Concurrent request threads')
+        parser.add_argument('--max-batch', type=int, default=100)
+
+    def handle(self, *args, **options):
+        windows = [float(window) for window in options['windows'].split(',')]
+        self.stdout.write(f"{'window':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        # Creates fire the workload, event and outbox receivers like real ones do,
+        # so they must only ever land in a database that is dropped afterwards
+        creation = connections[router.db_for_write(Location) or DEFAULT_DB_ALIAS].creation
+        old_name = creation.connection.settings_dict['NAME']
+        test_settings = creation.connection.settings_dict.setdefault('TEST', {})
+        if creation.connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # Concurrent writers lock up SQLite's shared in-memory test database
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), f'scout-benchmark-{os.getpid()}.sqlite3')
+        creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            for window in windows:
+                coalescer = CreateCoalescer(window_ms=window, max_batch=options['max_batch']) if window else None
+                latencies, elapsed = self._run(coalescer, options['requests'], options['concurrency'])
+                self.stdout.write(
+                    f'{window:>6g}ms {len(latencies) / elapsed:>10,.0f} '
+                    f'{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f}'
+                )
+        finally:
+            creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, coalescer, requests, concurrency):
+        def create(i):
+            location = Location(
+                name=BENCHMARK_NAME, address=f'{i} Benchmark St', city='Benchmark', state='BM', zip_code='00000'
+            )
+            update = LocationUpdate(update_type='general_update', notes='Benchmark create')
+            start = time.perf_counter()
+            try:
+                if coalescer is not None:
+                    coalescer.submit(location, update)
+                else:
+                    with transaction.atomic():
+                        location.save(force_insert=True)
+                        update.location = location
+                        update.save()
+                return time.perf_counter() - start
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(create, range(requests)))
+        return latencies, time.perf_counter() - start
@@ -0,0 +1,65 @@
+"""
+locations/management/commands/benchmark_dedup.py
+"""
+import random
+import time
+from django.core.management.base import BaseCommand
+from locations.dedup import DuplicateIndex
+
+STREETS = ['Main Street', 'Oak Avenue', 'Pine Road', 'Maple Drive', 'Cedar Lane', 'Elm Boulevard']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark duplicate-report index build and lookup throughput on synthetic outages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outages', type=int, default=100000, help='Active outages to index')
+        parser.add_argument('--lookups', type=int, default=100000, help='Lookups to time')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        outages = options['outages']
+        lookups = options['lookups']
+
+        def synthetic(i):
+            return (
+                f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+                f'{rng.randint(10000, 99999)}',
+                round(rng.uniform(25.0, 49.0), 6),
+                round(rng.uniform(-124.0, -67.0), 6),
+            )
+
+        rows = [synthetic(i) for i in range(outages)]
+        index = DuplicateIndex(radius_meters=75)
+
+        start = time.perf_counter()
+        for i, (address, zip_code, lat, lon) in enumerate(rows):
+            index.add(f'{i:010d}', address, zip_code, lat, lon)
+        build_seconds = time.perf_counter() - start
+
+        # Half the probes are re-submissions (address variant or nearby point), half are new
+        probes = []
+        for i in range(lookups):
+            address, zip_code, lat, lon = rows[rng.randrange(outages)]
+            kind = i % 4
+            if kind == 0:
+                probes.append((address.upper().replace('Street', 'St.'), zip_code, None, None))
+            elif kind == 1:
+                probes.append(('unknown', zip_code, lat + 0.0002, lon - 0.0002))
+            else:
+                probes.append(synthetic(i))
+
+        hits = 0
+        start = time.perf_counter()
+        for address, zip_code, lat, lon in probes:
+            if index.find(address, zip_code, lat, lon) is not None:
+                hits += 1
+        lookup_seconds = time.perf_counter() - start
+
+        self.stdout.write(f'Indexed {outages} outages in {build_seconds:.2f}s')
+        self.stdout.write(
+            f'{lookups} lookups in {lookup_seconds:.2f}s: '
+            f'{lookups / lookup_seconds:,.0f} lookups/s, '
+            f'{lookup_seconds / lookups * 1e6:.1f} us/lookup, {hits} duplicates found'
+        )
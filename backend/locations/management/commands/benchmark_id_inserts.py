@@ -0,0 +1,48 @@
+"""
+locations/management/commands/benchmark_id_inserts.py
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import generate_ulid
+from locations.models import Location, generate_uuid
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare insert throughput of random 10-char hex IDs and time-ordered ULIDs. '
+        'Rows are inserted inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Rows inserted per generator')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        for label, generator in (('random hex', generate_uuid), ('ulid', generate_ulid)):
+            start = time.perf_counter()
+            for _ in range(rows):
+                generator()
+            generate_seconds = time.perf_counter() - start
+
+            insert_seconds = self._insert(generator, rows, options['batch_size'])
+            self.stdout.write(
+                f'{label:>10}: {rows / generate_seconds:,.0f} ids/s generated, '
+                f'{rows / insert_seconds:,.0f} rows/s inserted ({insert_seconds:.2f}s)'
+            )
+
+    def _insert(self, generator, rows, batch_size):
+        start = time.perf_counter()
+        with transaction.atomic():
+            for offset in range(0, rows, batch_size):
+                Location.objects.bulk_create([
+                    Location(
+                        id=generator(), name='Benchmark', address=f'{offset + i} Benchmark St',
+                        city='Benchmark', state='BM', zip_code='00000',
+                    )
+                    for i in range(min(batch_size, rows - offset))
+                ])
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
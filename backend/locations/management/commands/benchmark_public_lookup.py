@@ -0,0 +1,69 @@
+"""
+locations/management/commands/benchmark_public_lookup.py
+"""
+import random
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from locations.public import PublicOutageIndex, lookup_response
+
+
+class Command(BaseCommand):
+    help = 'Benchmark public outage lookup throughput, including JSON encoding, on synthetic outages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outages', type=int, default=50000, help='Active outages to index')
+        parser.add_argument('--lookups', type=int, default=100000, help='Lookups to time')
+        parser.add_argument('--zips', type=int, default=5000, help='Distinct zip codes the outages fall in')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        # Outages cluster around zip centres, like storm damage does
+        centres = {
+            f'{10000 + i * 17 % 89999:05d}': (rng.uniform(25.0, 49.0), rng.uniform(-124.0, -67.0))
+            for i in range(options['zips'])
+        }
+        zip_codes = list(centres)
+
+        rows = []
+        for i in range(options['outages']):
+            zip_code = rng.choice(zip_codes)
+            lat, lon = centres[zip_code]
+            rows.append((
+                f'{i:026d}', rng.choice(['reported', 'investigating', 'in_progress']), 'City', 'ST', zip_code,
+                lat + rng.gauss(0, 0.01), lon + rng.gauss(0, 0.01), rng.randint(1, 500),
+                now - timedelta(minutes=rng.randint(0, 600)), now + timedelta(hours=rng.randint(1, 12)), True,
+            ))
+
+        index = PublicOutageIndex(radius_km=2)
+        start = time.perf_counter()
+        index.load(rows, now)
+        build_seconds = time.perf_counter() - start
+        self.stdout.write(f'Indexed {len(rows)} outages in {build_seconds:.2f}s')
+
+        # Half the probes hit a zip with outages, half are points that may or may not be near one
+        probes = []
+        for i in range(options['lookups']):
+            if i % 2:
+                probes.append(('zip', rng.choice(zip_codes)))
+            else:
+                lat, lon = centres[rng.choice(zip_codes)]
+                probes.append(('point', (lat + rng.uniform(-0.05, 0.05), lon + rng.uniform(-0.05, 0.05))))
+
+        for label, kinds in (('zip', {'zip'}), ('coordinates', {'point'})):
+            selected = [value for kind, value in probes if kind in kinds]
+            affected = 0
+            start = time.perf_counter()
+            for value in selected:
+                outages = index.by_zip(value) if label == 'zip' else index.near(*value)
+                affected += bool(outages)
+                lookup_response({label: value}, outages, now)
+            seconds = time.perf_counter() - start
+            self.stdout.write(
+                f'{len(selected)} {label} lookups in {seconds:.2f}s: '
+                f'{len(selected) / seconds:,.0f} lookups/s, '
+                f'{seconds / len(selected) * 1e6:.1f} us/lookup, {affected} affected'
+            )
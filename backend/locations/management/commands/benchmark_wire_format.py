@@ -0,0 +1,69 @@
+"""
+locations/management/commands/benchmark_wire_format.py
+"""
+import gzip
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from accounts.models import User
+from locations.models import Location
+from locations.renderers import ColumnarJSONRenderer, MessagePackRenderer, columnar_locations, msgpack
+from locations.serializers import LocationSerializer
+
+CITIES = [('Springfield', 'IL'), ('Columbus', 'OH'), ('Austin', 'TX'), ('Denver', 'CO'), ('Tampa', 'FL')]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare size and encode time of the LocationSerializer JSON for /api/locations/all/ '
+        'with the columnar JSON and MessagePack encodings. Rows are inserted inside a '
+        'transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(email=f'benchmark-{i}@example.com', first_name='Bench', last_name=str(i), role='team_member')
+                for i in range(options['users'])
+            ])
+            locations = []
+            for i in range(options['rows']):
+                city, state = rng.choice(CITIES)
+                locations.append(Location(
+                    name=f'Outage {i}', address=f'{i} Main St', city=city, state=state, zip_code='00000',
+                    latitude=round(rng.uniform(25, 49), 6), longitude=round(rng.uniform(-124, -67), 6),
+                    status=rng.choice(Location.OPEN_STATUSES), priority=rng.choice(list(Location.PRIORITY_RANKS)),
+                    estimated_customers_affected=rng.randint(1, 5000),
+                    assigned_to=rng.choice(users) if rng.random() < 0.7 else None,
+                    reported_by=rng.choice(users),
+                ))
+            Location.objects.bulk_create(locations, batch_size=5000)
+            queryset = Location.objects.filter(name__startswith='Outage ')
+
+            self._report('serializer json', lambda: JSONRenderer().render(
+                LocationSerializer(queryset, many=True).data
+            ))
+            self._report('columnar json', lambda: ColumnarJSONRenderer().render(columnar_locations(queryset)))
+            if msgpack is not None:
+                self._report('columnar msgpack', lambda: MessagePackRenderer().render(columnar_locations(queryset)))
+            else:
+                self.stdout.write('columnar msgpack: skipped, msgpack is not installed')
+
+            transaction.set_rollback(True)
+
+    def _report(self, label, encode):
+        start = time.perf_counter()
+        body = encode()
+        elapsed = time.perf_counter() - start
+        compressed = len(gzip.compress(body, compresslevel=6))
+        self.stdout.write(
+            f'{label:>16}: {len(body) / 1e6:8.2f} MB, {compressed / 1e6:7.2f} MB gzipped, {elapsed:6.2f}s encode'
+        )
@@ -0,0 +1,61 @@
+"""
+locations/management/commands/build_geocoder_index.py
+"""
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from locations.geocoder import write_zip_index, zip_index
+
+# Header names used by common zip centroid files, e.g. the Census ZCTA gazetteer
+ZIP_COLUMNS = ['zip', 'zip_code', 'zipcode', 'postal_code', 'zcta', 'zcta5', 'geoid']
+LATITUDE_COLUMNS = ['latitude', 'lat', 'intptlat']
+LONGITUDE_COLUMNS = ['longitude', 'lon', 'lng', 'long', 'intptlong']
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the offline geocoder index from a zip centroid CSV or TSV, such as the '
+        'Census ZCTA gazetteer file. The reference data is not bundled with the app.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='CSV/TSV file with zip code, latitude and longitude columns')
+        parser.add_argument('--output', help='Index path (defaults to GEOCODER_INDEX_PATH)')
+        parser.add_argument('--zip-column')
+        parser.add_argument('--lat-column')
+        parser.add_argument('--lon-column')
+
+    def handle(self, *args, **options):
+        output = options['output'] or zip_index.path
+        with open(options['source'], newline='', encoding='utf-8-sig') as handle:
+            dialect = csv.Sniffer().sniff(handle.read(4096), delimiters=',\t|;')
+            handle.seek(0)
+            reader = csv.reader(handle, dialect)
+            header = [name.strip().lower() for name in next(reader)]
+            columns = [
+                self.column(header, options[option], candidates)
+                for option, candidates in (
+                    ('zip_column', ZIP_COLUMNS), ('lat_column', LATITUDE_COLUMNS), ('lon_column', LONGITUDE_COLUMNS),
+                )
+            ]
+
+            skipped = 0
+
+            def centroids():
+                nonlocal skipped
+                for row in reader:
+                    try:
+                        zip_code, latitude, longitude = (row[column].strip() for column in columns)
+                        yield zip_code, float(latitude), float(longitude)
+                    except (IndexError, ValueError):
+                        skipped += 1
+
+            count = write_zip_index(output, centroids())
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} zip centroids to {output} ({skipped} rows skipped)'))
+
+    @staticmethod
+    def column(header, name, candidates):
+        for candidate in [name.lower()] if name else candidates:
+            if candidate in header:
+                return header.index(candidate)
+        raise CommandError(f"No column named {name or ' / '.join(candidates)} in {', '.join(header)}")
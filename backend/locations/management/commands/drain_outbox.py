@@ -0,0 +1,35 @@
+"""
+locations/management/commands/drain_outbox.py
+"""
+import time
+from django.core.management.base import BaseCommand
+from locations.outbox import OutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending location events from the outbox to webhook endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain one round and exit')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--batch-size', type=int, default=50, help='Events per webhook request')
+        parser.add_argument('--concurrency', type=int, default=4, help='Endpoints delivered in parallel')
+        parser.add_argument('--max-attempts', type=int, default=10)
+        parser.add_argument('--backoff', type=float, default=5.0, help='Base retry delay in seconds')
+
+    def handle(self, *args, **options):
+        dispatcher = OutboxDispatcher(
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            max_attempts=options['max_attempts'],
+            backoff_seconds=options['backoff'],
+        )
+        while True:
+            delivered = dispatcher.run_once()
+            if options['verbosity'] > 1 and delivered:
+                self.stdout.write(f'Delivered {delivered} events')
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS(f'Delivered {delivered} events'))
+                return
+            if not delivered:
+                time.sleep(options['interval'])
@@ -0,0 +1,52 @@
+"""
+locations/management/commands/geocode_locations.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, models, transaction
+from locations.bulk import bulk_update_locations
+from locations.geocoder import fill_coordinates, zip_index
+from locations.models import Location
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill missing coordinates of existing locations from the offline geocoder '
+        'index, in parallel batches. Makes no network calls.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        if not zip_index.available():
+            raise CommandError(
+                f'No geocoder index at {zip_index.path}, build it with `manage.py build_geocoder_index`'
+            )
+
+        missing = models.Q(latitude__isnull=True) | models.Q(longitude__isnull=True)
+        ids = list(Location.objects.filter(missing).order_by('id').values_list('id', flat=True))
+        batch_size = options['batch_size']
+        batches = [ids[start:start + batch_size] for start in range(0, len(ids), batch_size)]
+
+        # SQLite allows one writer at a time
+        workers = options['workers'] if connection.features.has_select_for_update_skip_locked else 1
+
+        def geocode_batch(batch):
+            try:
+                with transaction.atomic():
+                    locations = list(Location.objects.select_for_update().filter(missing, id__in=batch))
+                    filled = [location for location in locations if fill_coordinates(location)]
+                    if filled:
+                        bulk_update_locations(filled, ['latitude', 'longitude', 'geocoded'])
+                return len(filled)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            filled = sum(pool.map(geocode_batch, batches))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Geocoded {filled} of {len(ids)} locations missing coordinates ({len(ids) - filled} zip codes not found)'
+        ))
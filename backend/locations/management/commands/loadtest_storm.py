@@ -0,0 +1,369 @@
+"""
+locations/management/commands/loadtest_storm.py
+"""
+import heapq
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import User
+
+ROLES = ('reporter', 'lead', 'crew', 'dashboard')
+# Team leads see every unassigned or crew-assigned outage, which is all a storm
+# dashboard polls, without the accounts being able to administer anything
+ACCOUNT_ROLES = {'reporter': 'reporter', 'lead': 'team_lead', 'crew': 'team_member', 'dashboard': 'team_lead'}
+CITIES = [
+    ('Springfield', 'IL', '627', 39.78, -89.65), ('Columbus', 'OH', '432', 39.96, -83.00),
+    ('Tampa', 'FL', '336', 27.95, -82.46), ('Houston', 'TX', '770', 29.76, -95.37),
+]
+STREETS = ['Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm Blvd']
+# Tries per account before a throttled login fails the run
+LOGIN_ATTEMPTS = 30
+
+
+def ramp_factor(profile, elapsed, duration, ramp_seconds):
+    """
+    Fraction of the virtual users that should be active at `elapsed` seconds.
+
+    flat: everyone from the start
+    linear: grow to everyone over ramp_seconds
+    step: grow in four equal steps over ramp_seconds
+    spike: a quarter of the users, everyone for the middle fifth of the run
+    """
+    if profile == 'flat':
+        return 1.0
+    if profile == 'linear':
+        return min(1.0, elapsed / ramp_seconds) if ramp_seconds else 1.0
+    if profile == 'step':
+        return min(1.0, (math.floor(elapsed / ramp_seconds * 4) + 1) / 4) if ramp_seconds else 1.0
+    if profile == 'spike':
+        return 1.0 if 0.4 * duration <= elapsed < 0.6 * duration else 0.25
+    raise ValueError(profile)
+
+
+class Stats:
+    """Thread-safe latency and status counts per endpoint"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+
+class Client:
+    """
+    HTTP client for one virtual user. Keep-alive connections belong to the
+    thread, not the user, so many users share the sockets of a few threads.
+    """
+    def __init__(self, base_url, stats, token=None, timeout=30, connections=None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.https = parts.scheme == 'https'
+        self.stats = stats
+        self.token = token
+        self.timeout = timeout
+        self.retry_after = None
+        self._connections = connections if connections is not None else threading.local()
+
+    def request(self, method, path, endpoint, body=None):
+        headers = {'Accept': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        start = time.perf_counter()
+        try:
+            connection = getattr(self._connections, 'connection', None)
+            if connection is None:
+                connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+                connection = self._connections.connection = connection_class(self.host, self.port, timeout=self.timeout)
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            raw = response.read()
+            status = response.status
+            self.retry_after = response.getheader('Retry-After')
+        except (OSError, http.client.HTTPException):
+            self.close()
+            self.stats.record(endpoint, 'error', time.perf_counter() - start)
+            return None, None
+        self.stats.record(endpoint, status, time.perf_counter() - start)
+        try:
+            return status, json.loads(raw) if raw else None
+        except ValueError:
+            return status, None
+
+    def close(self):
+        """Close this thread's connection"""
+        connection = getattr(self._connections, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._connections.connection = None
+
+
+class VirtualUser:
+    """One simulated account running its role's actions in a loop"""
+    def __init__(self, role, client, rng, user_id, crew_ids):
+        self.role = role
+        self.client = client
+        self.rng = rng
+        self.user_id = user_id
+        self.crew_ids = crew_ids
+        self.claimed = []
+
+    def step(self):
+        getattr(self, f'step_{self.role}')()
+
+    def step_reporter(self):
+        city, state, zip_prefix, lat, lon = self.rng.choice(CITIES)
+        number = self.rng.randint(1, 400)
+        street = self.rng.choice(STREETS)
+        self.client.request('POST', '/api/locations/', 'POST /locations/', {
+            'name': f'Storm outage {number} {street}',
+            'address': f'{number} {street}',
+            'city': city,
+            'state': state,
+            'zip_code': f'{zip_prefix}{self.rng.randint(0, 99):02d}',
+            'latitude': round(lat + self.rng.uniform(-0.2, 0.2), 6),
+            'longitude': round(lon + self.rng.uniform(-0.2, 0.2), 6),
+            'priority': self.rng.choice(['low', 'medium', 'medium', 'high', 'critical']),
+            'description': 'Power out after storm',
+            'estimated_customers_affected': self.rng.randint(1, 500),
+        })
+
+    def step_lead(self):
+        status, data = self.client.request(
+            'GET', '/api/locations/?status=reported', 'GET /locations/?status='
+        )
+        results = (data or {}).get('results', []) if status == 200 else []
+        unassigned = [location for location in results if not location.get('assigned_to')]
+        if unassigned and self.crew_ids:
+            location = self.rng.choice(unassigned)
+            self.client.request('POST', f"/api/locations/{location['id']}/assign/", 'POST assign', {
+                'user_id': self.rng.choice(self.crew_ids),
+            })
+        # Bulk edit: bump the priority of a handful of listed outages
+        for location in self.rng.sample(results, min(len(results), 3)):
+            self.client.request('PATCH', f"/api/locations/{location['id']}/", 'PATCH /locations/<id>/', {
+                'priority': self.rng.choice(['high', 'critical']),
+            })
+
+    def step_crew(self):
+        if not self.claimed or self.rng.random() < 0.3:
+            status, data = self.client.request('POST', '/api/locations/claim_next/', 'POST claim_next')
+            if status == 200 and data and data.get('id'):
+                self.claimed.append(data['id'])
+        if not self.claimed:
+            return
+        location_id = self.rng.choice(self.claimed)
+        new_status = self.rng.choice(['investigating', 'in_progress', 'resolved'])
+        self.client.request('POST', f'/api/locations/{location_id}/update_status/', 'POST update_status', {
+            'status': new_status, 'notes': 'Crew on site',
+        })
+        self.client.request('POST', f'/api/locations/{location_id}/updates/', 'POST updates', {
+            'update_type': 'general_update', 'notes': 'Lines down, working on restoration',
+        })
+        if new_status == 'resolved':
+            self.claimed.remove(location_id)
+
+    def step_dashboard(self):
+        if self.rng.random() < 0.2:
+            self.client.request('GET', '/api/locations/all/', 'GET /locations/all/')
+        else:
+            status_filter = self.rng.choice(['', '?status=in_progress', '?priority=critical'])
+            self.client.request('GET', f'/api/locations/{status_filter}', 'GET /locations/')
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate a storm against a running server: reporters creating outages, leads '
+        'assigning and editing, crews claiming and updating, dashboards polling. Accounts '
+        'log in through /api/auth/login/ and are created in the database if missing, '
+        'which needs DEBUG or --allow-create. '
+        'Admission control on the server will shed part of the load; 429s are reported '
+        'per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--reporters', type=int, default=1000)
+        parser.add_argument('--leads', type=int, default=10)
+        parser.add_argument('--crews', type=int, default=100)
+        parser.add_argument('--dashboards', type=int, default=10)
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run')
+        parser.add_argument('--profile', choices=['flat', 'linear', 'step', 'spike'], default='linear')
+        parser.add_argument('--ramp', type=float, default=20, help='Ramp seconds for linear and step profiles')
+        parser.add_argument('--think-ms', type=float, default=500, help='Mean pause between a user\'s actions')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--password', required=True, help='Password of the storm accounts')
+        parser.add_argument(
+            '--allow-create', action='store_true',
+            help='Create missing storm accounts even though DEBUG is off',
+        )
+        parser.add_argument('--login-concurrency', type=int, default=16)
+        parser.add_argument('--threads', type=int, default=64, help='Threads the virtual users are run on')
+
+    def handle(self, *args, **options):
+        counts = {
+            'reporter': options['reporters'], 'lead': options['leads'],
+            'crew': options['crews'], 'dashboard': options['dashboards'],
+        }
+        accounts = self.ensure_accounts(counts, options['password'], options['allow_create'])
+        sessions = self.login(options['base_url'], accounts, options['password'], options['login_concurrency'])
+        crew_ids = [user_id for role, _email, user_id, _token in sessions if role == 'crew']
+
+        # Interleave roles deterministically so every role is present at low ramp levels
+        rng = random.Random(options['seed'])
+        rng.shuffle(sessions)
+
+        stats = Stats()
+        connections = threading.local()
+        users = [
+            VirtualUser(role, Client(options['base_url'], stats, token, connections=connections),
+                        random.Random(options['seed'] * 100003 + i), user_id, crew_ids)
+            for i, (role, _email, user_id, token) in enumerate(sessions)
+        ]
+        threads = max(1, min(options['threads'], len(users)))
+        self.stdout.write(
+            f"Running {len(users)} virtual users on {threads} threads for {options['duration']:.0f}s "
+            f"({options['profile']} profile)"
+        )
+
+        start = time.monotonic()
+        deadline = start + options['duration']
+        think = options['think_ms'] / 1000
+        # (time the user is next due, user index). Threads take whichever user is
+        # due first, so a user only holds a thread while its request runs.
+        due = [(start, index) for index in range(len(users))]
+        lock = threading.Lock()
+
+        def run():
+            while True:
+                with lock:
+                    if not due:
+                        break
+                    at, index = heapq.heappop(due)
+                if at >= deadline:
+                    break
+                time.sleep(max(0.0, at - time.monotonic()))
+                user = users[index]
+                elapsed = time.monotonic() - start
+                if index >= len(users) * ramp_factor(options['profile'], elapsed, options['duration'], options['ramp']):
+                    next_at = time.monotonic() + 0.1
+                else:
+                    user.step()
+                    next_at = time.monotonic() + (user.rng.expovariate(1 / think) if think else 0)
+                with lock:
+                    heapq.heappush(due, (next_at, index))
+            users[0].client.close()
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for future in [pool.submit(run) for _ in range(threads)]:
+                future.result()
+        self.report(stats, time.monotonic() - start)
+
+    def ensure_accounts(self, counts, password, allow_create=False):
+        """
+        Create the storm accounts that do not exist yet. Returns (role, email) pairs.
+        """
+        accounts = [
+            (role, f'storm-{role}-{i}@loadtest.local')
+            for role in ROLES for i in range(counts[role])
+        ]
+        storm_users = User.objects.filter(email__endswith='@loadtest.local')
+        existing = set(storm_users.values_list('email', flat=True))
+        # Dashboard accounts from earlier runs were admins
+        storm_users.filter(email__startswith='storm-dashboard-').exclude(role=ACCOUNT_ROLES['dashboard']).update(
+            role=ACCOUNT_ROLES['dashboard']
+        )
+        missing = [(role, email) for role, email in accounts if email not in existing]
+        if missing and not (settings.DEBUG or allow_create):
+            raise CommandError(
+                f'{len(missing)} storm accounts are missing. Pass --allow-create to create them '
+                'on a server with DEBUG off.'
+            )
+        if missing:
+            template = User()
+            template.set_password(password)
+            User.objects.bulk_create([
+                User(email=email, first_name='Storm', last_name=role.title(), role=ACCOUNT_ROLES[role],
+                     password=template.password)
+                for role, email in missing
+            ], batch_size=1000)
+            self.stdout.write(f'Created {len(missing)} load test accounts')
+        return accounts
+
+    def login(self, base_url, accounts, password, concurrency):
+        """
+        Log every account in through the login view to get its real token
+        """
+        stats = Stats()
+
+        def login(account):
+            role, email = account
+            client = Client(base_url, stats)
+            # Logins are unauthenticated, so they all share this host's rate limit
+            # bucket; wait out 429s instead of failing the run
+            for _attempt in range(LOGIN_ATTEMPTS):
+                status, data = client.request('POST', '/api/auth/login/', 'POST /auth/login/', {
+                    'email': email, 'password': password,
+                })
+                if status != 429:
+                    break
+                try:
+                    delay = float(client.retry_after)
+                except (TypeError, ValueError):
+                    delay = 1.0
+                time.sleep(delay + random.uniform(0, 1))
+            client.close()
+            if status != 200 or not data:
+                raise CommandError(f'Login failed for {email}: HTTP {status} {data}')
+            return role, email, data['user']['id'], data['token']
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            sessions = list(pool.map(login, accounts))
+        self.stdout.write(f'Logged in {len(sessions)} accounts in {time.monotonic() - start:.1f}s')
+        return sessions
+
+    def report(self, stats, elapsed):
+        header = f"{'endpoint':<26} {'count':>7} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'errors':>7} {'429s':>6}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        total = 0
+        for endpoint in sorted(stats.latencies):
+            latencies = sorted(stats.latencies[endpoint])
+            statuses = stats.statuses[endpoint]
+            count = len(latencies)
+            total += count
+            errors = sum(n for status, n in statuses.items() if status == 'error' or status >= 500)
+            throttled = statuses.get(429, 0)
+
+            def pct(p):
+                return latencies[max(0, math.ceil(count * p / 100) - 1)] * 1000
+
+            self.stdout.write(
+                f'{endpoint:<26} {count:>7} {count / elapsed:>8.1f} {pct(50):>7.0f}ms {pct(90):>7.0f}ms '
+                f'{pct(99):>7.0f}ms {latencies[-1] * 1000:>7.0f}ms {errors / count:>7.1%} {throttled / count:>6.1%}'
+            )
+        self.stdout.write(f'Total {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)')
+        other = {
+            endpoint: dict(statuses) for endpoint, statuses in stats.statuses.items()
+            if any(status not in (200, 201, 429) for status in statuses)
+        }
+        if other:
+            self.stdout.write(f'Status codes: {json.dumps(other, default=str)}')
@@ -0,0 +1,16 @@
+"""
+locations/management/commands/rebuild_workload_counters.py
+"""
+from django.core.management.base import BaseCommand
+from locations.workload import rebuild_workload_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-user open assignment counters from the locations table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = rebuild_workload_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} workload counters'))
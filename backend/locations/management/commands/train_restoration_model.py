@@ -0,0 +1,30 @@
+"""
+locations/management/commands/train_restoration_model.py
+"""
+from django.core.management.base import BaseCommand, CommandError
+from locations.eta import FEATURES, score_open_locations, train_restoration_model
+
+
+class Command(BaseCommand):
+    help = (
+        'Fit the restoration ETA model on resolved outages and store it. The '
+        'background jobs refit it daily and rescore open outages periodically.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Days of resolutions to train on (defaults to ETA_TRAINING_DAYS)')
+        parser.add_argument('--holdout', type=float, default=0.2, help='Fraction of resolutions held out for the MAE')
+        parser.add_argument('--score', action='store_true', help='Rescore open outages with the new model')
+
+    def handle(self, *args, **options):
+        model = train_restoration_model(days=options['days'], holdout=options['holdout'])
+        if model is None:
+            raise CommandError('Not enough resolved outages with a restoration time to train on')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Trained on {model.samples} resolutions, held-out MAE {model.mae_hours:.2f} hours'
+        ))
+        for feature, coefficient in zip(FEATURES, model.parameters['coefficients']):
+            self.stdout.write(f'  {feature:<20} {coefficient:+.4f}')
+        if options['score']:
+            self.stdout.write(f'Updated {score_open_locations(model)} open outages')
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:58
+
+import django.db.models.deletion
+import locations.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0002_update_reporter_contact_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationReport',
+            fields=[
+                ('id', models.CharField(default=locations.models.generate_uuid, editable=False, max_length=10, primary_key=True, serialize=False, unique=True)),
+                ('reporter_email', models.EmailField(blank=True, max_length=254)),
+                ('reporter_phone', models.CharField(blank=True, max_length=20)),
+                ('description', models.TextField(blank=True)),
+                ('estimated_customers_affected', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='locations.location')),
+                ('reported_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicate_reports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Location Report',
+                'verbose_name_plural': 'Location Reports',
+                'db_table': 'locations_locationreport',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
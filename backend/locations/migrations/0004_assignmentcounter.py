@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    Location = apps.get_model('locations', 'Location')
+    AssignmentCounter = apps.get_model('locations', 'AssignmentCounter')
+    rows = (
+        Location.objects.filter(assigned_to__isnull=False, status__in=['reported', 'investigating', 'in_progress'])
+        .order_by()
+        .values('assigned_to_id', 'status', 'priority')
+        .annotate(total=models.Count('id'))
+    )
+    AssignmentCounter.objects.bulk_create([
+        AssignmentCounter(user_id=row['assigned_to_id'], status=row['status'], priority=row['priority'], count=row['total'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0003_locationreport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('reported', 'Reported'), ('investigating', 'Investigating'), ('in_progress', 'In Progress'), ('resolved', 'Resolved'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('critical', 'Critical')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignment_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Assignment Counter',
+                'verbose_name_plural': 'Assignment Counters',
+                'db_table': 'locations_assignmentcounter',
+                'constraints': [models.UniqueConstraint(fields=('user', 'status', 'priority'), name='unique_assignment_counter')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
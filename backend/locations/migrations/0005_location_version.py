@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0004_assignmentcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
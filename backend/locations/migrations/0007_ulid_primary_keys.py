@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:08
+#
+# Existing 10-character hex IDs (and the FKs pointing at them) are kept as-is;
+# only new rows get ULIDs. On PostgreSQL widening varchar(10) to varchar(26)
+# does not rewrite tables or indexes, but AlterField would also drop and re-add
+# every foreign key pointing at the column, validating each one by scanning the
+# referencing table under lock. The database side is done by hand instead: the
+# foreign keys come back NOT VALID and are validated without blocking writes
+# in a later non-atomic migration.
+
+import accounts.models
+from accounts.online_schema import widen_primary_key
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0006_outboxevent'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(
+                    widen_primary_key(
+                        'locations_location', 'locations_locationreport', 'locations_locationupdate', length=26,
+                    ),
+                    migrations.RunPython.noop,
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='location',
+                    name='id',
+                    field=models.CharField(default=accounts.models.generate_ulid, editable=False, max_length=26, primary_key=True, serialize=False, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='locationreport',
+                    name='id',
+                    field=models.CharField(default=accounts.models.generate_ulid, editable=False, max_length=26, primary_key=True, serialize=False, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='locationupdate',
+                    name='id',
+                    field=models.CharField(default=accounts.models.generate_ulid, editable=False, max_length=26, primary_key=True, serialize=False, unique=True),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:19
+#
+# Admin search uses istartswith/iexact, which PostgreSQL runs as
+# UPPER(column) LIKE 'TERM%'. Those expression indexes need the pattern
+# operator class and have no SQLite equivalent, so they are created with
+# raw SQL on PostgreSQL only.
+
+from django.conf import settings
+from django.db import migrations, models
+
+SEARCH_INDEXES = [
+    ('location_name_search_idx', 'locations_location', 'name'),
+    ('location_address_search_idx', 'locations_location', 'address'),
+    ('location_city_search_idx', 'locations_location', 'city'),
+    ('location_state_search_idx', 'locations_location', 'state'),
+    ('location_zip_search_idx', 'locations_location', 'zip_code'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} (UPPER({column}) varchar_pattern_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0007_ulid_primary_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['-created_at'], name='location_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locationupdate',
+            index=models.Index(fields=['location', '-created_at'], name='locationupdate_timeline_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0008_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('replay_from_id', models.BigIntegerField(default=0)),
+                ('location_count', models.PositiveIntegerField(default=0)),
+                ('fields', models.JSONField(default=list)),
+                ('rows', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'Location Snapshot',
+                'verbose_name_plural': 'Location Snapshots',
+                'db_table': 'locations_locationsnapshot',
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LocationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_id', models.CharField(max_length=32)),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('changed', 'Changed'), ('deleted', 'Deleted')], max_length=10)),
+                ('changes', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Location Event',
+                'verbose_name_plural': 'Location Events',
+                'db_table': 'locations_locationevent',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['created_at'], name='locationevent_created_idx'), models.Index(fields=['location_id', 'id'], name='locationevent_location_idx')],
+            },
+        ),
+    ]
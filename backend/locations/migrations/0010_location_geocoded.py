@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0009_location_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='geocoded',
+            field=models.BooleanField(default=False, help_text='Coordinates are the zip code centroid from the offline geocoder, not the reported position'),
+        ),
+    ]
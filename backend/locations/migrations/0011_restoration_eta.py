@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0010_location_geocoded'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestorationModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('samples', models.PositiveIntegerField()),
+                ('mae_hours', models.FloatField(help_text='Mean absolute error on held-out resolutions')),
+                ('parameters', models.JSONField()),
+            ],
+            options={
+                'verbose_name': 'Restoration Model',
+                'verbose_name_plural': 'Restoration Models',
+                'db_table': 'locations_restorationmodel',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='restoration_predicted',
+            field=models.BooleanField(default=False, help_text='Estimated restoration comes from the ETA model and is rescored periodically'),
+        ),
+    ]
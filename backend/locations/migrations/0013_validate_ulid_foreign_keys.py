@@ -0,0 +1,21 @@
+# Validates the foreign keys 0007_ulid_primary_keys re-added NOT VALID. Not
+# atomic, so each VALIDATE CONSTRAINT commits on its own and holds only a
+# lock that lets reads and writes continue.
+
+from accounts.online_schema import validate_foreign_keys
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('locations', '0012_location_updated_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            validate_foreign_keys('locations_location', 'locations_locationreport', 'locations_locationupdate'),
+            migrations.RunPython.noop,
+        ),
+    ]
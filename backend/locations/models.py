@@ -4,7 +4,7 @@ locations/models.py
 import uuid
 from django.db import models
 from django.utils import timezone
-from accounts.models import User
+from accounts.models import User, generate_ulid
 
 
 def generate_uuid():
@@ -12,6 +12,10 @@ def generate_uuid():
     return str(uuid.uuid4().hex[:10])
 
 
+class VersionConflict(Exception):
+    """Raised when a location was changed by someone else since it was read"""
+
+
 class Location(models.Model):
     """
     Model for tracking power outage locations
@@ -31,9 +35,15 @@ class Location(models.Model):
         ('critical', 'Critical'),
     ]
     
+    # Statuses that count as an active (unresolved) outage
+    OPEN_STATUSES = ['reported', 'investigating', 'in_progress']
+    
+    # Sort rank for priorities, higher is more urgent
+    PRIORITY_RANKS = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+    
     id = models.CharField(
-        max_length=10,
-        default=generate_uuid,
+        max_length=26,
+        default=generate_ulid,
         unique=True,
         editable=False,
         primary_key=True,
@@ -47,6 +57,10 @@ class Location(models.Model):
     zip_code = models.CharField(max_length=10)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geocoded = models.BooleanField(
+        default=False,
+        help_text="Coordinates are the zip code centroid from the offline geocoder, not the reported position"
+    )
     
     # Outage details
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='reported')
@@ -82,19 +96,89 @@ class Location(models.Model):
     reported_at = models.DateTimeField(default=timezone.now)
     estimated_restoration = models.DateTimeField(null=True, blank=True)
     actual_restoration = models.DateTimeField(null=True, blank=True)
+    restoration_predicted = models.BooleanField(
+        default=False,
+        help_text="Estimated restoration comes from the ETA model and is rescored periodically"
+    )
+    
+    # Optimistic concurrency control, bumped on every update
+    version = models.PositiveIntegerField(default=1, editable=False)
     
     class Meta:
         db_table = 'locations_location'
         ordering = ['-created_at']
         verbose_name = 'Location'
         verbose_name_plural = 'Locations'
+        indexes = [
+            models.Index(fields=['-created_at'], name='location_created_idx'),
+            # Polled by the public outage lookup for recently changed rows
+            models.Index(fields=['updated_at'], name='location_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.city}, {self.state}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded column values so saves can be diffed"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def get_changed_fields(self):
+        """Return the names of loaded fields whose value differs from the database"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname in loaded and getattr(self, field.attname) != loaded[field.attname]
+        ]
+    
+    def save(self, *args, **kwargs):
+        """
+        Updates only write the fields that changed since the row was loaded
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            changed = self.get_changed_fields()
+            if changed is not None:
+                kwargs['update_fields'] = set(changed) | {'updated_at'}
+        super().save(*args, **kwargs)
+    
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        Turn every update into UPDATE ... WHERE version = n and bump the version
+        """
+        version_field = self._meta.get_field('version')
+        expected = self.version
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, expected + 1))
+        
+        updated = super()._do_update(
+            base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update
+        )
+        if updated:
+            self.version = expected + 1
+        elif base_qs.filter(pk=pk_val).exists():
+            raise VersionConflict(f"Location {pk_val} is no longer at version {expected}")
+        return updated
+    
+    @classmethod
+    def priority_rank(cls):
+        """Database expression ranking priorities so they can be ordered by urgency"""
+        return models.Case(
+            *[models.When(priority=priority, then=models.Value(rank)) for priority, rank in cls.PRIORITY_RANKS.items()],
+            default=models.Value(0),
+            output_field=models.IntegerField(),
+        )
+    
+    @property
+    def is_open(self):
+        return self.status in self.OPEN_STATUSES
+    
     @property
     def is_assigned(self):
-        return self.assigned_to is not None
+        return self.assigned_to_id is not None
     
     @property
     def is_resolved(self):
@@ -114,7 +198,7 @@ class Location(models.Model):
         """Check if a user can edit this location"""
         if not user.is_authenticated:
             return False
-        return user.can_edit_locations() or self.assigned_to == user
+        return user.can_edit_locations() or self.assigned_to_id == user.pk
 
 
 class LocationUpdate(models.Model):
@@ -122,8 +206,8 @@ class LocationUpdate(models.Model):
     Model for tracking updates to locations
     """
     id = models.CharField(
-        max_length=10,
-        default=generate_uuid,
+        max_length=26,
+        default=generate_ulid,
         unique=True,
         editable=False,
         primary_key=True,
@@ -151,6 +235,175 @@ class LocationUpdate(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Location Update'
         verbose_name_plural = 'Location Updates'
+        indexes = [
+            models.Index(fields=['location', '-created_at'], name='locationupdate_timeline_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Update for {self.location.name} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+class LocationReport(models.Model):
+    """
+    Additional outage report merged into an existing location as a duplicate
+    """
+    id = models.CharField(
+        max_length=26,
+        default=generate_ulid,
+        unique=True,
+        editable=False,
+        primary_key=True,
+    )
+    
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='reports')
+    reported_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicate_reports'
+    )
+    reporter_email = models.EmailField(blank=True)
+    reporter_phone = models.CharField(max_length=20, blank=True)
+    description = models.TextField(blank=True)
+    estimated_customers_affected = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'locations_locationreport'
+        ordering = ['-created_at']
+        verbose_name = 'Location Report'
+        verbose_name_plural = 'Location Reports'
+    
+    def __str__(self):
+        return f"Report for {self.location.name} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class AssignmentCounter(models.Model):
+    """
+    Denormalized count of a user's open assignments per status and priority
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='assignment_counters')
+    status = models.CharField(max_length=20, choices=Location.STATUS_CHOICES)
+    priority = models.CharField(max_length=10, choices=Location.PRIORITY_CHOICES)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'locations_assignmentcounter'
+        verbose_name = 'Assignment Counter'
+        verbose_name_plural = 'Assignment Counters'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'status', 'priority'], name='unique_assignment_counter'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.status}/{self.priority}: {self.count}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Location event waiting to be delivered to a webhook endpoint.
+    Written in the same transaction as the LocationUpdate it describes.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('dead', 'Dead'),
+    ]
+    
+    endpoint = models.CharField(max_length=50)
+    event_type = models.CharField(max_length=20)
+    location_id = models.CharField(max_length=32)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'locations_outboxevent'
+        ordering = ['id']
+        verbose_name = 'Outbox Event'
+        verbose_name_plural = 'Outbox Events'
+        indexes = [
+            models.Index(
+                fields=['endpoint', 'id'],
+                condition=models.Q(status='pending'),
+                name='outbox_pending_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.endpoint} - {self.event_type} - {self.location_id} ({self.status})"
+
+
+class LocationEvent(models.Model):
+    """
+    One change to a location. Field values are stored as JSON; created and
+    reopened locations carry every field so replay does not need earlier state.
+    """
+    KIND_CHOICES = [
+        ('created', 'Created'),
+        ('changed', 'Changed'),
+        ('deleted', 'Deleted'),
+    ]
+    
+    location_id = models.CharField(max_length=32)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    changes = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'locations_locationevent'
+        ordering = ['id']
+        verbose_name = 'Location Event'
+        verbose_name_plural = 'Location Events'
+        indexes = [
+            models.Index(fields=['created_at'], name='locationevent_created_idx'),
+            models.Index(fields=['location_id', 'id'], name='locationevent_location_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.location_id} - {self.kind} at {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+
+class LocationSnapshot(models.Model):
+    """
+    Periodic copy of every open location. Rows are lists of values in the
+    order of `fields`. Events after `replay_from_id` bring it up to any later time.
+    """
+    taken_at = models.DateTimeField(default=timezone.now, db_index=True)
+    replay_from_id = models.BigIntegerField(default=0)
+    location_count = models.PositiveIntegerField(default=0)
+    fields = models.JSONField(default=list)
+    rows = models.JSONField(default=list)
+    
+    class Meta:
+        db_table = 'locations_locationsnapshot'
+        ordering = ['-taken_at']
+        verbose_name = 'Location Snapshot'
+        verbose_name_plural = 'Location Snapshots'
+    
+    def __str__(self):
+        return f"{self.location_count} open locations at {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class RestorationModel(models.Model):
+    """
+    Fitted parameters of the restoration ETA model. The newest row is used
+    for scoring.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    samples = models.PositiveIntegerField()
+    mae_hours = models.FloatField(help_text="Mean absolute error on held-out resolutions")
+    parameters = models.JSONField()
+    
+    class Meta:
+        db_table = 'locations_restorationmodel'
+        ordering = ['-created_at']
+        verbose_name = 'Restoration Model'
+        verbose_name_plural = 'Restoration Models'
     
     def __str__(self):
-        return f"Update for {self.location.name} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
\ No newline at end of file
+        return f"ETA model {self.created_at:%Y-%m-%d %H:%M} ({self.samples} samples, MAE {self.mae_hours:.1f}h)"
@@ -0,0 +1,194 @@
+"""
+locations/outbox.py
+"""
+import hashlib
+import hmac
+import json
+import logging
+import random
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.db.models import Min
+from django.utils import timezone
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def webhook_endpoints():
+    return getattr(settings, 'WEBHOOK_ENDPOINTS', {})
+
+
+def location_event_payload(update):
+    """
+    Build the webhook payload for a LocationUpdate
+    """
+    location = update.location
+    return {
+        'event_type': update.update_type,
+        'location': {
+            'id': location.id,
+            'status': location.status,
+            'priority': location.priority,
+            'assigned_to_id': location.assigned_to_id,
+            'city': location.city,
+            'state': location.state,
+            'zip_code': location.zip_code,
+            'latitude': location.latitude,
+            'longitude': location.longitude,
+            'estimated_customers_affected': location.estimated_customers_affected,
+            'version': location.version,
+        },
+        'update': {
+            'id': update.id,
+            'updated_by_id': update.updated_by_id,
+            'previous_status': update.previous_status,
+            'new_status': update.new_status,
+            'notes': update.notes,
+            'created_at': update.created_at,
+        },
+    }
+
+
+def enqueue_location_update(update):
+    """
+    Fan a LocationUpdate out to one outbox row per subscribed endpoint.
+    Runs inside the caller's transaction so events commit with the update.
+    """
+    endpoints = [
+        name for name, config in webhook_endpoints().items()
+        if update.update_type in config.get('events', [update.update_type])
+    ]
+    if not endpoints:
+        return
+    payload = json.loads(json.dumps(location_event_payload(update), cls=DjangoJSONEncoder))
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(endpoint=name, event_type=update.update_type, location_id=update.location_id, payload=payload)
+        for name in endpoints
+    ])
+
+
+class OutboxDispatcher:
+    """
+    Drains pending outbox events to their webhook endpoints.
+
+    Each endpoint is handled by one thread at a time. A worker only claims an
+    endpoint's batch when it can lock that endpoint's oldest pending event, and
+    leases the head event until the delivery finishes, so events for an
+    endpoint are delivered in id order even with several workers running. A failed batch stays at the head of the queue with
+    exponential backoff, which also holds back the events behind it.
+    """
+    def __init__(self, batch_size=50, concurrency=4, max_attempts=10, backoff_seconds=5, timeout=10):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+
+    def run_once(self):
+        """
+        Deliver one batch per endpoint. Returns the number of events delivered.
+        """
+        endpoints = webhook_endpoints()
+        if not endpoints:
+            return 0
+        # SQLite allows one writer at a time, so drain endpoints one by one there
+        concurrency = self.concurrency if connection.features.has_select_for_update_skip_locked else 1
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return sum(pool.map(self._drain_endpoint_in_thread, endpoints.items()))
+
+    def _drain_endpoint_in_thread(self, item):
+        name, config = item
+        try:
+            return self.drain_endpoint(name, config)
+        except Exception:
+            logger.exception('Outbox drain failed for endpoint %s', name)
+            return 0
+        finally:
+            connections.close_all()
+
+    def drain_endpoint(self, name, config):
+        batch = self.claim(name, config)
+        if not batch:
+            return 0
+
+        # Delivered outside the claim transaction, so no row locks are held for the request
+        error = self.deliver(config, [self.envelope(event) for event in batch])
+        if error is None:
+            OutboxEvent.objects.filter(id__in=[event.id for event in batch]).update(
+                status='delivered', delivered_at=timezone.now(), attempts=batch[0].attempts + 1, last_error=''
+            )
+            return len(batch)
+
+        self.record_failure(batch, error)
+        return 0
+
+    def claim(self, name, config):
+        """
+        Take the next batch of an endpoint's queue. The head event's
+        next_attempt_at is pushed past the delivery timeout, which keeps other
+        workers off the endpoint until the result is recorded, or until the
+        lease runs out if this worker dies mid-delivery.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            pending = OutboxEvent.objects.filter(endpoint=name, status='pending')
+            head_id = pending.aggregate(head=Min('id'))['head']
+            if head_id is None:
+                return []
+
+            batch = pending.order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                batch = batch.select_for_update(skip_locked=True)
+            batch = list(batch[:self.batch_size])
+
+            # Another worker holds the head of this endpoint's queue, or it is backing off
+            if not batch or batch[0].id != head_id or batch[0].next_attempt_at > now:
+                return []
+
+            lease = timedelta(seconds=2 * config.get('timeout', self.timeout) + 5)
+            OutboxEvent.objects.filter(id=head_id).update(next_attempt_at=now + lease)
+            return batch
+
+    def record_failure(self, batch, error):
+        attempts = batch[0].attempts + 1
+        logger.warning('Webhook delivery to %s failed (attempt %s): %s', batch[0].endpoint, attempts, error)
+        if attempts >= self.max_attempts:
+            OutboxEvent.objects.filter(id__in=[event.id for event in batch]).update(
+                status='dead', attempts=attempts, last_error=error
+            )
+            return
+        delay = self.backoff_seconds * 2 ** (attempts - 1) * random.uniform(0.8, 1.2)
+        OutboxEvent.objects.filter(id__in=[event.id for event in batch]).update(
+            attempts=attempts, last_error=error, next_attempt_at=timezone.now() + timedelta(seconds=delay)
+        )
+
+    @staticmethod
+    def envelope(event):
+        return {'event_id': event.id, 'created_at': event.created_at.isoformat(), **event.payload}
+
+    def deliver(self, config, events):
+        """
+        POST a batch of events. Returns None on success or an error message.
+        """
+        body = json.dumps({'events': events}).encode()
+        headers = {'Content-Type': 'application/json'}
+        if config.get('secret'):
+            signature = hmac.new(config['secret'].encode(), body, hashlib.sha256).hexdigest()
+            headers['X-Scout-Signature'] = f'sha256={signature}'
+
+        request = urllib.request.Request(config['url'], data=body, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=config.get('timeout', self.timeout)) as response:
+                if 200 <= response.status < 300:
+                    return None
+                return f'HTTP {response.status}'
+        except urllib.error.HTTPError as exc:
+            return f'HTTP {exc.code}'
+        except (urllib.error.URLError, OSError) as exc:
+            return str(getattr(exc, 'reason', exc))
@@ -2,6 +2,7 @@
 locations/permissions.py
 """
 from rest_framework import permissions
+from accounts.cache import get_user_snapshot
 
 
 class CanAssignLocations(permissions.BasePermission):
@@ -39,11 +40,11 @@ class CanEditLocations(permissions.BasePermission):
             return True
         
         # Team members can edit locations assigned to them
-        if request.user.is_team_member and obj.assigned_to == request.user:
+        if request.user.is_team_member and obj.assigned_to_id == request.user.pk:
             return True
         
         # Reporters can edit locations they reported (limited fields)
-        if request.user.is_reporter and obj.reported_by == request.user:
+        if request.user.is_reporter and obj.reported_by_id == request.user.pk:
             return True
         
         return False
@@ -63,16 +64,17 @@ class CanViewLocation(permissions.BasePermission):
         
         # Team leads can view locations assigned to them or their team members
         if request.user.is_team_lead:
-            return obj.assigned_to == request.user or (
-                obj.assigned_to and obj.assigned_to.role == 'team_member'
-            )
+            if obj.assigned_to_id == request.user.pk:
+                return True
+            assignee = get_user_snapshot(obj.assigned_to_id)
+            return bool(assignee and assignee.role == 'team_member')
         
         # Team members can view locations assigned to them
         if request.user.is_team_member:
-            return obj.assigned_to == request.user
+            return obj.assigned_to_id == request.user.pk
         
         # Reporters can view locations they reported
         if request.user.is_reporter:
-            return obj.reported_by == request.user
+            return obj.reported_by_id == request.user.pk
         
         return False
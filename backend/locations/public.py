@@ -0,0 +1,305 @@
+"""
+locations/public.py
+"""
+import json
+import math
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from .dedup import METERS_PER_DEGREE, haversine_meters, normalize_zip
+from .models import Location, LocationEvent
+
+# About a kilometre: enough for a map pin without giving away the address
+PUBLIC_COORDINATE_DECIMALS = 2
+PUBLIC_FIELDS = (
+    'id', 'status', 'city', 'state', 'zip_code', 'latitude', 'longitude',
+    'estimated_customers_affected', 'reported_at', 'estimated_restoration', 'restoration_predicted',
+)
+# Rows are re-read from this far before the last poll, so changes committed
+# late or stamped by a process with a slightly slow clock are not missed
+REFRESH_OVERLAP_SECONDS = 30
+STATUS_LABELS = dict(Location.STATUS_CHOICES)
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+class PublicOutageIndex:
+    """
+    Per-process index of active outages behind the public lookup, by 5-digit
+    zip code and by a lat/lon grid whose cells are as wide as the lookup radius.
+
+    Only the fields shown to the public are kept, and coordinates only as the
+    rounded point that is shown. Radius matching uses that point too, so
+    probing with many lookups cannot narrow an outage down to its address.
+
+    Lookups read the current maps without locking; refreshes poll rows whose
+    updated_at moved, plus deletions from the location event log, and swap in
+    updated copies. A full rebuild every PUBLIC_LOOKUP_REBUILD_SECONDS catches
+    anything polling missed.
+    """
+    def __init__(self, radius_km=None):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._radius_km = radius_km
+        self._state = None
+        self._polled_at = None
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._refreshing = False
+
+    @property
+    def radius_km(self):
+        if self._radius_km is not None:
+            return self._radius_km
+        return getattr(settings, 'PUBLIC_LOOKUP_RADIUS_KM', 2)
+
+    @property
+    def cell_degrees(self):
+        return self.radius_km * 1000 / METERS_PER_DEGREE
+
+    @property
+    def as_of(self):
+        return self._state[3] if self._state is not None else None
+
+    def build(self):
+        """
+        Load every active outage from the database and swap it in
+        """
+        polled_at = timezone.now()
+        rows = Location.objects.filter(status__in=Location.OPEN_STATUSES).order_by().values_list(*PUBLIC_FIELDS)
+        self.load(rows.iterator(chunk_size=5000), polled_at)
+
+    def load(self, rows, polled_at):
+        """
+        Replace the index with open location rows of PUBLIC_FIELDS
+        """
+        entries = {row[0]: self._entry(row) for row in rows}
+        by_zip, by_cell = {}, {}
+        for location_id, (_encoded, zip_code, cell, _point, _reported_at) in entries.items():
+            by_zip.setdefault(zip_code, []).append(location_id)
+            if cell is not None:
+                by_cell.setdefault(cell, []).append(location_id)
+
+        with self._lock:
+            self._state = (
+                entries,
+                {key: self._newest_first(entries, ids) for key, ids in by_zip.items()},
+                {key: tuple(ids) for key, ids in by_cell.items()},
+                polled_at,
+            )
+            self._polled_at = polled_at
+            self._refreshed_at = self._rebuilt_at = time.monotonic()
+
+    def refresh(self):
+        """
+        Apply locations changed or deleted since the last poll. Returns the
+        number of outages added, changed or removed.
+        """
+        if self._state is None:
+            self.build()
+            return len(self._state[0])
+
+        polled_at = timezone.now()
+        since = self._polled_at - timedelta(seconds=REFRESH_OVERLAP_SECONDS)
+        entries, by_zip, by_cell, _as_of = self._state
+
+        updates = {}
+        for row in Location.objects.filter(updated_at__gte=since).order_by().values_list(*PUBLIC_FIELDS):
+            updates[row[0]] = self._entry(row) if row[1] in Location.OPEN_STATUSES else None
+        deleted = LocationEvent.objects.filter(kind='deleted', created_at__gte=since).values_list('location_id', flat=True)
+        for location_id in deleted:
+            updates.setdefault(location_id, None)
+        # The overlap re-reads rows that were already applied
+        updates = {
+            location_id: entry for location_id, entry in updates.items() if entries.get(location_id) != entry
+        }
+
+        if updates:
+            entries, by_zip, by_cell = dict(entries), dict(by_zip), dict(by_cell)
+            for location_id, entry in updates.items():
+                previous = entries.pop(location_id, None)
+                if previous is not None:
+                    self._discard(by_zip, previous[1], location_id)
+                    self._discard(by_cell, previous[2], location_id)
+                if entry is not None:
+                    entries[location_id] = entry
+                    by_zip[entry[1]] = self._newest_first(entries, by_zip.get(entry[1], ()) + (location_id,))
+                    if entry[2] is not None:
+                        by_cell[entry[2]] = by_cell.get(entry[2], ()) + (location_id,)
+
+        with self._lock:
+            self._state = (entries, by_zip, by_cell, polled_at)
+            self._polled_at = polled_at
+            self._refreshed_at = time.monotonic()
+        return len(updates)
+
+    def ensure_fresh(self):
+        """
+        Build on first use, then refresh in the background once the last poll
+        is older than PUBLIC_LOOKUP_REFRESH_SECONDS
+        """
+        if self._state is None:
+            with self._build_lock:
+                if self._state is None:
+                    self.build()
+            return
+
+        now = time.monotonic()
+        if now - self._refreshed_at < getattr(settings, 'PUBLIC_LOOKUP_REFRESH_SECONDS', 2):
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        rebuild = now - self._rebuilt_at >= getattr(settings, 'PUBLIC_LOOKUP_REBUILD_SECONDS', 300)
+        threading.Thread(target=self._refresh_in_background, args=(rebuild,), daemon=True).start()
+
+    def _refresh_in_background(self, rebuild):
+        try:
+            if rebuild:
+                self.build()
+            else:
+                self.refresh()
+        finally:
+            self._refreshing = False
+            connections.close_all()
+
+    def by_zip(self, zip_code):
+        """
+        Encoded active outages in a zip code, most recently reported first
+        """
+        entries, by_zip, _by_cell, _as_of = self._state
+        return [entries[location_id][0] for location_id in by_zip.get(normalize_zip(zip_code), ())]
+
+    def near(self, latitude, longitude):
+        """
+        Encoded active outages within the lookup radius of a point, nearest first
+        """
+        entries, _by_zip, by_cell, _as_of = self._state
+        radius_meters = self.radius_km * 1000
+        # Bounding box in degrees, so most candidates are rejected before the haversine
+        lat_span = radius_meters / METERS_PER_DEGREE
+        lon_span = lat_span / max(math.cos(math.radians(latitude)), 0.01)
+        found = []
+        for cell in self._neighbour_cells(latitude, longitude):
+            for location_id in by_cell.get(cell, ()):
+                encoded, _zip_code, _cell, point, _reported_at = entries[location_id]
+                if abs(point[0] - latitude) > lat_span or abs(point[1] - longitude) > lon_span:
+                    continue
+                distance = haversine_meters(latitude, longitude, *point)
+                if distance <= radius_meters:
+                    found.append((distance, encoded))
+        found.sort(key=lambda pair: pair[0])
+        return [encoded for _distance, encoded in found]
+
+    def _entry(self, row):
+        """
+        (public fields as JSON, zip, cell, rounded point, reported_at) for one
+        location row. Encoding once here keeps lookups to joining bytes.
+        """
+        (_id, status, city, state, zip_code, latitude, longitude,
+         customers, reported_at, estimated_restoration, restoration_predicted) = row
+        point = None
+        if latitude is not None and longitude is not None:
+            point = (
+                round(float(latitude), PUBLIC_COORDINATE_DECIMALS),
+                round(float(longitude), PUBLIC_COORDINATE_DECIMALS),
+            )
+        zip_code = normalize_zip(zip_code)
+        item = {
+            'status': status,
+            'status_display': STATUS_LABELS.get(status, status),
+            'city': city,
+            'state': state,
+            'zip_code': zip_code,
+            'latitude': point[0] if point else None,
+            'longitude': point[1] if point else None,
+            'customers_affected': customers,
+            'reported_at': _isoformat(reported_at),
+            'estimated_restoration': _isoformat(estimated_restoration),
+            'restoration_predicted': restoration_predicted,
+        }
+        cell = self._cell(*point) if point else None
+        return json.dumps(item).encode(), zip_code, cell, point, item['reported_at']
+
+    @staticmethod
+    def _newest_first(entries, ids):
+        return tuple(sorted(ids, key=lambda location_id: entries[location_id][4], reverse=True))
+
+    def _cell(self, lat, lon):
+        size = self.cell_degrees
+        return (math.floor(lat / size), math.floor(lon / size))
+
+    def _neighbour_cells(self, lat, lon):
+        row, col = self._cell(lat, lon)
+        # Longitude degrees shrink towards the poles, so widen the column span
+        span = math.ceil(1 / max(math.cos(math.radians(lat)), 0.01))
+        for d_row in (-1, 0, 1):
+            for d_col in range(-span, span + 1):
+                yield (row + d_row, col + d_col)
+
+    @staticmethod
+    def _discard(buckets, key, location_id):
+        ids = buckets.get(key)
+        if ids is None:
+            return
+        ids = tuple(other for other in ids if other != location_id)
+        if ids:
+            buckets[key] = ids
+        else:
+            del buckets[key]
+
+
+public_outage_index = PublicOutageIndex()
+
+
+def lookup_response(lookup, outages, as_of):
+    """
+    JSON response for a lookup, splicing in the pre-encoded outages
+    """
+    head = json.dumps({**lookup, 'affected': bool(outages), 'count': len(outages), 'as_of': _isoformat(as_of)})
+    limit = getattr(settings, 'PUBLIC_LOOKUP_MAX_RESULTS', 20)
+    body = b''.join((head[:-1].encode(), b', "outages": [', b', '.join(outages[:limit]), b']}'))
+    response = HttpResponse(body, content_type='application/json')
+    # Answers change at most once per refresh, so shared caches can absorb repeats
+    response['Cache-Control'] = f"public, max-age={getattr(settings, 'PUBLIC_LOOKUP_REFRESH_SECONDS', 2)}"
+    return response
+
+
+@require_GET
+def outage_lookup(request):
+    """
+    Public "is my address affected?" lookup by `?zip=` or `?lat=&lon=`. Needs no
+    authentication and is served from the in-memory index, never the database.
+    """
+    params = request.GET
+    if params.get('zip'):
+        zip_code = normalize_zip(params['zip'])
+        if len(zip_code) != 5:
+            return JsonResponse({'error': 'zip must be a 5-digit zip code'}, status=400)
+        lookup = {'zip': zip_code}
+    elif params.get('lat') and params.get('lon'):
+        try:
+            latitude, longitude = float(params['lat']), float(params['lon'])
+        except ValueError:
+            return JsonResponse({'error': 'lat and lon must be numbers'}, status=400)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return JsonResponse({'error': 'lat and lon are out of range'}, status=400)
+        lookup = {'lat': latitude, 'lon': longitude, 'radius_km': public_outage_index.radius_km}
+    else:
+        return JsonResponse({'error': 'zip or lat and lon are required'}, status=400)
+
+    public_outage_index.ensure_fresh()
+    if 'zip' in lookup:
+        outages = public_outage_index.by_zip(lookup['zip'])
+    else:
+        outages = public_outage_index.near(lookup['lat'], lookup['lon'])
+
+    return lookup_response(lookup, outages, public_outage_index.as_of)
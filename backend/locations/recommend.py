@@ -0,0 +1,150 @@
+"""
+locations/recommend.py
+"""
+import numpy as np
+from django.conf import settings
+from accounts.models import User
+from .models import Location
+
+EARTH_RADIUS_KM = 6371.0
+
+# How strongly an assignee's existing workload counts against them per priority
+PRIORITY_WORKLOAD_WEIGHTS = {
+    'low': 0.5,
+    'medium': 1.0,
+    'high': 2.0,
+    'critical': 4.0,
+}
+
+# Most location x user cells scored at once, about 16 MB per float64 matrix
+CHUNK_CELLS = 2_000_000
+
+
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    """
+    Pairwise great-circle distances in km between two sets of points (degrees).
+    Returns an array of shape (len(lat1), len(lat2)).
+    """
+    lat1 = np.radians(lat1)[:, None]
+    lon1 = np.radians(lon1)[:, None]
+    lat2 = np.radians(lat2)[None, :]
+    lon2 = np.radians(lon2)[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def rank_candidates(location_coords, priority_weights, user_coords, user_workloads, limit):
+    """
+    Rank users for each location. Lower cost is better.
+
+    location_coords: (L, 2) lat/lon, NaN when unknown
+    priority_weights: (L,) workload weight for each location's priority
+    user_coords: (U, 2) centroid of each user's open assignments, NaN when none
+    user_workloads: (U,) open assignment counts
+    Returns (indices, costs, distances) each of shape (L, k). Locations are
+    scored in chunks so the dense cost matrices stay bounded.
+    """
+    rows = max(1, CHUNK_CELLS // max(len(user_coords), 1))
+    chunks = [
+        _rank_chunk(location_coords[start:start + rows], priority_weights[start:start + rows],
+                    user_coords, user_workloads, limit)
+        for start in range(0, len(location_coords), rows)
+    ]
+    if not chunks:
+        return _rank_chunk(location_coords, priority_weights, user_coords, user_workloads, limit)
+    return tuple(np.concatenate(parts) for parts in zip(*chunks))
+
+
+def _rank_chunk(location_coords, priority_weights, user_coords, user_workloads, limit):
+    distance_scale = getattr(settings, 'RECOMMENDER_DISTANCE_SCALE_KM', 10.0)
+    unknown_distance = getattr(settings, 'RECOMMENDER_UNKNOWN_DISTANCE_KM', 25.0)
+
+    distances = haversine_matrix(
+        location_coords[:, 0], location_coords[:, 1], user_coords[:, 0], user_coords[:, 1]
+    )
+    distances = np.where(np.isnan(distances), unknown_distance, distances)
+
+    costs = distances / distance_scale + priority_weights[:, None] * user_workloads[None, :]
+
+    limit = min(limit, costs.shape[1])
+    if limit == 0:
+        empty = np.empty((costs.shape[0], 0))
+        return empty.astype(int), empty, empty
+
+    top = np.argpartition(costs, limit - 1, axis=1)[:, :limit]
+    top_costs = np.take_along_axis(costs, top, axis=1)
+    order = np.argsort(top_costs, axis=1)
+    indices = np.take_along_axis(top, order, axis=1)
+    return (
+        indices,
+        np.take_along_axis(costs, indices, axis=1),
+        np.take_along_axis(distances, indices, axis=1),
+    )
+
+
+def _coords(rows):
+    return np.array(
+        [[np.nan, np.nan] if lat is None or lon is None else [float(lat), float(lon)] for lat, lon in rows],
+        dtype=float,
+    ).reshape(-1, 2)
+
+
+def recommend_assignees(locations, limit=3):
+    """
+    Recommend eligible assignees for each of the given locations
+    """
+    locations = list(locations)
+    users = list(
+        User.objects.filter(role__in=User.ASSIGNABLE_ROLES, is_active=True)
+        .order_by('id')
+        .only('id', 'first_name', 'last_name', 'email', 'role')
+    )
+    if not locations:
+        return []
+
+    user_index = {user.id: i for i, user in enumerate(users)}
+    workloads = np.zeros(len(users))
+    sums = np.zeros((len(users), 2))
+    located = np.zeros(len(users))
+
+    open_work = (
+        Location.objects.filter(assigned_to__in=user_index.keys(), status__in=Location.OPEN_STATUSES)
+        .order_by()
+        .values_list('assigned_to_id', 'latitude', 'longitude')
+    )
+    for user_id, lat, lon in open_work.iterator(chunk_size=5000):
+        i = user_index[user_id]
+        workloads[i] += 1
+        if lat is not None and lon is not None:
+            sums[i] += (float(lat), float(lon))
+            located[i] += 1
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        user_coords = sums / located[:, None]
+
+    location_coords = _coords((location.latitude, location.longitude) for location in locations)
+    priority_weights = np.array([PRIORITY_WORKLOAD_WEIGHTS.get(location.priority, 1.0) for location in locations])
+
+    indices, costs, distances = rank_candidates(location_coords, priority_weights, user_coords, workloads, limit)
+
+    results = []
+    for row, location in enumerate(locations):
+        candidates = []
+        for col, user_idx in enumerate(indices[row]):
+            user = users[user_idx]
+            distance = None if np.isnan(user_coords[user_idx, 0]) or np.isnan(location_coords[row, 0]) \
+                else round(float(distances[row, col]), 2)
+            candidates.append({
+                'user_id': user.id,
+                'full_name': user.get_full_name(),
+                'role': user.role,
+                'open_assignments': int(workloads[user_idx]),
+                'distance_km': distance,
+                'cost': round(float(costs[row, col]), 4),
+            })
+        results.append({
+            'location_id': location.id,
+            'priority': location.priority,
+            'candidates': candidates,
+        })
+    return results
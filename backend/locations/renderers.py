@@ -0,0 +1,129 @@
+"""
+locations/renderers.py
+"""
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from accounts.cache import get_user_snapshots
+from .models import Location
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are only offered when msgpack is installed
+    msgpack = None
+
+COLUMNAR_FIELDS = [
+    'id', 'name', 'address', 'city', 'state', 'zip_code', 'latitude', 'longitude',
+    'status', 'priority', 'description', 'estimated_customers_affected',
+    'assigned_to_id', 'reported_by_id', 'reporter_email', 'reporter_phone',
+    'created_at', 'updated_at', 'reported_at', 'estimated_restoration', 'actual_restoration',
+    'version',
+]
+
+# Low-cardinality columns sent as indexes into a per-response dictionary
+DICTIONARY_FIELDS = ['status', 'priority', 'city', 'state']
+DATETIME_FIELDS = ['created_at', 'updated_at', 'reported_at', 'estimated_restoration', 'actual_restoration']
+USER_FIELDS = ['assigned_to_id', 'reported_by_id']
+
+
+def _isoformat(value):
+    if value is None:
+        return None
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def columnar_locations(queryset):
+    """
+    Encode locations column by column. Enum-like columns hold indexes into
+    `dictionaries`, user columns hold indexes into the `users` table.
+    """
+    rows = list(queryset.values_list(*COLUMNAR_FIELDS))
+    columns = {
+        field: list(values) for field, values in zip(COLUMNAR_FIELDS, zip(*rows))
+    } if rows else {field: [] for field in COLUMNAR_FIELDS}
+
+    dictionaries = {}
+    for field in DICTIONARY_FIELDS:
+        codes = {}
+        columns[field] = [codes.setdefault(value, len(codes)) for value in columns[field]]
+        dictionaries[field] = list(codes)
+
+    for field in ('latitude', 'longitude'):
+        columns[field] = [None if value is None else float(value) for value in columns[field]]
+    for field in DATETIME_FIELDS:
+        columns[field] = [_isoformat(value) for value in columns[field]]
+
+    user_ids = {}
+    for field in USER_FIELDS:
+        columns[field[:-3]] = [
+            None if user_id is None else user_ids.setdefault(user_id, len(user_ids))
+            for user_id in columns.pop(field)
+        ]
+    snapshots = get_user_snapshots(user_ids)
+    users = [snapshots.get(user_id) for user_id in user_ids]
+
+    return {
+        'format': 'columnar',
+        'count': len(rows),
+        'columns': columns,
+        'dictionaries': dictionaries,
+        'labels': {
+            'status': dict(Location.STATUS_CHOICES),
+            'priority': dict(Location.PRIORITY_CHOICES),
+        },
+        'users': {
+            'id': list(user_ids),
+            'email': [user.email if user else None for user in users],
+            'full_name': [user.get_full_name() if user else None for user in users],
+            'role': [user.role if user else None for user in users],
+        },
+    }
+
+
+class ColumnarJSONRenderer(BaseRenderer):
+    """
+    Compact JSON for columnar payloads, selected with
+    Accept: application/vnd.scout.columnar+json
+    """
+    media_type = 'application/vnd.scout.columnar+json'
+    format = 'columnar'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack for columnar payloads, selected with
+    Accept: application/vnd.scout.columnar+msgpack
+    """
+    media_type = 'application/vnd.scout.columnar+msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=str, use_bin_type=True)
+
+
+def columnar_renderers():
+    renderers = [ColumnarJSONRenderer]
+    if msgpack is not None:
+        renderers.append(MessagePackRenderer)
+    return renderers
+
+
+def bulk_read_renderers():
+    """Default renderers first so plain JSON stays the default, then the columnar formats"""
+    return list(api_settings.DEFAULT_RENDERER_CLASSES) + columnar_renderers()
+
+
+def wants_columnar(request):
+    return isinstance(getattr(request, 'accepted_renderer', None), tuple(columnar_renderers()))
@@ -0,0 +1,145 @@
+"""
+locations/rollup.py
+"""
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Sum
+
+
+def _empty_node():
+    return {'open_outages': 0, 'customers_affected': 0, 'children': {}}
+
+
+class ImpactRollup:
+    """
+    Per-process state -> city -> zip rollup of open outages and customers affected.
+
+    The tree is built once from a grouped query, kept current by applying
+    deltas from location signals and periodically rebuilt in the background
+    to pick up writes made by other processes or by queryset.update().
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._root = None
+        self._built_at = 0.0
+        self._reconciling = False
+
+    @property
+    def reconcile_interval(self):
+        return getattr(settings, 'IMPACT_ROLLUP_RECONCILE_SECONDS', 300)
+
+    def build(self):
+        """
+        Rebuild the whole tree from the database
+        """
+        from .models import Location
+
+        rows = (
+            Location.objects.filter(status__in=Location.OPEN_STATUSES)
+            .order_by()
+            .values('state', 'city', 'zip_code')
+            .annotate(open_outages=Count('id'), customers_affected=Sum('estimated_customers_affected'))
+        )
+        root = _empty_node()
+        for row in rows:
+            self._add(root, (row['state'], row['city'], row['zip_code']),
+                      row['open_outages'], row['customers_affected'] or 0)
+
+        with self._lock:
+            self._root = root
+            self._built_at = time.monotonic()
+
+    def apply(self, old, new):
+        """
+        Apply the change between two location snapshots (either may be None)
+        """
+        with self._lock:
+            if self._root is None:
+                return
+            if old and old['status'] in self._open_statuses():
+                self._add(self._root, self._path(old), -1, -(old['estimated_customers_affected'] or 0))
+            if new and new['status'] in self._open_statuses():
+                self._add(self._root, self._path(new), 1, new['estimated_customers_affected'] or 0)
+
+    def drilldown(self, state=None, city=None):
+        """
+        Return totals for the requested level with one entry per child area
+        """
+        self._ensure_fresh()
+
+        with self._lock:
+            node = self._root
+            path = [key for key in (state, city) if key is not None]
+            for key in path:
+                node = node['children'].get(key)
+                if node is None:
+                    node = _empty_node()
+                    break
+
+            children = [
+                {
+                    'key': key,
+                    'open_outages': child['open_outages'],
+                    'customers_affected': child['customers_affected'],
+                }
+                for key, child in sorted(node['children'].items())
+            ]
+            return {
+                'level': ('state', 'city', 'zip_code')[len(path)],
+                'state': state,
+                'city': city,
+                'open_outages': node['open_outages'],
+                'customers_affected': node['customers_affected'],
+                'children': children,
+            }
+
+    def _ensure_fresh(self):
+        if self._root is None:
+            self.build()
+            return
+
+        with self._lock:
+            stale = time.monotonic() - self._built_at > self.reconcile_interval
+            if not stale or self._reconciling:
+                return
+            self._reconciling = True
+
+        threading.Thread(target=self._reconcile, daemon=True).start()
+
+    def _reconcile(self):
+        try:
+            self.build()
+        finally:
+            self._reconciling = False
+            connections.close_all()
+
+    @staticmethod
+    def _open_statuses():
+        from .models import Location
+        return Location.OPEN_STATUSES
+
+    @staticmethod
+    def _path(snapshot):
+        return (snapshot['state'], snapshot['city'], snapshot['zip_code'])
+
+    @staticmethod
+    def _add(root, path, outages, customers):
+        nodes = [root]
+        node = root
+        for key in path:
+            node = node['children'].setdefault(key, _empty_node())
+            nodes.append(node)
+
+        for node in nodes:
+            node['open_outages'] += outages
+            node['customers_affected'] += customers
+
+        # Prune areas that no longer have open outages
+        for parent, key, child in reversed(list(zip(nodes, path, nodes[1:]))):
+            if child['open_outages'] <= 0:
+                del parent['children'][key]
+
+
+impact_rollup = ImpactRollup()
@@ -0,0 +1,70 @@
+"""
+locations/route_cache.py
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+# Location fields that change a crew member's route
+ROUTE_FIELDS = ('assigned_to_id', 'status', 'priority', 'latitude', 'longitude')
+
+
+class RouteCache:
+    """
+    Planned routes in the Django cache, keyed by a per-user generation. Fed
+    with location changes like the in-memory indexes: any change to a user's
+    open assignments bumps their generation, so older routes are never read
+    again and expire on their own.
+    """
+    def get_or_plan(self, user_id, start, plan):
+        """
+        Return (route, cached). The start is snapped to a grid cell and plan is
+        called with the snapped point, so a crew moving within a cell keeps
+        hitting the same entry. The key is taken before planning, so a route
+        planned from rows that changed meanwhile is stored under a stale generation.
+        """
+        start = self.snap(start)
+        key = self._key(user_id, start)
+        route = cache.get(key)
+        if route is not None:
+            return route, True
+        route = plan(start)
+        cache.set(key, route, getattr(settings, 'ROUTE_CACHE_TTL', 3600))
+        return route, False
+
+    def apply(self, old, new):
+        from .models import Location
+
+        def routed(snapshot):
+            return snapshot is not None and snapshot['assigned_to_id'] and snapshot['status'] in Location.OPEN_STATUSES
+
+        if old is not None and new is not None and all(old[field] == new[field] for field in ROUTE_FIELDS):
+            return
+        for snapshot in (old, new):
+            if routed(snapshot):
+                self.invalidate(snapshot['assigned_to_id'])
+
+    @staticmethod
+    def snap(start):
+        if start is None:
+            return None
+        decimals = getattr(settings, 'ROUTE_CACHE_START_DECIMALS', 2)
+        # Adding 0.0 turns -0.0 into 0.0 so both sides of the zero line share a key
+        return (round(start[0], decimals) + 0.0, round(start[1], decimals) + 0.0)
+
+    def invalidate(self, user_id):
+        key = self._generation_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    def _generation_key(self, user_id):
+        return f'route-generation:{user_id}'
+
+    def _key(self, user_id, start):
+        generation = cache.get(self._generation_key(user_id), 0)
+        start = 'none' if start is None else f'{start[0]!r},{start[1]!r}'
+        return f'route:{user_id}:{generation}:{start}'
+
+
+route_cache = RouteCache()
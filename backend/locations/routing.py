@@ -0,0 +1,157 @@
+"""
+locations/routing.py
+"""
+import numpy as np
+from .models import Location
+from .recommend import haversine_matrix
+
+# How much waiting at each priority costs, per km travelled before the stop
+ROUTE_PRIORITY_WEIGHTS = {'low': 1.0, 'medium': 2.0, 'high': 4.0, 'critical': 8.0}
+
+
+def weighted_nearest_neighbour(distances, weights, first):
+    """
+    Greedy tour: from each stop go to the unvisited one with the lowest
+    distance per unit of priority weight
+    """
+    n = len(weights)
+    visited = np.zeros(n, dtype=bool)
+    tour = [first]
+    visited[first] = True
+    for _ in range(n - 1):
+        scores = distances[tour[-1]] / weights
+        scores[visited] = np.inf
+        nearest = int(np.argmin(scores))
+        tour.append(nearest)
+        visited[nearest] = True
+    return np.array(tour)
+
+
+def two_opt(tour, distances, weights, fixed_start=False, max_passes=50):
+    """
+    Improve a tour by segment reversals, minimizing the priority-weighted sum
+    of distances travelled before each stop is reached. For each segment start
+    the cost change of every segment end is computed at once from prefix sums.
+    """
+    n = len(tour)
+    tour = tour.copy()
+    first = 1 if fixed_start else 0
+    positions = np.arange(n)
+    changed = True
+    for _ in range(max_passes):
+        improved = False
+        for i in range(first, n - 1):
+            if changed:
+                arrival = np.zeros(n)
+                np.cumsum(distances[tour[:-1], tour[1:]], out=arrival[1:])
+                w = weights[tour]
+                weight_prefix = np.zeros(n + 1)
+                np.cumsum(w, out=weight_prefix[1:])
+                weighted_arrival_prefix = np.zeros(n + 1)
+                np.cumsum(w * arrival, out=weighted_arrival_prefix[1:])
+                changed = False
+
+            j = positions[i + 1:]
+            # Arrival at position i after reversing i..j, where stop tour[j] now comes first
+            start = arrival[i - 1] + distances[tour[i - 1], tour[j]] if i > 0 else 0.0
+            segment_weight = weight_prefix[j + 1] - weight_prefix[i]
+            segment_weighted_arrival = weighted_arrival_prefix[j + 1] - weighted_arrival_prefix[i]
+            delta = (start + arrival[j]) * segment_weight - 2 * segment_weighted_arrival
+
+            # Everything after the segment shifts by the change in arrival time at
+            # j + 1; tail_weight is zero when the segment runs to the end
+            after = np.minimum(j + 1, n - 1)
+            shift = start + arrival[j] - arrival[i] + distances[tour[i], tour[after]] - arrival[after]
+            tail_weight = weight_prefix[n] - weight_prefix[j + 1]
+            delta += shift * tail_weight
+
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                end = int(j[best])
+                tour[i:end + 1] = tour[i:end + 1][::-1].copy()
+                improved = changed = True
+        if not improved:
+            break
+    return tour
+
+
+def plan_route(coords, priorities, start=None):
+    """
+    Order stops into a visiting sequence. coords is (N, 2) lat/lon, start an
+    optional (lat, lon) the crew sets out from. Returns (order, legs_km) where
+    order indexes into coords and legs_km[k] is the distance into stop order[k].
+    """
+    n = len(coords)
+    if n == 0:
+        return np.array([], dtype=int), np.array([])
+
+    weights = np.array([ROUTE_PRIORITY_WEIGHTS.get(priority, 1.0) for priority in priorities])
+    points = np.asarray(coords, dtype=float)
+    if start is not None:
+        # The start is stop 0 with no weight, pinned to the front of the tour
+        points = np.vstack([start, points])
+        weights = np.concatenate(([0.0], weights))
+    distances = haversine_matrix(points[:, 0], points[:, 1], points[:, 0], points[:, 1])
+
+    if start is not None:
+        first = 0
+    else:
+        # Without a start position, begin at the most urgent stop
+        first = int(np.argmax(weights))
+    tour = weighted_nearest_neighbour(distances, np.maximum(weights, 1e-9), first)
+    tour = two_opt(tour, distances, weights, fixed_start=start is not None)
+
+    legs = np.concatenate(([0.0], distances[tour[:-1], tour[1:]]))
+    if start is not None:
+        return tour[1:] - 1, legs[1:]
+    return tour, legs
+
+
+def route_for_user(user_id, start=None):
+    """
+    Plan the visiting order of a user's open assignments
+    """
+    locations = list(
+        Location.objects.filter(assigned_to_id=user_id, status__in=Location.OPEN_STATUSES)
+        .order_by('id')
+        .only('id', 'name', 'address', 'city', 'latitude', 'longitude', 'priority', 'status')
+    )
+    located = [location for location in locations if location.latitude is not None and location.longitude is not None]
+    unlocated = [location for location in locations if location.latitude is None or location.longitude is None]
+
+    order, legs = plan_route(
+        [(float(location.latitude), float(location.longitude)) for location in located],
+        [location.priority for location in located],
+        start=start,
+    )
+
+    stops = []
+    travelled = 0.0
+    for index, leg in zip(order, legs):
+        location = located[index]
+        travelled += float(leg)
+        stops.append({
+            'id': location.id,
+            'name': location.name,
+            'address': location.address,
+            'city': location.city,
+            'latitude': float(location.latitude),
+            'longitude': float(location.longitude),
+            'priority': location.priority,
+            'status': location.status,
+            'leg_km': round(float(leg), 3),
+            'cumulative_km': round(travelled, 3),
+        })
+
+    ranks = Location.PRIORITY_RANKS
+    return {
+        'user_id': user_id,
+        'start': list(start) if start is not None else None,
+        'total_km': round(travelled, 3),
+        'stops': stops,
+        # Stops without coordinates cannot be placed; most urgent first
+        'unlocated': [
+            {'id': location.id, 'name': location.name, 'address': location.address, 'priority': location.priority}
+            for location in sorted(unlocated, key=lambda location: -ranks.get(location.priority, 0))
+        ],
+    }
@@ -3,15 +3,16 @@ locations/serializers.py
 """
 from rest_framework import serializers
 from .models import Location, LocationUpdate
-from accounts.serializers import UserSerializer
+from .geocoder import fill_coordinates
+from accounts.serializers import CachedUserField, CachedUserListSerializer
 
 
 class LocationSerializer(serializers.ModelSerializer):
     """
     Serializer for Location model
     """
-    assigned_to = UserSerializer(read_only=True)
-    reported_by = UserSerializer(read_only=True)
+    assigned_to = CachedUserField(source='assigned_to_id')
+    reported_by = CachedUserField(source='reported_by_id')
     assigned_to_id = serializers.CharField(write_only=True, required=False)
     reported_by_id = serializers.CharField(write_only=True, required=False)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -24,15 +25,16 @@ class LocationSerializer(serializers.ModelSerializer):
         model = Location
         fields = [
             'id', 'name', 'address', 'city', 'state', 'zip_code',
-            'latitude', 'longitude', 'status', 'status_display',
+            'latitude', 'longitude', 'geocoded', 'status', 'status_display',
             'priority', 'priority_display', 'description',
             'estimated_customers_affected', 'assigned_to', 'assigned_to_id',
             'reported_by', 'reported_by_id', 'reporter_email', 'reporter_phone',
             'created_at', 'updated_at', 'reported_at',
-            'estimated_restoration', 'actual_restoration',
-            'is_assigned', 'is_resolved', 'is_critical'
+            'estimated_restoration', 'restoration_predicted', 'actual_restoration',
+            'is_assigned', 'is_resolved', 'is_critical', 'version'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'version', 'geocoded', 'restoration_predicted']
+        list_serializer_class = CachedUserListSerializer
     
     def create(self, validated_data):
         """
@@ -70,20 +72,48 @@ class LocationCreateSerializer(serializers.ModelSerializer):
     """
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+    is_duplicate = serializers.SerializerMethodField()
     
     class Meta:
         model = Location
         fields = [
-            'name', 'address', 'city', 'state', 'zip_code',
-            'latitude', 'longitude', 'priority', 'priority_display',
+            'id', 'name', 'address', 'city', 'state', 'zip_code',
+            'latitude', 'longitude', 'geocoded', 'priority', 'priority_display',
             'status_display', 'description', 'estimated_customers_affected', 
-            'reporter_email', 'reporter_phone'
+            'reporter_email', 'reporter_phone', 'is_duplicate'
         ]
+        read_only_fields = ['id', 'geocoded']
+    
+    def get_is_duplicate(self, obj):
+        """True when the submission was merged into an existing outage"""
+        return getattr(obj, 'is_duplicate_report', False)
+    
+    def to_representation(self, instance):
+        """
+        A merged submission gets back only the outage's id and status, never the
+        original reporter's details
+        """
+        if getattr(instance, 'is_duplicate_report', False):
+            return {
+                'id': instance.id,
+                'status': instance.status,
+                'status_display': instance.get_status_display(),
+                'is_duplicate': True,
+            }
+        return super().to_representation(instance)
     
     def create(self, validated_data):
         """
         Create location with reporter set from request user and auto-populate email
         """
+        location = self.build(validated_data)
+        location.save(force_insert=True)
+        return location
+    
+    def build(self, validated_data):
+        """
+        Return the unsaved location for validated data, so creates can be batched
+        """
         user = self.context['request'].user
         validated_data['reported_by'] = user
         
@@ -94,15 +124,18 @@ class LocationCreateSerializer(serializers.ModelSerializer):
         # Clean phone number - remove all non-numeric characters
         if validated_data.get('reporter_phone'):
             validated_data['reporter_phone'] = ''.join(filter(str.isdigit, validated_data['reporter_phone']))
-            
-        return Location.objects.create(**validated_data)
+        
+        location = Location(**validated_data)
+        # Reports without coordinates get their zip code centroid from the offline geocoder
+        fill_coordinates(location)
+        return location
 
 
 class LocationUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for LocationUpdate model
     """
-    updated_by = UserSerializer(read_only=True)
+    updated_by = CachedUserField(source='updated_by_id')
     location = LocationSerializer(read_only=True)
     update_type_display = serializers.CharField(source='get_update_type_display', read_only=True)
     
@@ -113,6 +146,7 @@ class LocationUpdateSerializer(serializers.ModelSerializer):
             'previous_status', 'new_status', 'notes', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
+        list_serializer_class = CachedUserListSerializer
 
 
 class LocationAssignmentSerializer(serializers.Serializer):
@@ -125,7 +159,7 @@ class LocationAssignmentSerializer(serializers.Serializer):
         from accounts.models import User
         try:
             user = User.objects.get(id=value)
-            if user.role not in ['admin', 'team_lead', 'team_member']:
+            if user.role not in User.ASSIGNABLE_ROLES:
                 raise serializers.ValidationError(
                     "User must be admin, team_lead, or team_member"
                 )
@@ -145,8 +179,9 @@ class LocationEditSerializer(serializers.ModelSerializer):
         model = Location
         fields = [
             'reporter_email', 'reporter_phone', 'status', 'status_display',
-            'priority', 'priority_display', 'assigned_to'
+            'priority', 'priority_display', 'assigned_to', 'version'
         ]
+        read_only_fields = ['version']
     
     def validate_status(self, value):
         """
@@ -0,0 +1,53 @@
+"""
+locations/signals.py
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Location, LocationUpdate
+from .rollup import impact_rollup
+from .dedup import duplicate_index
+from .clusters import cluster_pyramid
+from .route_cache import route_cache
+from .workload import apply_workload_change
+from .outbox import enqueue_location_update
+from .history import record_location_event
+
+# In-memory indexes fed with (old, new) location snapshots after commit
+LOCATION_INDEXES = [impact_rollup, duplicate_index, cluster_pyramid, route_cache]
+
+
+def location_snapshot(instance):
+    """Return the concrete column values of a location keyed by attname"""
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def _publish(old, new, using):
+    def apply():
+        for index in LOCATION_INDEXES:
+            index.apply(old, new)
+    transaction.on_commit(apply, using=using)
+
+
+@receiver(post_save, sender=Location)
+def location_saved(sender, instance, created, using, **kwargs):
+    new = location_snapshot(instance)
+    old = None if created else {**new, **getattr(instance, '_loaded_values', {})}
+    instance._loaded_values = new
+    apply_workload_change(old, new)
+    record_location_event(old, new)
+    _publish(old, new, using)
+
+
+@receiver(post_delete, sender=Location)
+def location_deleted(sender, instance, using, **kwargs):
+    old = {**location_snapshot(instance), **getattr(instance, '_loaded_values', {})}
+    apply_workload_change(old, None)
+    record_location_event(old, None)
+    _publish(old, None, using)
+
+
+@receiver(post_save, sender=LocationUpdate)
+def location_update_saved(sender, instance, created, **kwargs):
+    if created:
+        enqueue_location_update(instance)
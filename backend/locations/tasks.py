@@ -0,0 +1,79 @@
+"""
+locations/tasks.py
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from jobs.registry import job
+from .history import snapshots_to_thin, take_snapshot
+from .models import LocationEvent, LocationSnapshot, OutboxEvent
+
+
+@job(name='locations.snapshot_open_locations',
+     every=timedelta(seconds=getattr(settings, 'LOCATION_SNAPSHOT_INTERVAL_SECONDS', 900)))
+def snapshot_open_locations():
+    """
+    Snapshot open locations so as_of queries replay at most one interval of events
+    """
+    return take_snapshot().location_count
+
+
+@job(name='locations.purge_history', every=timedelta(hours=1))
+def purge_history(batch_size=1000):
+    """
+    Thin older snapshots to hourly and then daily, and delete snapshots and
+    events past the retention window, in bounded batches
+    """
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'LOCATION_HISTORY_RETENTION_DAYS', 90))
+    deleted = 0
+    thinned = snapshots_to_thin()
+    for start in range(0, len(thinned), batch_size):
+        deleted += LocationSnapshot.objects.filter(id__in=thinned[start:start + batch_size]).delete()[0]
+    for expired in (
+        LocationSnapshot.objects.filter(taken_at__lt=cutoff),
+        LocationEvent.objects.filter(created_at__lt=cutoff),
+    ):
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += expired.model.objects.filter(id__in=ids).delete()[0]
+    return deleted
+
+
+@job(name='locations.score_restoration_etas',
+     every=timedelta(seconds=getattr(settings, 'ETA_SCORING_INTERVAL_SECONDS', 300)))
+def score_restoration_etas():
+    """
+    Refresh predicted restoration times of open outages from the latest ETA model
+    """
+    from .eta import score_open_locations
+
+    return score_open_locations()
+
+
+@job(name='locations.train_restoration_model', every=timedelta(days=1))
+def train_restoration_model():
+    """
+    Refit the ETA model on recent resolutions
+    """
+    from .eta import train_restoration_model as train
+
+    model = train()
+    return model.samples if model else 0
+
+
+@job(name='locations.purge_outbox', every=timedelta(hours=1))
+def purge_outbox(batch_size=1000):
+    """
+    Delete delivered outbox events past the retention window in bounded batches.
+    Dead events are kept for inspection.
+    """
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'OUTBOX_RETENTION_DAYS', 7))
+    delivered = OutboxEvent.objects.filter(status='delivered', delivered_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(delivered.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
@@ -1,3 +1,413 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from .batching import CreateCoalescer
+from .dedup import duplicate_index
+from .history import locations_as_of, snapshots_to_thin
+from .management.commands.loadtest_storm import Command as LoadTestCommand
+from .models import Location, LocationEvent, LocationSnapshot, LocationUpdate, OutboxEvent
+from .outbox import OutboxDispatcher
+from .public import PublicOutageIndex
 
-# Create your tests here.
+
+class DuplicateReportTests(TestCase):
+    def setUp(self):
+        duplicate_index.clear()
+        self.first = User.objects.create_user(email='first@example.com', password='pass', role='reporter')
+        self.second = User.objects.create_user(email='second@example.com', password='pass', role='reporter')
+        self.report = {
+            'name': 'No power', 'address': '1 Main Street', 'city': 'Springfield',
+            'state': 'IL', 'zip_code': '62701', 'reporter_phone': '555-0100',
+        }
+
+    def post(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, client.post('/api/locations/', self.report, format='json')
+
+    def test_merged_report_gets_no_reporter_details(self):
+        # Indexes are fed by on_commit hooks, which TestCase otherwise never runs
+        with self.captureOnCommitCallbacks(execute=True):
+            _client, original = self.post(self.first)
+        client, merged = self.post(self.second)
+
+        self.assertEqual(merged.status_code, 201)
+        self.assertEqual(merged.data, {
+            'id': original.data['id'], 'status': 'reported', 'status_display': 'Reported', 'is_duplicate': True,
+        })
+        self.assertEqual(client.get(f"/api/locations/{original.data['id']}/").status_code, 404)
+        self.assertEqual(client.get('/api/locations/').data['count'], 0)
+
+
+class CustomActionPermissionTests(TestCase):
+    def setUp(self):
+        self.member = User.objects.create_user(email='member@example.com', password='pass', role='team_member')
+        self.lead = User.objects.create_user(email='lead@example.com', password='pass', role='team_lead')
+        self.location = Location.objects.create(
+            name='Substation', address='1 Main Street', city='Springfield', state='IL', zip_code='62701',
+            assigned_to=self.member,
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_team_member_cannot_use_assign_only_actions(self):
+        client = self.client_for(self.member)
+        # Before actions kept their own permission_classes, both were open to any signed-in user
+        response = client.post(f'/api/locations/{self.location.id}/assign/', {'user_id': self.lead.id}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(client.get('/api/locations/impact/').status_code, 403)
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.assigned_to_id, self.member.id)
+
+    def test_team_lead_can_use_assign_only_actions(self):
+        client = self.client_for(self.lead)
+        response = client.post(f'/api/locations/{self.location.id}/assign/', {'user_id': self.lead.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get('/api/locations/impact/').status_code, 200)
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.assigned_to_id, self.lead.id)
+
+
+class BlockingCoalescer(CreateCoalescer):
+    """Coalescer whose first flush waits until released"""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.flushing = threading.Event()
+        self.release = threading.Event()
+
+    def flush(self, batch):
+        self.flushing.set()
+        self.release.wait(5)
+        super().flush(batch)
+
+
+class CreateCoalescerTimeoutTests(TransactionTestCase):
+    def submit(self, coalescer, name):
+        location = Location(name=name, address='1 Main Street', city='Springfield', state='IL', zip_code='62701')
+        return coalescer.submit(location, LocationUpdate(update_type='general_update', notes='Reported'))
+
+    def test_timed_out_create_is_never_written(self):
+        coalescer = BlockingCoalescer(window_ms=1, timeout=0.5)
+        results = {}
+        writer = threading.Thread(target=lambda: results.setdefault('first', self.submit(coalescer, 'First')))
+        writer.start()
+        self.assertTrue(coalescer.flushing.wait(5))
+
+        # The coalescer is busy, so the second create is still queued when it times out
+        with self.assertRaises(TimeoutError):
+            self.submit(coalescer, 'Second')
+        coalescer.release.set()
+        writer.join(5)
+
+        # The first create was already being written, so it waited past the timeout for the flush
+        self.assertEqual(results['first'].name, 'First')
+        # Queued after the withdrawn create, so it is only written once that one was skipped
+        self.submit(coalescer, 'Third')
+        self.assertEqual(set(Location.objects.values_list('name', flat=True)), {'First', 'Third'})
+
+
+class RouteCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = User.objects.create_user(email='member@example.com', password='pass', role='team_member')
+        for n, (latitude, longitude) in enumerate([(39.80, -89.64), (39.76, -89.66)]):
+            Location.objects.create(
+                name=f'Feeder {n}', address=f'{n} Main Street', city='Springfield', state='IL', zip_code='62701',
+                latitude=latitude, longitude=longitude, assigned_to=self.member,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def get_route(self, start):
+        response = self.client.get('/api/locations/route/', {'start': start})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_nearby_starts_share_a_cached_route(self):
+        first = self.get_route('39.7812,-89.6498')
+        second = self.get_route('39.7808,-89.6503')
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(first['stops'], second['stops'])
+
+    def test_distant_starts_are_planned_separately(self):
+        self.get_route('39.7812,-89.6498')
+        self.assertFalse(self.get_route('39.8012,-89.6498')['cached'])
+
+
+class StubWebhook:
+    """
+    Local HTTP server standing in for a webhook endpoint. Answers with the
+    queued status codes, then 200, and records every request.
+    """
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests.append((dict(self.headers), body))
+                self.send_response(stub.statuses.pop(0) if stub.statuses else 200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hook'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def batches(self):
+        return [[event['event_id'] for event in json.loads(body)['events']] for _headers, body in self.requests]
+
+
+class ThrottlingLoginStub:
+    """
+    Local HTTP server standing in for the login view. Answers the first
+    `throttled` requests with 429 and Retry-After, then logs everyone in.
+    """
+    def __init__(self, throttled, retry_after='2'):
+        self.throttled = throttled
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests += 1
+                if stub.requests <= stub.throttled:
+                    body = json.dumps({'error': 'Too many requests, please try again later'}).encode()
+                    self.send_response(429)
+                    self.send_header('Retry-After', retry_after)
+                else:
+                    body = json.dumps({'token': 'abc123', 'user': {'id': 'u1'}}).encode()
+                    self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class LoadTestLoginTests(SimpleTestCase):
+    def test_throttled_logins_wait_and_retry(self):
+        stub = ThrottlingLoginStub(throttled=2)
+        self.addCleanup(stub.close)
+        command = LoadTestCommand(stdout=StringIO())
+
+        with mock.patch('locations.management.commands.loadtest_storm.time.sleep') as sleep:
+            sessions = command.login(stub.url, [('crew', 'crew@example.com')], 'pass', concurrency=1)
+
+        self.assertEqual(sessions, [('crew', 'crew@example.com', 'u1', 'abc123')])
+        self.assertEqual(stub.requests, 3)
+        self.assertEqual(sleep.call_count, 2)
+        for call in sleep.call_args_list:
+            self.assertGreaterEqual(call.args[0], 2)
+
+
+class OutboxDeliveryTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(
+            name='Substation', address='1 Main Street', city='Springfield', state='IL', zip_code='62701'
+        )
+
+    def stub(self, statuses=()):
+        stub = StubWebhook(statuses)
+        self.addCleanup(stub.close)
+        self.config = {'url': stub.url, 'secret': 'shh', 'timeout': 5}
+        return stub
+
+    def enqueue(self, count):
+        return [
+            OutboxEvent.objects.create(
+                endpoint='oms', event_type='status_change', location_id=self.location.id, payload={'n': n}
+            ).id
+            for n in range(count)
+        ]
+
+    def test_location_update_is_queued_and_delivered_signed(self):
+        stub = self.stub()
+        with override_settings(WEBHOOK_ENDPOINTS={'oms': self.config}):
+            LocationUpdate.objects.create(location=self.location, update_type='status_change', new_status='resolved')
+            delivered = OutboxDispatcher().drain_endpoint('oms', self.config)
+
+        self.assertEqual(delivered, 1)
+        headers, body = stub.requests[0]
+        expected = hmac.new(b'shh', body, hashlib.sha256).hexdigest()
+        self.assertEqual(headers['X-Scout-Signature'], f'sha256={expected}')
+        event = json.loads(body)['events'][0]
+        self.assertEqual(event['location']['id'], self.location.id)
+        self.assertEqual(event['update']['new_status'], 'resolved')
+        self.assertFalse(OutboxEvent.objects.exclude(status='delivered').exists())
+
+    def test_events_are_delivered_in_order_in_batches(self):
+        stub = self.stub()
+        ids = self.enqueue(5)
+        dispatcher = OutboxDispatcher(batch_size=2)
+        delivered = [dispatcher.drain_endpoint('oms', self.config) for _ in range(4)]
+
+        self.assertEqual(delivered, [2, 2, 1, 0])
+        self.assertEqual(stub.batches(), [ids[:2], ids[2:4], ids[4:]])
+        self.assertEqual(OutboxEvent.objects.filter(status='delivered').count(), 5)
+
+    def test_failed_batch_backs_off_and_is_retried(self):
+        stub = self.stub(statuses=[500])
+        ids = self.enqueue(2)
+        dispatcher = OutboxDispatcher(backoff_seconds=60)
+
+        self.assertEqual(dispatcher.drain_endpoint('oms', self.config), 0)
+        head = OutboxEvent.objects.get(id=ids[0])
+        self.assertEqual((head.status, head.attempts, head.last_error), ('pending', 1, 'HTTP 500'))
+        self.assertGreater(head.next_attempt_at, timezone.now() + timedelta(seconds=40))
+
+        # Still backing off, so nothing is sent
+        self.assertEqual(dispatcher.drain_endpoint('oms', self.config), 0)
+        self.assertEqual(len(stub.requests), 1)
+
+        OutboxEvent.objects.filter(id=ids[0]).update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatcher.drain_endpoint('oms', self.config), 2)
+        self.assertEqual(stub.batches(), [ids, ids])
+        self.assertEqual(OutboxEvent.objects.get(id=ids[0]).attempts, 2)
+
+    def test_batch_is_dead_after_max_attempts(self):
+        self.stub(statuses=[503, 503])
+        ids = self.enqueue(1)
+        dispatcher = OutboxDispatcher(max_attempts=2, backoff_seconds=0)
+
+        dispatcher.drain_endpoint('oms', self.config)
+        dispatcher.drain_endpoint('oms', self.config)
+        event = OutboxEvent.objects.get(id=ids[0])
+        self.assertEqual((event.status, event.attempts), ('dead', 2))
+
+    def test_claimed_head_is_leased_during_delivery(self):
+        self.stub()
+        ids = self.enqueue(1)
+        dispatcher = OutboxDispatcher()
+
+        self.assertEqual([event.id for event in dispatcher.claim('oms', self.config)], ids)
+        # A second worker finds the head leased until the first records its result
+        self.assertEqual(dispatcher.claim('oms', self.config), [])
+        self.assertGreater(OutboxEvent.objects.get(id=ids[0]).next_attempt_at, timezone.now())
+
+
+class SnapshotThinningTests(TestCase):
+    def test_older_snapshots_are_thinned_to_hourly_then_daily(self):
+        now = timezone.now().replace(minute=50, second=0, microsecond=0)
+        LocationSnapshot.objects.bulk_create(
+            LocationSnapshot(taken_at=now - timedelta(minutes=15 * n)) for n in range(10 * 24 * 4)
+        )
+        with override_settings(LOCATION_SNAPSHOT_HOURLY_AFTER_HOURS=24, LOCATION_SNAPSHOT_DAILY_AFTER_DAYS=7):
+            LocationSnapshot.objects.filter(id__in=snapshots_to_thin(now)).delete()
+
+        taken = list(LocationSnapshot.objects.order_by('taken_at').values_list('taken_at', flat=True))
+        recent = [at for at in taken if at >= now - timedelta(hours=24)]
+        hourly = [at for at in taken if now - timedelta(days=7) <= at < now - timedelta(hours=24)]
+        daily = [at for at in taken if at < now - timedelta(days=7)]
+        self.assertEqual(len(recent), 24 * 4 + 1)
+        self.assertEqual(len({at.replace(minute=0) for at in hourly}), len(hourly))
+        self.assertEqual(len({at.date() for at in daily}), len(daily))
+        # One per hour for six days and one per day for the last three, with partial buckets at the edges
+        self.assertLessEqual(len(hourly), 6 * 24 + 1)
+        self.assertLessEqual(len(daily), 4)
+
+
+@override_settings(ETA_MIN_TRAINING_SAMPLES=5)
+class RestorationScoringTests(TestCase):
+    def location(self, **fields):
+        return Location.objects.create(
+            name='Feeder', address='1 Main Street', city='Springfield', state='IL', zip_code='62701', **fields
+        )
+
+    def test_predicted_estimates_are_recorded_without_bumping_version(self):
+        from .eta import score_open_locations, train_restoration_model
+
+        now = timezone.now()
+        for hours in range(1, 11):
+            reported_at = now - timedelta(days=2, hours=hours)
+            self.location(
+                status='resolved', reported_at=reported_at, actual_restoration=reported_at + timedelta(hours=hours)
+            )
+        outage = self.location(status='reported')
+        model = train_restoration_model(holdout=0)
+
+        self.assertEqual(score_open_locations(model), 1)
+        outage_after = Location.objects.get(id=outage.id)
+        self.assertTrue(outage_after.restoration_predicted)
+        self.assertEqual(outage_after.version, outage.version)
+        event = LocationEvent.objects.filter(location_id=outage.id, kind='changed').latest('id')
+        self.assertIn('estimated_restoration', event.changes)
+        [as_of] = locations_as_of(timezone.now())
+        # The event log stores times to the millisecond
+        self.assertAlmostEqual(
+            as_of.estimated_restoration, outage_after.estimated_restoration, delta=timedelta(milliseconds=1)
+        )
+
+    def test_outage_resolved_while_scoring_is_left_alone(self):
+        import numpy as np
+        from .eta import score_open_locations, train_restoration_model
+
+        now = timezone.now()
+        for hours in range(1, 11):
+            reported_at = now - timedelta(days=2, hours=hours)
+            self.location(
+                status='resolved', reported_at=reported_at, actual_restoration=reported_at + timedelta(hours=hours)
+            )
+        outage = self.location(status='reported')
+        model = train_restoration_model(holdout=0)
+
+        exp = np.exp
+
+        def resolve_then_exp(values):
+            # Resolved after the open rows were read, before the locked re-check
+            Location.objects.filter(id=outage.id).update(status='resolved')
+            return exp(values)
+
+        with mock.patch('locations.eta.np.exp', side_effect=resolve_then_exp):
+            self.assertEqual(score_open_locations(model), 0)
+        self.assertIsNone(Location.objects.get(id=outage.id).estimated_restoration)
+
+
+class PublicOutageIndexTests(TestCase):
+    def test_radius_matches_the_rounded_point_only(self):
+        Location.objects.create(
+            name='Feeder', address='1 Main Street', city='Springfield', state='IL', zip_code='62701',
+            latitude=39.7849, longitude=-89.6501,
+        )
+        index = PublicOutageIndex(radius_km=2)
+        index.build()
+
+        [(encoded, _zip_code, _cell, point, _reported_at)] = index._state[0].values()
+        self.assertEqual(point, (39.78, -89.65))
+        self.assertEqual(json.loads(encoded)['latitude'], 39.78)
+        # About 1.95 km from the rounded point but 2.5 km from the address
+        self.assertEqual(index.near(39.7625, -89.65), [encoded])
+        self.assertEqual(index.near(39.7575, -89.65), [])
@@ -1,6 +1,7 @@
 """
 locations/views.py
 """
+from datetime import timedelta
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -8,19 +9,63 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.db import models
-from .models import Location, LocationUpdate
+from django.db import models, transaction, connection
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from accounts.cache import user_display_name
+from scout.db_routers import ReplicaReadMixin
+from .models import Location, LocationUpdate, VersionConflict
 from .serializers import LocationSerializer, LocationUpdateSerializer, LocationCreateSerializer, LocationEditSerializer
 from .permissions import CanAssignLocations, CanEditLocations
+from .exceptions import PreconditionFailed
+from .rollup import impact_rollup
+from .clusters import cluster_pyramid
+from .renderers import bulk_read_renderers, columnar_locations, wants_columnar
+from .dedup import find_duplicate, attach_duplicate_report
+from .batching import create_coalescer
+from .history import locations_as_of
+from .route_cache import route_cache
 
 User = get_user_model()
 
 
-class LocationViewSet(viewsets.ModelViewSet):
+def location_etag(location):
+    return f'"{location.version}"'
+
+
+class VersionedLocationMixin:
+    """
+    Optimistic concurrency for location writes: If-Match preconditions,
+    ETag response headers and 412 responses on version conflicts
+    """
+    def check_if_match(self, request, location):
+        if_match = request.headers.get('If-Match')
+        if not if_match or if_match.strip() == '*':
+            return
+        tags = [tag.strip().removeprefix('W/') for tag in if_match.split(',')]
+        if location_etag(location) not in tags:
+            raise PreconditionFailed()
+    
+    def handle_exception(self, exc):
+        if isinstance(exc, VersionConflict):
+            exc = PreconditionFailed()
+        return super().handle_exception(exc)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        data = getattr(response, 'data', None)
+        if response.status_code < 300 and isinstance(data, dict) and 'version' in data and 'results' not in data:
+            response['ETag'] = f'"{data["version"]}"'
+        return response
+
+
+class LocationViewSet(ReplicaReadMixin, VersionedLocationMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing locations
     """
     queryset = Location.objects.all()
+    replica_actions = {'list', 'retrieve', 'all'}
     serializer_class = LocationSerializer
     permission_classes = [IsAuthenticated]
     
@@ -38,20 +83,21 @@ class LocationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if user.can_view_all_locations():
-            return Location.objects.select_related('assigned_to', 'reported_by').all()
+            return Location.objects.all()
         elif user.is_team_lead:
             # Team leads can see locations assigned to them, their team members, unassigned locations, or locations they reported
             return Location.objects.filter(
                 models.Q(assigned_to__in=User.objects.filter(role__in=['team_lead', 'team_member'])) |
                 models.Q(assigned_to__isnull=True) |
                 models.Q(reported_by=user)
-            ).select_related('assigned_to', 'reported_by')
+            )
         elif user.is_team_member:
             # Team members can see locations assigned to them
-            return Location.objects.filter(assigned_to=user).select_related('assigned_to', 'reported_by')
+            return Location.objects.filter(assigned_to=user)
         else:
-            # Reporters can see locations they reported
-            return Location.objects.filter(reported_by=user).select_related('assigned_to', 'reported_by')
+            # Reporters can see locations they reported. Outages their reports were
+            # merged into belong to another reporter and stay hidden.
+            return Location.objects.filter(reported_by=user)
     
     def get_permissions(self):
         """
@@ -66,10 +112,17 @@ class LocationViewSet(viewsets.ModelViewSet):
         elif self.action in ['destroy']:
             permission_classes = [IsAuthenticated, CanEditLocations]
         else:
-            permission_classes = [IsAuthenticated]
+            # Custom actions declare their own permission_classes
+            permission_classes = self.permission_classes
         
         return [permission() for permission in permission_classes]
     
+    def get_object(self):
+        location = super().get_object()
+        if self.request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            self.check_if_match(self.request, location)
+        return location
+    
     def check_object_permissions(self, request, obj):
         """
         Check object-level permissions for update operations
@@ -84,22 +137,42 @@ class LocationViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """
-        Set the reporter when creating a location and create initial update
+        Set the reporter when creating a location and create initial update.
+        Submissions matching an active outage are merged into it instead.
         """
-        if self.request.user.is_reporter:
-            location = serializer.save(reported_by=self.request.user)
-        else:
-            location = serializer.save()
+        duplicate = find_duplicate(serializer.validated_data)
+        if duplicate:
+            with transaction.atomic():
+                attach_duplicate_report(duplicate, serializer.validated_data, self.request.user)
+            duplicate.is_duplicate_report = True
+            serializer.instance = duplicate
+            return
         
-        # Create initial location update
-        LocationUpdate.objects.create(
-            location=location,
+        initial_update = LocationUpdate(
             updated_by=self.request.user,
             update_type='general_update',
             notes=f'Location created and reported by {self.request.user.get_full_name()}'
         )
+        
+        # When batching is enabled, creates from concurrent requests are written
+        # together by the coalescer in its own transaction
+        coalescer = create_coalescer()
+        if coalescer is not None:
+            serializer.instance = coalescer.submit(serializer.build(serializer.validated_data), initial_update)
+            return
+        
+        with transaction.atomic():
+            if self.request.user.is_reporter:
+                location = serializer.save(reported_by=self.request.user)
+            else:
+                location = serializer.save()
+            
+            # Create initial location update
+            initial_update.location = location
+            initial_update.save()
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, CanAssignLocations])
+    @transaction.atomic
     def assign(self, request, pk=None):
         """
         Assign a location to a user
@@ -142,6 +215,7 @@ class LocationViewSet(viewsets.ModelViewSet):
             )
     
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def update_status(self, request, pk=None):
         """
         Update location status
@@ -164,6 +238,9 @@ class LocationViewSet(viewsets.ModelViewSet):
         
         old_status = location.status
         location.status = new_status
+        if new_status == 'resolved' and location.actual_restoration is None:
+            # Resolution times are what the restoration ETA model trains on
+            location.actual_restoration = timezone.now()
         location.save()
         
         # Create an update record
@@ -179,6 +256,58 @@ class LocationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(location)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def claim_next(self, request):
+        """
+        Claim the highest-priority, oldest unassigned open location for the caller
+        """
+        user = request.user
+        if user.role not in User.ASSIGNABLE_ROLES:
+            return Response(
+                {'error': 'Only admins, team leads and team members can claim locations'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        # The unassigned open pool is visible to every assignable role
+        queryset = Location.objects.filter(
+            assigned_to__isnull=True, status__in=Location.OPEN_STATUSES
+        ).order_by(Location.priority_rank().desc(), 'reported_at', 'id')
+        
+        location = None
+        if connection.features.has_select_for_update_skip_locked:
+            # Rows locked by other claimers are skipped instead of waited on
+            location = queryset.select_for_update(skip_locked=True).first()
+        else:
+            # No row locks (SQLite): claim with a conditional UPDATE and retry on a lost race
+            for _ in range(5):
+                candidate = queryset.first()
+                if candidate is None:
+                    break
+                if Location.objects.filter(pk=candidate.pk, assigned_to__isnull=True).update(assigned_to=user):
+                    location = candidate
+                    break
+        
+        if location is None:
+            return Response(
+                {'error': 'No unassigned locations available'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        location.assigned_to = user
+        location.save(update_fields=['assigned_to', 'updated_at'])
+        
+        LocationUpdate.objects.create(
+            location=location,
+            updated_by=user,
+            update_type='assignment',
+            notes=f'Location claimed by {user.get_full_name()}'
+        )
+        
+        serializer = LocationSerializer(location)
+        return Response(serializer.data)
+    
+    @transaction.atomic
     def perform_update(self, serializer):
         """
         Update location and create update record
@@ -187,7 +316,7 @@ class LocationViewSet(viewsets.ModelViewSet):
         old_status = old_location.status
         old_email = old_location.reporter_email
         old_phone = old_location.reporter_phone
-        old_assigned_to = old_location.assigned_to
+        old_assigned_to_id = old_location.assigned_to_id
         old_priority = old_location.priority
         
         location = serializer.save()
@@ -203,13 +332,13 @@ class LocationViewSet(viewsets.ModelViewSet):
         if old_phone != location.reporter_phone:
             changes.append(f"Reporter phone updated")
         
-        if old_assigned_to != location.assigned_to:
-            if old_assigned_to and location.assigned_to:
-                changes.append(f"Assignment changed from {old_assigned_to.get_full_name()} to {location.assigned_to.get_full_name()}")
-            elif old_assigned_to and not location.assigned_to:
-                changes.append(f"Assignment removed from {old_assigned_to.get_full_name()}")
-            elif not old_assigned_to and location.assigned_to:
-                changes.append(f"Location assigned to {location.assigned_to.get_full_name()}")
+        if old_assigned_to_id != location.assigned_to_id:
+            if old_assigned_to_id and location.assigned_to_id:
+                changes.append(f"Assignment changed from {user_display_name(old_assigned_to_id)} to {user_display_name(location.assigned_to_id)}")
+            elif old_assigned_to_id and not location.assigned_to_id:
+                changes.append(f"Assignment removed from {user_display_name(old_assigned_to_id)}")
+            elif not old_assigned_to_id and location.assigned_to_id:
+                changes.append(f"Location assigned to {user_display_name(location.assigned_to_id)}")
         
         if old_priority != location.priority:
             changes.append(f"Priority changed from {old_location.get_priority_display()} to {location.get_priority_display()}")
@@ -222,14 +351,175 @@ class LocationViewSet(viewsets.ModelViewSet):
                 notes=f"Location updated: {', '.join(changes)}"
             )
     
-    @action(detail=False, methods=['get'], pagination_class=None)
+    @action(detail=False, methods=['get'], pagination_class=None, renderer_classes=bulk_read_renderers())
     def all(self, request):
         """
-        Get all locations without pagination for dashboard statistics
+        Get all locations without pagination for dashboard statistics.
+        Send Accept: application/vnd.scout.columnar+json (or +msgpack) for the
+        compact columnar encoding.
+        
+        Admins can pass ?as_of=<ISO datetime> to get the open locations as they
+        were at that time, rebuilt from snapshots and the location event log.
         """
+        if 'as_of' in request.query_params:
+            return self.all_as_of(request)
+        
         queryset = self.get_queryset()
+        if wants_columnar(request):
+            return Response(columnar_locations(queryset))
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+    
+    def all_as_of(self, request):
+        if not request.user.can_view_all_locations():
+            return Response(
+                {'error': 'Only admins can view past outage state'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        as_of = parse_datetime(request.query_params['as_of'])
+        if as_of is None:
+            return Response(
+                {'error': 'as_of must be an ISO 8601 datetime'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if timezone.is_naive(as_of):
+            as_of = timezone.make_aware(as_of)
+        
+        retention = timedelta(days=getattr(settings, 'LOCATION_HISTORY_RETENTION_DAYS', 90))
+        if as_of < timezone.now() - retention:
+            return Response(
+                {'error': 'as_of is older than the retained location history'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = self.get_serializer(locations_as_of(as_of), many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, CanAssignLocations], pagination_class=None)
+    def recommend_assignees(self, request):
+        """
+        Rank eligible assignees for unassigned locations by workload and proximity.
+        Pass location_ids to rank specific locations, otherwise the longest-waiting
+        visible unassigned open locations are ranked, up to RECOMMENDER_MAX_LOCATIONS.
+        """
+        location_ids = request.data.get('location_ids')
+        max_locations = getattr(settings, 'RECOMMENDER_MAX_LOCATIONS', 1000)
+        try:
+            limit = int(request.data.get('limit', 3))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'limit must be an integer'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.get_queryset().filter(assigned_to__isnull=True, status__in=Location.OPEN_STATUSES)
+        if location_ids is not None:
+            if not isinstance(location_ids, list):
+                return Response(
+                    {'error': 'location_ids must be a list'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if len(location_ids) > max_locations:
+                return Response(
+                    {'error': f'At most {max_locations} location_ids can be ranked at once'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(id__in=location_ids)
+        
+        # Imported here so numpy only loads in processes that serve recommendations
+        from .recommend import recommend_assignees
+        
+        # Without location_ids the longest-waiting locations are ranked first
+        locations = list(
+            queryset.order_by('reported_at').only('id', 'priority', 'latitude', 'longitude')[:max_locations + 1]
+        )
+        return Response({
+            'results': recommend_assignees(locations[:max_locations], limit=max(limit, 1)),
+            'truncated': len(locations) > max_locations,
+        })
+    
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def route(self, request):
+        """
+        Visiting order for a user's open assignments, most urgent and nearest
+        first. Pass ?start=lat,lon to route from the crew's position; admins and
+        team leads can pass ?user_id= to see another user's route.
+        """
+        user_id = request.query_params.get('user_id') or request.user.pk
+        if user_id != request.user.pk and not request.user.can_assign_locations():
+            return Response(
+                {'error': 'You can only view your own route'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if request.user.role not in User.ASSIGNABLE_ROLES:
+            return Response(
+                {'error': 'Only admins, team leads and team members have routes'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        start = None
+        if request.query_params.get('start'):
+            try:
+                start = tuple(float(value) for value in request.query_params['start'].split(','))
+            except ValueError:
+                start = ()
+            if len(start) != 2 or not (-90 <= start[0] <= 90 and -180 <= start[1] <= 180):
+                return Response(
+                    {'error': 'start must be lat,lon'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        # Imported here so numpy only loads in processes that plan routes
+        from .routing import route_for_user
+        
+        route, cached = route_cache.get_or_plan(user_id, start, lambda start: route_for_user(user_id, start))
+        return Response({**route, 'cached': cached})
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, CanAssignLocations], pagination_class=None)
+    def impact(self, request):
+        """
+        Open outage and customer totals by state, city and zip code.
+        Pass ?state= and then ?state=&city= to drill down.
+        """
+        state = request.query_params.get('state')
+        city = request.query_params.get('city')
+        
+        if city and not state:
+            return Response(
+                {'error': 'state is required when filtering by city'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(impact_rollup.drilldown(state=state, city=city))
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, CanAssignLocations], pagination_class=None)
+    def clusters(self, request):
+        """
+        Clustered open outages for a map viewport.
+        Pass ?bbox=west,south,east,north&zoom=<0-max zoom>.
+        """
+        try:
+            west, south, east, north = (float(value) for value in request.query_params.get('bbox', '').split(','))
+            zoom = int(request.query_params.get('zoom', ''))
+        except ValueError:
+            return Response(
+                {'error': 'bbox (west,south,east,north) and integer zoom are required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180) or zoom < 0:
+            return Response(
+                {'error': 'Invalid bbox or zoom'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        clusters = cluster_pyramid.clusters(west, south, east, north, zoom)
+        return Response({
+            'zoom': min(zoom, cluster_pyramid.max_zoom),
+            'count': sum(cluster['count'] for cluster in clusters),
+            'clusters': clusters,
+        })
 
 
 class LocationUpdateViewSet(viewsets.ModelViewSet):
@@ -247,11 +537,11 @@ class LocationUpdateViewSet(viewsets.ModelViewSet):
         # Check if user can view this location
         user = self.request.user
         if not (user.can_view_all_locations() or 
-                location.assigned_to == user or 
-                location.reported_by == user):
+                location.assigned_to_id == user.pk or 
+                location.reported_by_id == user.pk):
             return LocationUpdate.objects.none()
         
-        return LocationUpdate.objects.filter(location=location).select_related('updated_by')
+        return LocationUpdate.objects.filter(location=location).select_related('location')
     
     def perform_create(self, serializer):
         location_id = self.kwargs.get('location_id')
@@ -259,17 +549,19 @@ class LocationUpdateViewSet(viewsets.ModelViewSet):
         serializer.save(location=location, updated_by=self.request.user)
 
 
-class AssignLocationView(viewsets.ViewSet):
+class AssignLocationView(VersionedLocationMixin, viewsets.ViewSet):
     """
     View for assigning locations
     """
     permission_classes = [IsAuthenticated, CanAssignLocations]
     
+    @transaction.atomic
     def post(self, request, location_id):
         """
         Assign a location to a user
         """
         location = get_object_or_404(Location, id=location_id)
+        self.check_if_match(request, location)
         user_id = request.data.get('user_id')
         
         if not user_id:
@@ -0,0 +1,70 @@
+"""
+locations/workload.py
+"""
+from django.db import transaction
+from django.db.models import Count, F
+from .models import Location, AssignmentCounter
+
+
+def _bucket(snapshot):
+    """Return the (user, status, priority) counter a location snapshot belongs to"""
+    if not snapshot or not snapshot['assigned_to_id'] or snapshot['status'] not in Location.OPEN_STATUSES:
+        return None
+    return (snapshot['assigned_to_id'], snapshot['status'], snapshot['priority'])
+
+
+def _bump(bucket, delta):
+    user_id, status, priority = bucket
+    counters = AssignmentCounter.objects.filter(user_id=user_id, status=status, priority=priority)
+    if counters.update(count=F('count') + delta):
+        return
+    counter, _ = AssignmentCounter.objects.get_or_create(user_id=user_id, status=status, priority=priority)
+    AssignmentCounter.objects.filter(pk=counter.pk).update(count=F('count') + delta)
+
+
+def apply_workload_change(old, new):
+    """
+    Move a location between counters. Runs inside the caller's transaction.
+    """
+    old_bucket = _bucket(old)
+    new_bucket = _bucket(new)
+    if old_bucket == new_bucket:
+        return
+    if old_bucket:
+        _bump(old_bucket, -1)
+    if new_bucket:
+        _bump(new_bucket, 1)
+
+
+def summarize_counters(counters):
+    """
+    Collapse counter rows into totals split by status and by priority
+    """
+    by_status = {status: 0 for status in Location.OPEN_STATUSES}
+    by_priority = {priority: 0 for priority, _label in Location.PRIORITY_CHOICES}
+    total = 0
+    for counter in counters:
+        by_status[counter.status] = by_status.get(counter.status, 0) + counter.count
+        by_priority[counter.priority] = by_priority.get(counter.priority, 0) + counter.count
+        total += counter.count
+    return {'open_assignments': total, 'by_status': by_status, 'by_priority': by_priority}
+
+
+def rebuild_workload_counters(batch_size=1000):
+    """
+    Recompute every counter from the locations table in one grouped query
+    """
+    rows = (
+        Location.objects.filter(assigned_to__isnull=False, status__in=Location.OPEN_STATUSES)
+        .order_by()
+        .values('assigned_to_id', 'status', 'priority')
+        .annotate(total=Count('id'))
+    )
+    counters = [
+        AssignmentCounter(user_id=row['assigned_to_id'], status=row['status'], priority=row['priority'], count=row['total'])
+        for row in rows
+    ]
+    with transaction.atomic():
+        AssignmentCounter.objects.all().delete()
+        AssignmentCounter.objects.bulk_create(counters, batch_size=batch_size)
+    return len(counters)
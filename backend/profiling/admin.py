@@ -0,0 +1,85 @@
+"""
+profiling/admin.py
+"""
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from .models import ProfileArtifact
+
+
+@admin.register(ProfileArtifact)
+class ProfileArtifactAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'sql_count', 'sql_time_ms', 'trigger', 'user')
+    list_filter = ('trigger', 'method', 'status_code')
+    search_fields = ('^path', '=view_name')
+    ordering = ('-created_at',)
+    list_select_related = ('user',)
+    show_full_result_count = False
+    
+    fieldsets = (
+        ('Request', {
+            'fields': ('method', 'path', 'view_name', 'status_code', 'trigger', 'user', 'created_at')
+        }),
+        ('Timing', {
+            'fields': ('duration_ms', 'sql_count', 'sql_time_ms', 'download')
+        }),
+        ('Call Tree', {
+            'fields': ('call_tree_display',)
+        }),
+        ('SQL', {
+            'fields': ('sql_display',)
+        }),
+    )
+    
+    readonly_fields = (
+        'method', 'path', 'view_name', 'status_code', 'trigger', 'user', 'created_at',
+        'duration_ms', 'sql_count', 'sql_time_ms', 'download', 'call_tree_display', 'sql_display',
+    )
+    
+    def get_queryset(self, request):
+        # Leave the large columns out of the changelist
+        queryset = super().get_queryset(request)
+        if request.resolver_match and request.resolver_match.url_name.endswith('changelist'):
+            queryset = queryset.defer('call_tree', 'sql_queries', 'stats')
+        return queryset
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_urls(self):
+        return [
+            path('<int:artifact_id>/download/', self.admin_site.admin_view(self.download_view),
+                 name='profiling_profileartifact_download'),
+        ] + super().get_urls()
+    
+    def download_view(self, request, artifact_id):
+        artifact = get_object_or_404(ProfileArtifact, id=artifact_id)
+        response = HttpResponse(bytes(artifact.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{artifact.id}.prof"'
+        return response
+    
+    def download(self, obj):
+        url = reverse('admin:profiling_profileartifact_download', args=[obj.id])
+        return format_html('<a href="{}">Download .prof</a> (open with snakeviz or pstats)', url)
+    download.short_description = 'pstats file'
+    
+    def call_tree_display(self, obj):
+        return format_html('<pre style="font-size: 12px; overflow-x: auto;">{}</pre>', obj.call_tree)
+    call_tree_display.short_description = 'Call tree'
+    
+    def sql_display(self, obj):
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td><code>{}</code></td><td>{}</td></tr>',
+            ((query['time_ms'], query['alias'], query['sql'], ' <- '.join(reversed(query['stack'])))
+             for query in obj.sql_queries)
+        )
+        return format_html(
+            '<table><thead><tr><th>ms</th><th>db</th><th>SQL</th><th>Called from</th></tr></thead>'
+            '<tbody>{}</tbody></table>', rows
+        )
+    sql_display.short_description = 'SQL statements'
@@ -0,0 +1,116 @@
+"""
+profiling/management/commands/benchmark_startup.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules that serving processes must not load before they are needed
+DEFERRED_MODULES = ['numpy']
+
+# Runs in a fresh interpreter: import the WSGI app, then serve one request
+PROBE = '''
+import io, json, sys, time
+start = time.perf_counter()
+from scout.wsgi import application
+imported = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '8000', 'HTTP_HOST': 'localhost',
+    'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+    'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+    'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+}
+statuses = []
+body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': statuses[0] if statuses else None,
+    'modules': sorted(sys.modules),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold start of the WSGI app in fresh interpreters: time to import '
+        'scout.wsgi and time to serve the first request. Exits non-zero when the '
+        'median exceeds the budget or a deferred module was loaded, so it can gate CI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/api/locations/', help='Path of the first request')
+        parser.add_argument(
+            '--import-budget-ms', type=float,
+            default=getattr(settings, 'STARTUP_IMPORT_BUDGET_MS', 1500),
+        )
+        parser.add_argument(
+            '--first-request-budget-ms', type=float,
+            default=getattr(settings, 'STARTUP_FIRST_REQUEST_BUDGET_MS', 500),
+        )
+        parser.add_argument('--deferred', default=','.join(DEFERRED_MODULES),
+                            help='Comma-separated modules that must not be loaded by the first request')
+        parser.add_argument('--top', type=int, default=10, help='Show the slowest imports of one run (0 = off)')
+
+    def handle(self, *args, **options):
+        env = self.probe_env()
+        results = [self.probe(options['path'], env)[0] for _ in range(options['runs'])]
+
+        import_ms = statistics.median(result['import_ms'] for result in results)
+        first_request_ms = statistics.median(result['first_request_ms'] for result in results)
+        modules = set(results[0]['modules'])
+        self.stdout.write(f"Import scout.wsgi: {import_ms:8.1f} ms median (budget {options['import_budget_ms']:.0f} ms)")
+        self.stdout.write(
+            f"First request:     {first_request_ms:8.1f} ms median (budget {options['first_request_budget_ms']:.0f} ms), "
+            f"{options['path']} -> {results[0]['status']}"
+        )
+        self.stdout.write(f'Modules loaded:    {len(modules)}')
+
+        if options['top']:
+            self.write_slowest_imports(options['path'], env, options['top'])
+
+        failures = []
+        if import_ms > options['import_budget_ms']:
+            failures.append(f'import took {import_ms:.0f} ms')
+        if first_request_ms > options['first_request_budget_ms']:
+            failures.append(f'first request took {first_request_ms:.0f} ms')
+        deferred = [name for name in options['deferred'].split(',') if name and name in modules]
+        if deferred:
+            failures.append(f"deferred modules were loaded: {', '.join(deferred)}")
+        if failures:
+            raise CommandError('Startup budget exceeded: ' + '; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Startup within budget'))
+
+    @staticmethod
+    def probe_env():
+        return dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'scout.settings'))
+
+    def probe(self, path, env, *flags):
+        completed = subprocess.run(
+            [sys.executable, *flags, '-c', PROBE, path],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f'Startup probe failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+    def write_slowest_imports(self, path, env, top):
+        _result, stderr = self.probe(path, env, '-X', 'importtime')
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            # Only top-level imports, nested ones are already in their parent's cumulative time
+            if not name[1:].startswith(' '):
+                imports.append((int(cumulative_us), name.strip()))
+        self.stdout.write('Slowest top-level imports:')
+        for cumulative_us, name in sorted(imports, reverse=True)[:top]:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f} ms  {name}')
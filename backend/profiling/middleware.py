@@ -0,0 +1,215 @@
+"""
+profiling/middleware.py
+"""
+import cProfile
+import logging
+import marshal
+import os
+import random
+import threading
+import time
+import traceback
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_SCOUT_PROFILE'
+PROFILE_QUERY_PARAM = '_profile'
+
+# From Python 3.12 cProfile hooks sys.monitoring for the whole process, so only
+# one request per process can be profiled at a time
+_profiler_lock = threading.Lock()
+
+
+def short_path(filename):
+    """Path relative to the project or to site-packages"""
+    if '/site-packages/' in filename:
+        return filename.split('/site-packages/', 1)[1]
+    if filename.startswith(str(settings.BASE_DIR)):
+        return os.path.relpath(filename, settings.BASE_DIR)
+    return filename
+
+
+def format_call_tree(stats, max_depth=30, min_fraction=0.005):
+    """
+    Render pstats data as an indented call tree, children ordered by cumulative
+    time. Branches under min_fraction of the total time are left out.
+    """
+    callees = {}
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    # Roots were called from outside the profiled frames at least once. Django's
+    # middleware chain reuses one wrapper function, so the entry point also has callers.
+    roots = [
+        (func, ct) for func, (_cc, nc, _tt, ct, callers) in stats.items()
+        if sum(edge[1] for edge in callers.values()) < nc
+    ]
+    total = max((ct for _func, ct in roots), default=0) or 1e-9
+    lines = []
+
+    def label(func):
+        filename, line, name = func
+        if filename == '~':
+            return name
+        return f'{name} ({short_path(filename)}:{line})'
+
+    def walk(func, cumulative, depth, path):
+        lines.append(f'{"  " * depth}{cumulative * 1000:9.2f} ms  {cumulative / total:6.1%}  {label(func)}')
+        if depth >= max_depth:
+            return
+        for child, child_time in sorted(callees.get(func, ()), key=lambda item: -item[1]):
+            if child in path or child_time / total < min_fraction:
+                continue
+            walk(child, child_time, depth + 1, path | {child})
+
+    for func, cumulative in sorted(roots, key=lambda item: -item[1]):
+        if cumulative / total >= min_fraction:
+            walk(func, cumulative, 0, {func})
+    return '\n'.join(lines)
+
+
+class SQLRecorder:
+    """
+    Database execute wrapper that records each statement, its time and the
+    project code that issued it
+    """
+    def __init__(self):
+        self.queries = []
+        self.base_dir = str(settings.BASE_DIR)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'time_ms': round((time.perf_counter() - start) * 1000, 3),
+                'many': many,
+                'stack': self._caller(),
+            })
+
+    def _caller(self):
+        frames = [
+            f'{short_path(frame.filename)}:{frame.lineno} {frame.name}'
+            for frame in traceback.extract_stack()[:-2]
+            if frame.filename.startswith(self.base_dir) and '/site-packages/' not in frame.filename
+        ]
+        return frames[-3:]
+
+
+class ProfilingMiddleware:
+    """
+    Runs selected requests under cProfile and stores the call tree and SQL log
+    as a ProfileArtifact, listed in the admin.
+
+    Admins opt in per request with an `X-Scout-Profile: 1` header or a
+    `?_profile=1` query parameter; the artifact ID comes back in
+    `X-Profile-Id`. PROFILING_SAMPLE_RATE additionally profiles that fraction of
+    all requests. Requests that are not profiled only pay for the flag check.
+    One request per process is profiled at a time; others arriving meanwhile
+    are served without a profile.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = self.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        if not _profiler_lock.acquire(blocking=False):
+            logger.info('Not profiling %s %s, another request is being profiled', request.method, request.path)
+            return self.get_response(request)
+
+        recorder = SQLRecorder()
+        profiler = cProfile.Profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all(initialized_only=False):
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                start = time.perf_counter()
+                try:
+                    profiler.enable()
+                except ValueError as exc:
+                    # Another profiler, e.g. a debugger, already holds the hook
+                    logger.warning('Not profiling %s %s: %s', request.method, request.path, exc)
+                    profiler = None
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                duration = time.perf_counter() - start
+        finally:
+            _profiler_lock.release()
+        if profiler is None:
+            return response
+
+        try:
+            artifact = self.save(request, response, trigger, profiler, recorder, duration)
+        except Exception:
+            logger.exception('Could not store profile for %s %s', request.method, request.path)
+        else:
+            if trigger != 'sample':
+                response['X-Profile-Id'] = str(artifact.id)
+        return response
+
+    def trigger(self, request):
+        flagged = None
+        if request.META.get(PROFILE_HEADER) == '1':
+            flagged = 'header'
+        elif request.GET.get(PROFILE_QUERY_PARAM) == '1':
+            flagged = 'query'
+        if flagged and self.is_admin(request):
+            return flagged
+
+        rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if rate and random.random() < rate:
+            return 'sample'
+        return None
+
+    @staticmethod
+    def is_admin(request):
+        """
+        Session users are known here, token users are authenticated early for
+        flagged requests only
+        """
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            try:
+                result = TokenAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                return False
+            user = result[0] if result else None
+        return bool(user and user.is_authenticated and user.is_admin)
+
+    def save(self, request, response, trigger, profiler, recorder, duration):
+        from .models import ProfileArtifact
+
+        # create_stats() snapshots once; stats is the dict pstats and snakeviz load
+        profiler.create_stats()
+        stats = profiler.stats
+        user = getattr(request, 'user', None)
+        match = getattr(request, 'resolver_match', None)
+        return ProfileArtifact.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            view_name=(match.view_name or '')[:200] if match else '',
+            status_code=response.status_code,
+            trigger=trigger,
+            user=user if user is not None and user.is_authenticated else None,
+            duration_ms=round(duration * 1000, 3),
+            sql_count=len(recorder.queries),
+            sql_time_ms=round(sum(query['time_ms'] for query in recorder.queries), 3),
+            call_tree=format_call_tree(stats),
+            sql_queries=recorder.queries,
+            stats=marshal.dumps(stats),
+        )
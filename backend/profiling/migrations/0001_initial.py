@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('trigger', models.CharField(choices=[('header', 'Header'), ('query', 'Query Parameter'), ('sample', 'Sampled')], max_length=10)),
+                ('duration_ms', models.FloatField()),
+                ('sql_count', models.PositiveIntegerField(default=0)),
+                ('sql_time_ms', models.FloatField(default=0)),
+                ('call_tree', models.TextField(help_text='Functions by cumulative time with their callees')),
+                ('sql_queries', models.JSONField(default=list, help_text='SQL statements with timings and calling code')),
+                ('stats', models.BinaryField(help_text='Marshalled pstats data, loadable with pstats or snakeviz')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_artifacts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Profile Artifact',
+                'verbose_name_plural': 'Profile Artifacts',
+                'db_table': 'profiling_profileartifact',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+"""
+profiling/models.py
+"""
+from django.conf import settings
+from django.db import models
+
+
+class ProfileArtifact(models.Model):
+    """
+    cProfile output and SQL log captured for one profiled request
+    """
+    TRIGGER_CHOICES = [
+        ('header', 'Header'),
+        ('query', 'Query Parameter'),
+        ('sample', 'Sampled'),
+    ]
+    
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='profile_artifacts'
+    )
+    duration_ms = models.FloatField()
+    sql_count = models.PositiveIntegerField(default=0)
+    sql_time_ms = models.FloatField(default=0)
+    call_tree = models.TextField(help_text="Functions by cumulative time with their callees")
+    sql_queries = models.JSONField(default=list, help_text="SQL statements with timings and calling code")
+    stats = models.BinaryField(help_text="Marshalled pstats data, loadable with pstats or snakeviz")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'profiling_profileartifact'
+        ordering = ['-created_at']
+        verbose_name = 'Profile Artifact'
+        verbose_name_plural = 'Profile Artifacts'
+    
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
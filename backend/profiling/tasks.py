@@ -0,0 +1,23 @@
+"""
+profiling/tasks.py
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from jobs.registry import job
+from .models import ProfileArtifact
+
+
+@job(name='profiling.purge_artifacts', every=timedelta(hours=1))
+def purge_artifacts(batch_size=500):
+    """
+    Delete profile artifacts past the retention window in bounded batches
+    """
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'PROFILING_RETENTION_DAYS', 7))
+    expired = ProfileArtifact.objects.filter(created_at__lt=cutoff)
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += ProfileArtifact.objects.filter(id__in=ids).delete()[0]
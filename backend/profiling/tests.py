@@ -0,0 +1,62 @@
+import cProfile
+import sys
+from io import StringIO
+from unittest import skipIf
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.authtoken.models import Token
+from accounts.models import User
+from .management.commands.benchmark_startup import DEFERRED_MODULES, Command as BenchmarkStartup
+from .middleware import _profiler_lock
+from .models import ProfileArtifact
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='admin@example.com', password='pass', role='admin')
+        self.auth = f'Token {Token.objects.create(user=user).key}'
+
+    def get_profiled(self):
+        response = self.client.get('/api/locations/', HTTP_X_SCOUT_PROFILE='1', HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_flagged_request_is_profiled(self):
+        response = self.get_profiled()
+        artifact = ProfileArtifact.objects.get(id=response['X-Profile-Id'])
+        self.assertGreater(artifact.sql_count, 0)
+        self.assertTrue(artifact.call_tree)
+
+    def test_request_is_served_unprofiled_while_another_is_profiled(self):
+        with _profiler_lock:
+            response = self.get_profiled()
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(ProfileArtifact.objects.exists())
+
+    @skipIf(sys.version_info < (3, 12), 'profilers are per thread before Python 3.12')
+    def test_request_is_served_unprofiled_when_another_profiler_is_active(self):
+        other = cProfile.Profile()
+        other.enable()
+        try:
+            response = self.get_profiled()
+        finally:
+            other.disable()
+        self.assertNotIn('X-Profile-Id', response)
+
+
+class BenchmarkStartupTests(SimpleTestCase):
+    def test_startup_is_within_budget(self):
+        out = StringIO()
+        call_command('benchmark_startup', runs=1, top=0, stdout=out)
+        self.assertIn('Startup within budget', out.getvalue())
+
+    def test_first_request_leaves_deferred_modules_unloaded(self):
+        command = BenchmarkStartup()
+        result, _stderr = command.probe('/api/locations/', command.probe_env())
+        self.assertEqual(result['status'], '401 Unauthorized')
+        for name in DEFERRED_MODULES:
+            self.assertNotIn(name, result['modules'])
+
+    def test_exceeding_a_budget_fails(self):
+        with self.assertRaisesMessage(CommandError, 'import took'):
+            call_command('benchmark_startup', runs=1, top=0, import_budget_ms=0, stdout=StringIO())
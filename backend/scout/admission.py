@@ -0,0 +1,228 @@
+"""
+scout/admission.py
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# (name, methods, path regex, priority class). First match wins, anything else is 'normal'.
+DEFAULT_ADMISSION_RULES = [
+    ('report-create', ('POST',), r'^/api/locations/$', 'low'),
+    ('register', ('POST',), r'^/api/auth/register/$', 'low'),
+    ('crew-write', ('POST', 'PUT', 'PATCH'),
+     r'^/api/locations/(assign/[^/]+|claim_next|[^/]+/(update_status|assign|updates))/$', 'high'),
+    ('crew-write', ('PUT', 'PATCH'), r'^/api/locations/[^/]+/$', 'high'),
+    ('public-lookup', ('GET',), r'^/api/outages/lookup/$', 'public'),
+]
+
+# Requests per second and burst size, per client and per endpoint, by priority class
+DEFAULT_ADMISSION_BUCKETS = {
+    'low': {'client': (0.2, 5), 'endpoint': (50, 200)},
+    'normal': {'client': (10, 50), 'endpoint': None},
+    'high': {'client': (20, 100), 'endpoint': None},
+    # Anonymous lookups are served from memory, so the endpoint limit is generous
+    'public': {'client': (2, 20), 'endpoint': (200, 1000)},
+}
+
+# Seconds a credential that authenticated keeps its own rate limit bucket
+VERIFIED_CREDENTIAL_SECONDS = 300
+
+
+class MemoryTokenBucket:
+    """
+    Token buckets kept in this process. Used when no Redis cache is configured
+    or Redis is unreachable, so limits are per process rather than global.
+    Past max_keys the least recently used buckets are dropped; those are the
+    ones most likely to have refilled, so dropping them grants no extra tokens.
+    """
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, rate, burst):
+        """
+        Take one token. Returns (allowed, seconds until a token is available).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - stamp) * rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return (True, 0.0) if allowed else (False, (1 - tokens) / rate)
+
+
+class RedisTokenBucket:
+    """
+    Token buckets shared by every process through Redis. Refill and take happen
+    in one Lua script so concurrent requests cannot overdraw a bucket.
+    """
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(wait)}
+    """
+
+    def __init__(self, cache, fallback):
+        self.cache = cache
+        self.fallback = fallback
+        self._script = None
+
+    def take(self, key, rate, burst):
+        try:
+            if self._script is None:
+                client = self.cache._cache.get_client(write=True)
+                self._script = client.register_script(self.SCRIPT)
+            allowed, wait = self._script(keys=[self.cache.make_key(key)], args=[rate, burst, time.time()])
+            return bool(int(allowed)), float(wait)
+        except Exception as exc:
+            logger.warning('Redis token bucket unavailable, using in-memory buckets: %s', exc)
+            return self.fallback.take(key, rate, burst)
+
+
+def token_bucket():
+    """Pick the Redis-backed buckets when the default cache is Redis"""
+    from django.core.cache.backends.redis import RedisCache
+
+    memory = MemoryTokenBucket()
+    cache = caches[getattr(settings, 'ADMISSION_CACHE', 'default')]
+    if isinstance(cache, RedisCache):
+        return RedisTokenBucket(cache, memory)
+    return memory
+
+
+class LoadMonitor:
+    """
+    Tracks in-flight requests and the latencies of requests that finished in
+    the last window_seconds for this process. Old samples age out, so shedding
+    stops once slow requests stop arriving even if little other traffic does.
+    """
+    def __init__(self, window_seconds=None, max_samples=2000):
+        self._lock = threading.Lock()
+        self._window_seconds = window_seconds
+        self._latencies = deque(maxlen=max_samples)
+        self._p95 = 0.0
+        self._p95_at = 0.0
+        self.in_flight = 0
+
+    @property
+    def window_seconds(self):
+        if self._window_seconds is not None:
+            return self._window_seconds
+        return getattr(settings, 'ADMISSION_LATENCY_WINDOW_SECONDS', 30)
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self._latencies.append((time.monotonic(), seconds))
+
+    def p95(self):
+        """95th percentile latency in seconds over the window, recomputed at most once a second"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._p95_at >= 1.0:
+                cutoff = now - self.window_seconds
+                while self._latencies and self._latencies[0][0] < cutoff:
+                    self._latencies.popleft()
+                samples = sorted(seconds for _finished, seconds in self._latencies)
+                self._p95 = samples[math.ceil(len(samples) * 0.95) - 1] if samples else 0.0
+                self._p95_at = now
+            return self._p95
+
+
+class AdmissionController:
+    """
+    Decides whether a request is admitted, by priority class, token buckets
+    and current load
+    """
+    def __init__(self):
+        self.rules = [
+            (name, methods, re.compile(pattern), priority)
+            for name, methods, pattern, priority
+            in getattr(settings, 'ADMISSION_RULES', DEFAULT_ADMISSION_RULES)
+        ]
+        self.buckets = getattr(settings, 'ADMISSION_BUCKETS', DEFAULT_ADMISSION_BUCKETS)
+        self.max_in_flight = getattr(settings, 'ADMISSION_MAX_IN_FLIGHT', 64)
+        self.p95_threshold = getattr(settings, 'ADMISSION_P95_THRESHOLD_MS', 1500) / 1000
+        self.shed_retry_after = getattr(settings, 'ADMISSION_SHED_RETRY_AFTER', 30)
+        self.token_bucket = token_bucket()
+        self.cache = caches[getattr(settings, 'ADMISSION_CACHE', 'default')]
+        self.load = LoadMonitor()
+
+    def classify(self, method, path):
+        for name, methods, pattern, priority in self.rules:
+            if method in methods and pattern.match(path):
+                return name, priority
+        return 'default', 'normal'
+
+    def verified(self, credential):
+        """
+        Whether a credential authenticated recently. Only those get a bucket of
+        their own; anything else is limited by address, so rotating made-up
+        tokens does not buy fresh buckets.
+        """
+        try:
+            return bool(self.cache.get(f'admission-verified:{credential}'))
+        except Exception as exc:
+            logger.warning('Admission cache unavailable, limiting by address: %s', exc)
+            return False
+
+    def verify(self, credential):
+        try:
+            self.cache.set(f'admission-verified:{credential}', 1, VERIFIED_CREDENTIAL_SECONDS)
+        except Exception as exc:
+            logger.warning('Admission cache unavailable, could not record credential: %s', exc)
+
+    def overloaded(self):
+        return self.load.in_flight >= self.max_in_flight or self.load.p95() >= self.p95_threshold
+
+    def admit(self, method, path, client):
+        """
+        Returns (endpoint, priority, retry_after). retry_after is None when admitted.
+        """
+        endpoint, priority = self.classify(method, path)
+        if priority == 'low' and self.overloaded():
+            return endpoint, priority, self.shed_retry_after
+
+        limits = self.buckets.get(priority, {})
+        checks = []
+        # Check the client's own bucket first so one noisy client cannot drain the shared one
+        if limits.get('client'):
+            checks.append((f'admission:{endpoint}:{client}', limits['client']))
+        if limits.get('endpoint'):
+            checks.append((f'admission:{endpoint}', limits['endpoint']))
+        for key, (rate, burst) in checks:
+            allowed, wait = self.token_bucket.take(key, rate, burst)
+            if not allowed:
+                return endpoint, priority, max(1, math.ceil(wait))
+        return endpoint, priority, None
@@ -0,0 +1,106 @@
+"""
+scout/db_routers.py
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def allow_replica_reads(enabled=True):
+    """Route reads in the current context to the replica. Returns a reset token."""
+    return _replica_reads.set(enabled)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+def pin_to_primary(pinned=True):
+    """Force every read in the current context to the primary. Returns a reset token."""
+    return _pinned_to_primary.set(pinned)
+
+
+def reset_pin(token):
+    _pinned_to_primary.reset(token)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = allow_replica_reads(enabled)
+    try:
+        yield
+    finally:
+        reset_replica_reads(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to the replica only inside code that opted in (see
+    ReplicaReadMixin), and never while the client is pinned to the primary after
+    a recent write or while a transaction is open on the primary. Writes and
+    migrations always go to the primary.
+
+    For local testing set SQLITE_PATH and SQLITE_REPLICA_PATH to two SQLite
+    files, the second a copy of the first.
+    """
+    def db_for_read(self, model, **hints):
+        if (
+            _replica_reads.get()
+            and not _pinned_to_primary.get()
+            and replica_configured()
+            and not connections['default'].in_atomic_block
+        ):
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin that serves the actions in replica_actions from the replica
+    """
+    replica_actions = {'list', 'retrieve'}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and getattr(self, 'action', None) in self.replica_actions:
+            self._replica_token = allow_replica_reads()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            self._replica_token = None
+            reset_replica_reads(token)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaChangelistMixin:
+    """
+    ModelAdmin mixin that renders changelist pages from the replica
+    """
+    def changelist_view(self, request, extra_context=None):
+        # POSTs run bulk actions, which must see the primary
+        with replica_reads(request.method == 'GET'):
+            response = super().changelist_view(request, extra_context)
+            # Template responses run their queries while rendering
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
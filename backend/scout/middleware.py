@@ -0,0 +1,110 @@
+"""
+scout/middleware.py
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from .admission import AdmissionController
+from .db_routers import pin_to_primary, reset_pin
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_PIN_COOKIE = 'scout_pin_primary'
+
+
+def client_address(request):
+    """
+    The client's IP address. Behind TRUSTED_PROXY_COUNT proxies it is read from
+    X-Forwarded-For, counting that many entries from the right: entries further
+    left were supplied by the client and can be anything.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',') if address.strip()]
+        if addresses:
+            return addresses[-min(proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def credential_key(request):
+    """Hash of the auth token or session cookie the request carries, or None"""
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode()).hexdigest()[:32]
+
+
+def client_key(request):
+    """Identify the client by auth token, session or address without hitting the database"""
+    return credential_key(request) or hashlib.sha256(client_address(request).encode()).hexdigest()[:32]
+
+
+class ReadYourWritesMiddleware:
+    """
+    After a client writes, pin its requests to the primary database for
+    REPLICA_STICKY_SECONDS so it never reads its own changes from a lagging replica
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        key = f'primary-pin:{client_key(request)}'
+        pinned = bool(request.COOKIES.get(PRIMARY_PIN_COOKIE)) or bool(cache.get(key))
+
+        token = pin_to_primary(pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_pin(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            cache.set(key, 1, timeout=sticky_seconds)
+            response.set_cookie(PRIMARY_PIN_COOKIE, '1', max_age=sticky_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Sheds load before it reaches the views. Requests are put in a priority class
+    (low: report creation and registration, high: crew and lead writes) and
+    rate limited with per-client and per-endpoint token buckets. Low-priority
+    requests are also rejected while this process has too many requests in
+    flight or its p95 latency is over ADMISSION_P95_THRESHOLD_MS.
+
+    This runs before authentication, so a client is only keyed on its token or
+    session once that credential has authenticated a request; until then, and
+    for anonymous traffic, it is keyed on its address.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.controller = AdmissionController()
+
+    def __call__(self, request):
+        if not getattr(settings, 'ADMISSION_CONTROL_ENABLED', True) or request.method == 'OPTIONS':
+            return self.get_response(request)
+
+        credential = credential_key(request)
+        verified = credential is not None and self.controller.verified(credential)
+        client = credential if verified else f'address:{client_address(request)}'
+        endpoint, priority, retry_after = self.controller.admit(request.method, request.path_info, client)
+        if retry_after is not None:
+            response = JsonResponse(
+                {'error': 'Too many requests, please try again later'}, status=429
+            )
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        self.controller.load.start()
+        started = time.monotonic()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.controller.load.finish(time.monotonic() - started)
+        # DRF sets request.user once the token authenticates in the view
+        user = getattr(request, 'user', None)
+        if credential is not None and not verified and user is not None and user.is_authenticated:
+            self.controller.verify(credential)
+        return response
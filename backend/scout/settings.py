@@ -12,14 +12,19 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load environment variables from .env file. Containers get their environment
+# from compose, so dotenv is only imported when the file is there.
+for dotenv_path in (BASE_DIR / '.env', BASE_DIR.parent / '.env'):
+    if dotenv_path.exists():
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path)
+        break
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -55,15 +60,20 @@ INSTALLED_APPS = [
     'accounts',
     'authentication',
     'locations',
+    'jobs',
+    'profiling',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'scout.middleware.AdmissionControlMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'profiling.middleware.ProfilingMiddleware',
+    'scout.middleware.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -102,6 +112,68 @@ DATABASES = {
     }
 }
 
+# Local development without PostgreSQL. SQLITE_REPLICA_PATH should be a copy of
+# the SQLITE_PATH file; tests mirror it to the primary's test database.
+if os.getenv('SQLITE_PATH'):
+    DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.getenv('SQLITE_PATH')}
+
+# Optional read replica. Dashboard and admin list reads go here, see scout/db_routers.py
+if os.getenv('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('POSTGRES_REPLICA_HOST'),
+        'PORT': os.getenv('POSTGRES_REPLICA_PORT', os.getenv('POSTGRES_PORT')),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif os.getenv('SQLITE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('SQLITE_REPLICA_PATH'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['scout.db_routers.PrimaryReplicaRouter']
+
+# Seconds a client keeps reading from the primary after it writes
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+
+
+# Cache
+# Shared Redis cache when REDIS_URL is set, otherwise a per-process memory cache
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# User snapshot cache, see accounts/cache.py. The in-process tier only expires
+# by TTL in other processes, so keep USER_CACHE_LOCAL_TTL short.
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))
+USER_CACHE_LOCAL_TTL = int(os.getenv('USER_CACHE_LOCAL_TTL', '30'))
+USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000'))
+
+# Admission control, see scout/admission.py. Low-priority requests (report
+# creation, registration) are shed when a process has ADMISSION_MAX_IN_FLIGHT
+# requests running or its p95 latency over the last
+# ADMISSION_LATENCY_WINDOW_SECONDS exceeds ADMISSION_P95_THRESHOLD_MS.
+ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'True').lower() == 'true'
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '64'))
+ADMISSION_P95_THRESHOLD_MS = int(os.getenv('ADMISSION_P95_THRESHOLD_MS', '1500'))
+ADMISSION_LATENCY_WINDOW_SECONDS = int(os.getenv('ADMISSION_LATENCY_WINDOW_SECONDS', '30'))
+ADMISSION_SHED_RETRY_AFTER = int(os.getenv('ADMISSION_SHED_RETRY_AFTER', '30'))
+# Reverse proxies in front of the app that append to X-Forwarded-For. Anonymous
+# clients are rate limited by the address that many entries from the right; 0
+# uses the socket address.
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -169,9 +241,110 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Optimistic concurrency on location edits uses ETag / If-Match
+CORS_ALLOW_HEADERS = (*default_headers, 'if-match', 'x-scout-profile')
+CORS_EXPOSE_HEADERS = ['ETag', 'X-Profile-Id']
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 # Static files
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Impact rollup (in-memory state/city/zip totals) full rebuild interval
+IMPACT_ROLLUP_RECONCILE_SECONDS = int(os.getenv('IMPACT_ROLLUP_RECONCILE_SECONDS', '300'))
+
+# Map clustering grid: deepest zoom level kept, cells per tile side as a power of
+# two (2 = 4x4 cells per tile) and full rebuild interval
+CLUSTER_MAX_ZOOM = int(os.getenv('CLUSTER_MAX_ZOOM', '16'))
+CLUSTER_TILE_SUBDIVISION = int(os.getenv('CLUSTER_TILE_SUBDIVISION', '2'))
+CLUSTER_PYRAMID_RECONCILE_SECONDS = int(os.getenv('CLUSTER_PYRAMID_RECONCILE_SECONDS', '300'))
+
+# Duplicate report detection: match radius and full index rebuild interval
+DUPLICATE_REPORT_RADIUS_METERS = float(os.getenv('DUPLICATE_REPORT_RADIUS_METERS', '75'))
+DUPLICATE_INDEX_RECONCILE_SECONDS = int(os.getenv('DUPLICATE_INDEX_RECONCILE_SECONDS', '60'))
+
+# Opt-in micro-batching of location creates: milliseconds to collect concurrent
+# creates before writing them in one transaction (0 disables), and batch size cap
+LOCATION_CREATE_BATCH_WINDOW_MS = float(os.getenv('LOCATION_CREATE_BATCH_WINDOW_MS', '0'))
+LOCATION_CREATE_BATCH_MAX = int(os.getenv('LOCATION_CREATE_BATCH_MAX', '100'))
+
+# Location history for `as_of` queries: interval between snapshots of open
+# locations, how far before a snapshot event replay starts, and days kept
+LOCATION_SNAPSHOT_INTERVAL_SECONDS = int(os.getenv('LOCATION_SNAPSHOT_INTERVAL_SECONDS', '900'))
+LOCATION_SNAPSHOT_OVERLAP_SECONDS = int(os.getenv('LOCATION_SNAPSHOT_OVERLAP_SECONDS', '60'))
+LOCATION_HISTORY_RETENTION_DAYS = int(os.getenv('LOCATION_HISTORY_RETENTION_DAYS', '90'))
+# Older snapshots are thinned to one per hour, then one per day
+LOCATION_SNAPSHOT_HOURLY_AFTER_HOURS = int(os.getenv('LOCATION_SNAPSHOT_HOURLY_AFTER_HOURS', '24'))
+LOCATION_SNAPSHOT_DAILY_AFTER_DAYS = int(os.getenv('LOCATION_SNAPSHOT_DAILY_AFTER_DAYS', '7'))
+
+# Offline geocoder index of zip code centroids, built with `manage.py build_geocoder_index`
+GEOCODER_INDEX_PATH = os.getenv('GEOCODER_INDEX_PATH', str(BASE_DIR / 'data' / 'zip_centroids.idx'))
+
+# Seconds a planned crew route stays cached; assignment changes invalidate it sooner
+ROUTE_CACHE_TTL = int(os.getenv('ROUTE_CACHE_TTL', '3600'))
+# Decimal places a route's start point is rounded to before planning and caching
+# (2 is a cell of about 1 km)
+ROUTE_CACHE_START_DECIMALS = int(os.getenv('ROUTE_CACHE_START_DECIMALS', '2'))
+
+# Restoration ETA model: seconds between scoring runs, days of resolutions it
+# trains on, fewest resolutions worth fitting, minutes a prediction is always
+# ahead of now, and smallest change in minutes that is written back
+ETA_SCORING_INTERVAL_SECONDS = int(os.getenv('ETA_SCORING_INTERVAL_SECONDS', '300'))
+ETA_TRAINING_DAYS = int(os.getenv('ETA_TRAINING_DAYS', '365'))
+ETA_MIN_TRAINING_SAMPLES = int(os.getenv('ETA_MIN_TRAINING_SAMPLES', '50'))
+ETA_MIN_REMAINING_MINUTES = int(os.getenv('ETA_MIN_REMAINING_MINUTES', '30'))
+ETA_UPDATE_THRESHOLD_MINUTES = int(os.getenv('ETA_UPDATE_THRESHOLD_MINUTES', '5'))
+
+# Public outage lookup, see locations/public.py: search radius around a point,
+# seconds between polls for changed outages and between full rebuilds of each
+# process's index, and most outages returned per lookup
+PUBLIC_LOOKUP_RADIUS_KM = float(os.getenv('PUBLIC_LOOKUP_RADIUS_KM', '2'))
+PUBLIC_LOOKUP_REFRESH_SECONDS = int(os.getenv('PUBLIC_LOOKUP_REFRESH_SECONDS', '2'))
+PUBLIC_LOOKUP_REBUILD_SECONDS = int(os.getenv('PUBLIC_LOOKUP_REBUILD_SECONDS', '300'))
+PUBLIC_LOOKUP_MAX_RESULTS = int(os.getenv('PUBLIC_LOOKUP_MAX_RESULTS', '20'))
+
+# Assignment recommender: km that cost as much as one open assignment, and the
+# distance assumed for crew members with no located open work
+RECOMMENDER_DISTANCE_SCALE_KM = float(os.getenv('RECOMMENDER_DISTANCE_SCALE_KM', '10'))
+RECOMMENDER_UNKNOWN_DISTANCE_KM = float(os.getenv('RECOMMENDER_UNKNOWN_DISTANCE_KM', '25'))
+# Most locations ranked per recommendation request
+RECOMMENDER_MAX_LOCATIONS = int(os.getenv('RECOMMENDER_MAX_LOCATIONS', '1000'))
+
+# Webhook endpoints fed from the location event outbox (drained by `manage.py drain_outbox`)
+WEBHOOK_ENDPOINTS = {
+    name: {
+        'url': url,
+        'secret': os.getenv(f'{name.upper()}_WEBHOOK_SECRET', ''),
+        'timeout': float(os.getenv(f'{name.upper()}_WEBHOOK_TIMEOUT', '10')),
+    }
+    for name, url in (
+        ('oms', os.getenv('OMS_WEBHOOK_URL')),
+        ('sms', os.getenv('SMS_WEBHOOK_URL')),
+    )
+    if url
+}
+# Days to keep delivered outbox events
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', '7'))
+
+# Email
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False').lower() == 'true'
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'scout@localhost')
+
+# Frontend base URL used in emailed links
+FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
+
+# Background jobs (`manage.py run_jobs`): days to keep finished jobs
+JOBS_RETENTION_DAYS = int(os.getenv('JOBS_RETENTION_DAYS', '7'))
+
+# Request profiling, see profiling/middleware.py. Admins profile a request with
+# an `X-Scout-Profile: 1` header or `?_profile=1`; this fraction of all requests
+# is profiled as well (0 disables sampling).
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_RETENTION_DAYS = int(os.getenv('PROFILING_RETENTION_DAYS', '7'))
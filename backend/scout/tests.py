@@ -0,0 +1,157 @@
+import time
+from unittest import skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext, ignore_warnings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from accounts.models import User
+from locations.models import Location
+from .admission import AdmissionController, LoadMonitor, MemoryTokenBucket
+from .db_routers import PrimaryReplicaRouter, pin_to_primary, replica_reads, reset_pin
+
+WITH_REPLICA = {**settings.DATABASES, 'replica': {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}}
+WITHOUT_REPLICA = {'default': settings.DATABASES['default']}
+
+
+@ignore_warnings(message='Overriding setting DATABASES')
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    @override_settings(DATABASES=WITH_REPLICA)
+    def test_reads_use_the_replica_only_when_opted_in(self):
+        self.assertEqual(self.router.db_for_read(Location), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Location), 'replica')
+            with replica_reads(False):
+                self.assertEqual(self.router.db_for_read(Location), 'default')
+        self.assertEqual(self.router.db_for_read(Location), 'default')
+
+    @override_settings(DATABASES=WITH_REPLICA)
+    def test_pinned_clients_read_from_the_primary(self):
+        token = pin_to_primary()
+        try:
+            with replica_reads():
+                self.assertEqual(self.router.db_for_read(Location), 'default')
+        finally:
+            reset_pin(token)
+
+    @override_settings(DATABASES=WITHOUT_REPLICA)
+    def test_reads_use_the_primary_without_a_replica(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Location), 'default')
+
+    @override_settings(DATABASES=WITH_REPLICA)
+    def test_writes_and_migrations_use_the_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Location), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'locations'))
+        self.assertFalse(self.router.allow_migrate('replica', 'locations'))
+
+
+# Run with SQLITE_PATH and SQLITE_REPLICA_PATH set so a replica connection exists
+@skipUnless('replica' in settings.DATABASES, 'no replica database configured')
+class ReplicaReadTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        # Primary pins from earlier tests live in the cache
+        cache.clear()
+        self.user = User.objects.create_user(email='lead@example.com', password='pass', role='admin')
+        Location.objects.create(name='Substation', address='1 Main Street', city='Springfield', state='IL', zip_code='62701')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def list_queries(self):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get('/api/locations/')
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_list_is_read_from_the_replica(self):
+        primary, replica = self.list_queries()
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_client_reads_from_the_primary_after_writing(self):
+        response = self.client.post('/api/locations/', {
+            'name': 'Feeder', 'address': '2 Main Street', 'city': 'Springfield', 'state': 'IL', 'zip_code': '62701',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        primary, replica = self.list_queries()
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        with replica_reads(), transaction.atomic():
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Location), 'default')
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def test_crew_writes_are_high_priority(self):
+        controller = AdmissionController()
+        for method, path in [
+            ('POST', '/api/locations/claim_next/'),
+            ('POST', '/api/locations/assign/abc123/'),
+            ('POST', '/api/locations/abc123/update_status/'),
+            ('PATCH', '/api/locations/abc123/'),
+        ]:
+            self.assertEqual(controller.classify(method, path), ('crew-write', 'high'), path)
+        self.assertEqual(controller.classify('POST', '/api/locations/'), ('report-create', 'low'))
+
+    def test_slow_requests_age_out_of_the_latency_window(self):
+        monitor = LoadMonitor(window_seconds=1)
+        monitor.start()
+        monitor.finish(5.0)
+        self.assertEqual(monitor.p95(), 5.0)
+        time.sleep(1.1)
+        self.assertEqual(monitor.p95(), 0.0)
+
+    def test_memory_buckets_evict_the_least_recently_used(self):
+        buckets = MemoryTokenBucket(max_keys=2)
+        buckets.take('a', 1, 1)
+        buckets.take('b', 1, 1)
+        self.assertEqual(buckets.take('a', 1, 1)[0], False)
+        buckets.take('c', 1, 1)
+        self.assertEqual(list(buckets._buckets), ['a', 'c'])
+        # Bucket a kept its state rather than being reset
+        self.assertEqual(buckets.take('a', 1, 1)[0], False)
+
+
+class AdmissionMiddlewareTests(TestCase):
+    def setUp(self):
+        # Verified credentials from earlier tests live in the cache
+        cache.clear()
+        user = User.objects.create_user(email='crew@example.com', password='pass', role='team_member')
+        self.token = Token.objects.create(user=user).key
+
+    def test_rotating_made_up_tokens_are_limited_by_address(self):
+        statuses = [
+            self.client.get('/api/outages/lookup/', {'zip': '62701'}, HTTP_AUTHORIZATION=f'Token made-up-{n}').status_code
+            for n in range(25)
+        ]
+        self.assertIn(429, statuses)
+        self.assertLessEqual(statuses.index(429), 20)
+
+    def test_authenticated_token_keeps_its_own_bucket(self):
+        self.assertEqual(self.client.get('/api/locations/', HTTP_AUTHORIZATION=f'Token {self.token}').status_code, 200)
+        statuses = [
+            self.client.get('/api/locations/', HTTP_AUTHORIZATION=f'Token made-up-{n}').status_code
+            for n in range(60)
+        ]
+        self.assertEqual(statuses[-1], 429)
+        self.assertEqual(self.client.get('/api/locations/', HTTP_AUTHORIZATION=f'Token {self.token}').status_code, 200)
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_forwarded_address_is_read_behind_a_trusted_proxy(self):
+        def lookup(forwarded_for):
+            return self.client.get('/api/outages/lookup/', {'zip': '62701'}, HTTP_X_FORWARDED_FOR=forwarded_for)
+
+        # The client controls everything left of the address the proxy appended
+        statuses = [lookup(f'10.0.0.{n}, 203.0.113.7').status_code for n in range(25)]
+        self.assertIn(429, statuses)
+        self.assertNotEqual(lookup('203.0.113.8').status_code, 429)
@@ -18,12 +18,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from locations.public import outage_lookup
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('authentication.urls')),
     path('api/accounts/', include('accounts.urls')),
     path('api/locations/', include('locations.urls')),
+    path('api/outages/lookup/', outage_lookup, name='outage-lookup'),
 ]
 
 # Serve media files in development